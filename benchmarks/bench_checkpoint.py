@@ -0,0 +1,37 @@
+"""``save_checkpoint``/``load_checkpoint`` throughput versus model size."""
+import os.path as osp
+import tempfile
+
+from engine.trainer.checkpoint import load_checkpoint, save_checkpoint
+
+from .common import measure, synthetic_model, synthetic_trainer
+
+# (width, depth) of the synthetic MLP, from ~0.3 MB to ~64 MB of weights
+MODEL_SIZES = ((128, 4), (512, 8), (1024, 16))
+
+
+def _num_bytes(model):
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+def run():
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for width, depth in MODEL_SIZES:
+            model = synthetic_model(width, depth)
+            trainer = synthetic_trainer(model)
+            filename = osp.join(tmp_dir, 'model.pth')
+            mb = _num_bytes(model) / 1024 / 1024
+            name = '{}x{}'.format(width, depth)
+
+            save = measure(
+                lambda: save_checkpoint(model, filename, trainer.optimizer),
+                number=1, repeat=3)
+            save['mb_per_s'] = mb / save['median']
+            results['checkpoint/save/{}'.format(name)] = save
+
+            load = measure(lambda: load_checkpoint(model, filename, 'cpu'),
+                           number=1, repeat=3)
+            load['mb_per_s'] = mb / load['median']
+            results['checkpoint/load/{}'.format(name)] = load
+    return results
@@ -0,0 +1,88 @@
+"""Hook dispatch overhead as the number of registered hooks grows."""
+import statistics
+import time
+
+from engine.trainer.hooks import Hook
+
+from .common import measure, synthetic_loader, synthetic_trainer
+
+NUM_HOOKS = (0, 8, 32, 128)
+NUM_SINKS = 4
+
+
+class _CountHook(Hook):
+    """A hook with a trivial ``after_train_iter``. Plain :class:`Hook`
+    instances are left out of the compiled plan and would measure nothing.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def after_train_iter(self, trainer):
+        self.count += 1
+
+
+def bench_call_hook(num_hooks):
+    trainer = synthetic_trainer()
+    for _ in range(num_hooks):
+        trainer.register_hook(_CountHook())
+    return measure(lambda: trainer.call_hook('after_train_iter'), number=1000)
+
+
+class _SpanHook(Hook):
+    """Measure the time from ``before_run`` to the end of the last epoch.
+    ``Trainer.fit`` sleeps before ``after_run``, which must not be counted.
+    """
+    def before_run(self, trainer):
+        self.start = time.perf_counter_ns()
+
+    def after_train_epoch(self, trainer):
+        self.end = time.perf_counter_ns()
+
+
+def bench_fit(num_hooks, epochs=2, repeat=3):
+    loader = synthetic_loader()
+    iters = epochs * len(loader)
+    timings = []
+    for _ in range(repeat):
+        trainer = synthetic_trainer()
+        trainer.register_training_hooks(dict(policy='Fixed'),
+                                        dict(grad_clip=None))
+        for _ in range(num_hooks):
+            trainer.register_hook(_CountHook())
+        span = _SpanHook()
+        trainer.register_hook(span, priority='HIGHEST')
+        trainer.fit([loader], [('train', 1)], epochs)
+        timings.append((span.end - span.start) * 1e-9 / iters)
+    return dict(
+        median=statistics.median(timings), min=min(timings), max=max(timings))
+
+
+class _SinkHook(Hook):
+    """A logging sink whose I/O takes 1 ms per iteration."""
+    reads = ('log_buffer', )
+    writes = ()
+
+    def __init__(self, concurrent):
+        self.concurrent = concurrent
+
+    def after_train_iter(self, trainer):
+        time.sleep(1e-3)
+
+
+def bench_sinks(concurrent):
+    trainer = synthetic_trainer()
+    for _ in range(NUM_SINKS):
+        trainer.register_hook(_SinkHook(concurrent))
+    trainer.compile_hooks()
+    return measure(lambda: trainer.call_hook('after_train_iter'), number=20)
+
+
+def run():
+    results = {}
+    for n in NUM_HOOKS:
+        results['hooks/call_hook/n={}'.format(n)] = bench_call_hook(n)
+        results['hooks/fit_per_iter/n={}'.format(n)] = bench_fit(n)
+    for concurrent in (False, True):
+        results['hooks/sinks/n={}/concurrent={}'.format(
+            NUM_SINKS, concurrent)] = bench_sinks(concurrent)
+    return results
@@ -0,0 +1,58 @@
+"""Cold import time of the engine, each sample in a fresh interpreter."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# optional backends that must only be imported when they are used
+OPTIONAL_MODULES = ('wandb', 'torchvision', 'tensorboard', 'matplotlib',
+                    'pandas')
+
+MODULES = ('engine.trainer.trainer', 'engine.trainer.hooks')
+
+_SCRIPT = """
+import json, sys, time
+t = time.perf_counter_ns()
+import torch
+t_torch = time.perf_counter_ns()
+import {module}
+t_module = time.perf_counter_ns()
+print(json.dumps(dict(
+    torch=(t_torch - t) * 1e-9, module=(t_module - t_torch) * 1e-9,
+    optional=sorted(set({optional!r}) & set(sys.modules)))))
+"""
+
+
+def _sample(module):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [p for p in [env.get('PYTHONPATH')] if p])
+    output = subprocess.run(
+        [sys.executable, '-c',
+         _SCRIPT.format(module=module, optional=OPTIONAL_MODULES)],
+        check=True, stdout=subprocess.PIPE, env=env).stdout
+    return json.loads(output.decode().splitlines()[-1])
+
+
+def _stats(timings):
+    return dict(
+        median=statistics.median(timings), min=min(timings), max=max(timings))
+
+
+def run(repeat=5):
+    results = {}
+    torch_timings = []
+    for module in MODULES:
+        samples = [_sample(module) for _ in range(repeat)]
+        torch_timings += [s['torch'] for s in samples]
+        # the time on top of ``import torch``
+        stats = _stats([s['module'] for s in samples])
+        stats['optional_modules'] = samples[-1]['optional']
+        if stats['optional_modules']:
+            print('WARNING: importing {} imports the optional modules {}'.format(
+                module, ', '.join(stats['optional_modules'])), file=sys.stderr)
+        results['import/{}'.format(module)] = stats
+    results['import/torch'] = _stats(torch_timings)
+    return results
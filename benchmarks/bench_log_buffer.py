@@ -0,0 +1,33 @@
+"""``LogBuffer.update``/``LogBuffer.average`` cost versus history length."""
+from engine.trainer.log_buffer import LogBuffer
+
+from .common import measure
+
+HISTORY_LENGTHS = (100, 1000, 10000)
+KEYS = ('loss', 'acc', 'time', 'data_time')
+
+
+def filled_buffer(length):
+    buffer = LogBuffer([])
+    for i in range(length):
+        buffer.update({key: float(i) for key in KEYS})
+    return buffer
+
+
+def run():
+    results = {}
+    for length in HISTORY_LENGTHS:
+        buffer = filled_buffer(length)
+        vars = {key: 1. for key in KEYS}
+        results['log_buffer/update/len={}'.format(length)] = measure(
+            lambda: buffer.update(vars), number=1000)
+        # each average follows an update, as in training; otherwise the
+        # memoized result of the first call would be measured
+        buffer = filled_buffer(length)
+        results['log_buffer/update_average_window/len={}'.format(length)] = \
+            measure(lambda: (buffer.update(vars), buffer.average(10)),
+                    number=100)
+        buffer = filled_buffer(length)
+        results['log_buffer/update_average_all/len={}'.format(length)] = \
+            measure(lambda: (buffer.update(vars), buffer.average()), number=10)
+    return results
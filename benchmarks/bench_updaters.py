@@ -0,0 +1,52 @@
+"""Per-iteration cost of the LR and momentum updater policies."""
+from .common import measure, synthetic_trainer
+
+MAX_ITERS = 1000
+LR_POLICIES = {
+    'Fixed': dict(),
+    'Step': dict(step=[300, 600], by_epoch=False),
+    'Exp': dict(gamma=0.999, by_epoch=False),
+    'Poly': dict(power=0.9, by_epoch=False),
+    'Inv': dict(gamma=0.01, by_epoch=False),
+    'CosineAnnealing': dict(min_lr=0., by_epoch=False),
+    'CosineRestart': dict(periods=[500, 500], restart_weights=[1, 0.5],
+                          min_lr=0., by_epoch=False),
+    'Cyclic': dict(),
+    'OneCycle': dict(max_lr=0.1),
+    'Linear warmup': dict(policy='Fixed', by_epoch=False, warmup='linear',
+                          warmup_iters=MAX_ITERS),
+}
+MOMENTUM_POLICIES = {
+    'OneCycle': dict(),
+}
+
+
+def _prepare(trainer, hook):
+    trainer._max_epochs = 1
+    trainer._max_iters = MAX_ITERS
+    hook.before_run(trainer)
+
+    def step():
+        trainer._iter = (trainer._iter + 1) % MAX_ITERS
+        hook.before_train_iter(trainer)
+
+    return step
+
+
+def run():
+    results = {}
+    for name, cfg in LR_POLICIES.items():
+        cfg = dict(cfg)
+        cfg.setdefault('policy', name)
+        trainer = synthetic_trainer()
+        trainer.register_lr_hook(cfg)
+        step = _prepare(trainer, trainer.hooks[-1])
+        results['updaters/lr/{}'.format(name)] = measure(step, number=1000)
+    for name, cfg in MOMENTUM_POLICIES.items():
+        cfg = dict(cfg, policy=name)
+        trainer = synthetic_trainer()
+        trainer.register_momentum_hook(cfg)
+        step = _prepare(trainer, trainer.hooks[-1])
+        results['updaters/momentum/{}'.format(name)] = measure(
+            step, number=1000)
+    return results
@@ -0,0 +1,68 @@
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from engine.trainer.trainer import Trainer
+
+
+def measure(fn, number=100, repeat=5, warmup=1):
+    """Time ``fn`` and return per-call statistics in seconds.
+    Args:
+        fn (callable): Function without arguments to be timed.
+        number (int): Calls per measurement.
+        repeat (int): Number of measurements.
+        warmup (int): Untimed calls before measuring.
+    Returns:
+        dict: ``median``, ``min`` and ``max`` seconds per call.
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter_ns() - t) * 1e-9 / number)
+    return dict(
+        median=statistics.median(timings), min=min(timings), max=max(timings))
+
+
+def synthetic_model(width=64, depth=2):
+    layers = []
+    for _ in range(depth):
+        layers += [nn.Linear(width, width), nn.ReLU()]
+    layers.append(nn.Linear(width, 1))
+    return nn.Sequential(*layers)
+
+
+def synthetic_loader(num_samples=256, batch_size=16, width=64):
+    generator = torch.Generator().manual_seed(0)
+    dataset = TensorDataset(
+        torch.randn(num_samples, width, generator=generator),
+        torch.randn(num_samples, 1, generator=generator))
+    return DataLoader(dataset, batch_size=batch_size, shuffle=False)
+
+
+def batch_processor(model, data, train_mode, **kwargs):
+    x, y = data
+    loss = ((model(x) - y) ** 2).mean()
+    return dict(loss=loss, log_vars={'loss': loss.item()},
+                num_samples=x.size(0))
+
+
+def synthetic_trainer(model=None, optimizer=None, work_dir=None):
+    config = SimpleNamespace(
+        name='benchmark',
+        log_average_filter=[],
+        model=SimpleNamespace(name='benchmark'))
+    if model is None:
+        model = synthetic_model()
+    if optimizer is None:
+        optimizer = dict(name='SGD', lr=0.01, momentum=0.9)
+    return Trainer(config, model, batch_processor, optimizer=optimizer,
+                   work_dir=work_dir, log_level=logging.WARNING)
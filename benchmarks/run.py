@@ -0,0 +1,105 @@
+"""Run the training loop benchmarks on CPU.
+
+Examples:
+    Run everything and store the results::
+
+        python -m benchmarks.run --out baseline.json
+
+    Run the hook and log buffer suites and compare against a baseline,
+    exiting with status 1 if any benchmark got more than 20% slower::
+
+        python -m benchmarks.run hooks log_buffer --compare baseline.json \\
+            --tolerance 0.2
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import torch
+
+from . import (bench_checkpoint, bench_hooks, bench_import, bench_log_buffer,
+               bench_updaters)
+
+SUITES = {
+    'hooks': bench_hooks,
+    'log_buffer': bench_log_buffer,
+    'updaters': bench_updaters,
+    'checkpoint': bench_checkpoint,
+    'import': bench_import,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Compare median timings against a baseline.
+    Returns:
+        list[tuple]: ``(name, baseline, current, ratio)`` of every benchmark
+            slower than ``1 + tolerance`` times the baseline.
+    """
+    regressions = []
+    for name, stats in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = stats['median'] / baseline[name]['median']
+        print('{:<48} {:>12.3e} {:>12.3e} {:>8.2f}x'.format(
+            name, baseline[name]['median'], stats['median'], ratio))
+        if ratio > 1 + tolerance:
+            regressions.append(
+                (name, baseline[name]['median'], stats['median'], ratio))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run engine benchmarks')
+    parser.add_argument('suites', nargs='*',
+                        help='suites to run ({}), all by default'.format(
+                            ', '.join(SUITES)))
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed relative slowdown against the baseline')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='torch intra-op threads, 1 for stable numbers')
+    args = parser.parse_args()
+    for name in args.suites:
+        if name not in SUITES:
+            parser.error('unknown suite "{}"'.format(name))
+    return args
+
+
+def main():
+    args = parse_args()
+    torch.set_num_threads(args.threads)
+    results = {}
+    for name in args.suites or list(SUITES):
+        print('running {} benchmarks'.format(name), file=sys.stderr)
+        results.update(SUITES[name].run())
+
+    report = dict(
+        meta=dict(
+            time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            python=platform.python_version(),
+            torch=torch.__version__,
+            machine=platform.machine(),
+            threads=args.threads),
+        results=results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new, ratio in regressions:
+            print('REGRESSION {}: {:.3e}s -> {:.3e}s ({:.2f}x)'.format(
+                name, old, new, ratio), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
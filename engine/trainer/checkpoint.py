@@ -1,18 +1,57 @@
-from os import stat
+import contextlib
+import itertools
+import os
 import os.path as osp
+import re
+import shutil
+import tempfile
 import time
+import zipfile
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
 import torch
-from torch.utils import model_zoo
 
-from ..utils.path import mkdir_or_exist
+from . import serialization
+from .integrity import (MANIFEST_SUFFIX, ChecksumWriter, verify_checkpoint,
+                        write_manifest)
+from ..utils.path import mkdir_or_exist, symlink
+from ..utils.storage import get_backend, is_local, parse_uri
+from ..utils.weights_cache import get_weights_cache
 
-def load_state_dict(module, state_dict, strict=False, logger=None):
+def _revise_keys(state_dict, revise_keys):
+    """Rename the keys of ``state_dict`` with ``(pattern, repl)`` rules."""
+    if not revise_keys:
+        return state_dict
+    rules = [(re.compile(pattern), repl) for pattern, repl in revise_keys]
+    revised = OrderedDict()
+    for key, value in state_dict.items():
+        for pattern, repl in rules:
+            key = pattern.sub(repl, key)
+        revised[key] = value
+    return revised
+
+
+def _copy_tensors(dsts, srcs):
+    # a single foreach call copies all tensors without a python loop; torch
+    # groups them by device and dtype and uses fused kernels where it can
+    with torch.no_grad():
+        if hasattr(torch, '_foreach_copy_'):
+            torch._foreach_copy_(dsts, srcs)
+        else:
+            for dst, src in zip(dsts, srcs):
+                dst.copy_(src)
+
+
+def load_state_dict(module, state_dict, strict=False, logger=None, assign=False,
+                    skip_mismatched=False):
     """Load state_dict to a module.
     This method is modified from :meth:`torch.nn.Module.load_state_dict`.
     Default value for ``strict`` is set to ``False`` and the message for
-    param mismatch will be shown even if strict is False.
+    param mismatch will be shown even if strict is False. Tensors are
+    copied with one foreach call per device and dtype, and all shape
+    mismatches are reported together before anything is copied.
     Args:
         module (Module): Module that receives the state_dict.
         state_dict (OrderedDict): Weights.
@@ -21,38 +60,64 @@ def load_state_dict(module, state_dict, strict=False, logger=None):
             :meth:`~torch.nn.Module.state_dict` function. Default: ``False``.
         logger (:obj:`logging.Logger`, optional): Logger to log the error
             message. If not specified, print function will be used.
+        assign (bool): Assign the tensors of ``state_dict`` to the module
+            instead of copying them, see ``assign`` of
+            :meth:`torch.nn.Module.load_state_dict`. This materializes a
+            module built on the meta device without allocating it first.
+        skip_mismatched (bool): Skip tensors whose shape differs from the
+            model, e.g. a classifier with another number of classes, and
+            only report them. Shape mismatches raise otherwise, even if
+            ``strict`` is False. Default: ``False``.
     """
-    unexpected_keys = []
-    own_state = module.state_dict()
+    # the parameters themselves are copied into under no_grad, which saves
+    # detaching every tensor
+    own_state = module.state_dict(keep_vars=True)
+    unexpected_keys = [key for key in state_dict if key not in own_state]
+    missing_keys = [key for key in own_state if key not in state_dict]
+    mismatched = []
+    names, dsts, srcs = [], [], []
+    # entries that are not tensors, e.g. the ``_extra_state`` of modules
+    # defining get_extra_state, go through torch's load_state_dict
+    extra_state = OrderedDict()
     for name, param in state_dict.items():
         if name not in own_state:
-            unexpected_keys.append(name)
             continue
-        if isinstance(param, torch.nn.Parameter):
-            # backwards compatibility for serialized parameters
-            param = param.data
-
-        try:
-            own_state[name].copy_(param)
-        except Exception:
-            raise RuntimeError('While copying the parameter named {}, '
-                               'whose dimensions in the model are {} and '
-                               'whose dimensions in the checkpoint are {}.'.format(name, own_state[name].size(), param.size())
-                               )
-
-    missing_keys = set(own_state.keys()) - set(state_dict.keys())
+        dst = own_state[name]
+        if not (torch.is_tensor(dst) and torch.is_tensor(param)):
+            extra_state[name] = param
+            continue
+        if dst.shape != param.shape:
+            mismatched.append('{}: model {}, checkpoint {}'.format(
+                name, tuple(dst.shape), tuple(param.shape)))
+            continue
+        names.append(name)
+        dsts.append(dst)
+        srcs.append(param)
 
     err_msg = []
     if unexpected_keys:
         err_msg.append('unexpected keys in source state_dict: {}\n'.format(', '.join(unexpected_keys)))
     if missing_keys:
         err_msg.append('missing keys in source state_dict: {}\n'.format(', '.join(missing_keys)))
+    if mismatched:
+        err_msg.append('size mismatch in source state_dict:\n{}\n'.format('\n'.join(mismatched)))
     err_msg = '\n'.join(err_msg)
+    if err_msg and (strict or mismatched and not skip_mismatched):
+        raise RuntimeError(err_msg)
+    if assign:
+        # keep the dtypes of the model, as a copy would
+        assigned = OrderedDict(
+            (name, src if src.dtype == dst.dtype else src.to(dst.dtype))
+            for name, dst, src in zip(names, dsts, srcs))
+        assigned.update(extra_state)
+        module.load_state_dict(assigned, strict=False, assign=True)
+    else:
+        _copy_tensors(dsts, srcs)
+        if extra_state:
+            module.load_state_dict(extra_state, strict=False)
     if err_msg:
-        if strict:
-            raise RuntimeError(err_msg)
-        elif logger is not None:
-            logger.warn(err_msg)
+        if logger is not None:
+            logger.warning(err_msg)
         else:
             print(err_msg)
 
@@ -62,30 +127,67 @@ def load_checkpoint(
     filename, 
     map_location = None, 
     strict = False,
-    logger = None
+    logger = None,
+    revise_keys = ((r'^module\.', ''), ),
+    assign = False,
+    mmap = False,
+    skip_mismatched = False
 ):
     """Load checkpoint from a file or URI.
     Args:
         model (Module): Module to load checkpoint.
-        filename (str): Either a filepath or URL or modelzoll://xxxxxxx.
+        filename (str): Either a filepath or URL or modelzoll://xxxxxxx,
+            or a URI of a storage backend, e.g. ``s3://bucket/latest.pth``,
+            see :mod:`engine.utils.storage`. Remote files are downloaded
+            with parallel ranged reads first. Model zoo and http(s) files
+            already in the torch hub cache are used from there, others are
+            kept in the node-wide cache of
+            :mod:`engine.utils.weights_cache`; both are memory-mapped.
         map_location (str): Same as :func:`torch.load`.
         strict (bool): Whether to allow different params for the model and
             checkpoint.
         logger (:mod:`logging.Logger` or None): The logger for error message.
+        revise_keys (Sequence[tuple[str, str]]): ``(pattern, repl)`` regex
+            rules applied in order to every key of the state_dict, e.g.
+            ``[(r'^backbone\\.', '')]``. The default strips the ``module.``
+            prefix of DataParallel checkpoints.
+        assign (bool): Assign the loaded tensors to the model instead of
+            copying them, see :func:`load_state_dict`.
+        mmap (bool): Memory-map a local :func:`torch.save` file instead of
+            reading it, tensors are paged in when they are used.
+        skip_mismatched (bool): Skip tensors whose shape differs from the
+            model instead of raising, see :func:`load_state_dict`.
     Returns:
         dict or OrderedDict: The loaded checkpoint.
     """
     # load checkpoint from modelzoo or file or url
-    if filename.startwith('modelzoo://'):
-        from torchvision.models.resnet import model_urls
+    if filename.startswith('modelzoo://'):
+        # torchvision is only needed for model zoo checkpoints
         model_name = filename[11:]
-        checkpoint = model_zoo.load_url(model_urls[model_name])
-    elif filename.startwith(('http://', 'https://')):
-        checkpoint = model_zoo.load_url(filename)
+        try:
+            from torchvision.models.resnet import model_urls
+            url = model_urls[model_name]
+        except ImportError:
+            # torchvision>=0.13 replaced model_urls with weight enums
+            from torchvision.models import get_model_weights
+            url = get_model_weights(model_name).DEFAULT.url
+        # cached files are shared by the jobs of a node, map them
+        with _fetch_weights(url) as local_file:
+            checkpoint = _load_file(local_file, map_location, True)
+    elif filename.startswith(('http://', 'https://')):
+        with _fetch_weights(filename) as local_file:
+            checkpoint = _load_file(local_file, map_location, True)
+    elif not is_local(filename):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_file = osp.join(tmp_dir, osp.basename(filename))
+            get_backend(filename).get_file(filename, local_file)
+            checkpoint = _load_file(local_file, map_location, mmap)
     else:
+        # file:// URIs are plain paths
+        filename = parse_uri(filename)[1]
         if not osp.isfile(filename):
             raise IOError('{} is not a checkpoint file'.format(filename))
-        chekcpoint = torch.load(filename, map_location=map_location)
+        checkpoint = _load_file(filename, map_location, mmap)
 
     # get state_dict from checkpoint
     if isinstance(checkpoint, OrderedDict):
@@ -97,17 +199,66 @@ def load_checkpoint(
             'No state_dict found in checkpoint file {}'.format(filename)
         )
 
-    # strip prefix of state_dict
-    if list(state_dict.keys())[0].startwith('module.'):
-        state_dict = {k[7:]: v for k, v in checkpoint['state_dict'].items()}
+    state_dict = _revise_keys(state_dict, revise_keys)
     # load state_dict
     if hasattr(model, 'module'):
-        load_state_dict(model.module, state_dict, strict, logger)
+        load_state_dict(model.module, state_dict, strict, logger, assign,
+                        skip_mismatched)
     else:
-        load_state_dict(model, state_dict, strict, logger)
+        load_state_dict(model, state_dict, strict, logger, assign,
+                        skip_mismatched)
 
     return checkpoint
 
+@contextlib.contextmanager
+def _fetch_weights(url):
+    """Get the local path of model zoo or http(s) weights, which stays
+    valid until the context exits."""
+    # files downloaded by torch.hub before are used as they are, so they
+    # are not downloaded again and offline jobs keep working
+    filename = osp.join(torch.hub.get_dir(), 'checkpoints',
+                        osp.basename(urlparse(url).path))
+    if osp.isfile(filename):
+        yield filename
+        return
+    with get_weights_cache().pin(url) as filename:
+        yield filename
+
+
+def materialize_module(module, device='cpu'):
+    """Allocate and initialize the tensors a module still has on the meta
+    device, e.g. a new head that was not in the loaded checkpoint.
+    Submodules owning such tensors must define ``reset_parameters``. It runs
+    on scratch copies of the tensors that were loaded, which keep their
+    values, so a partially loaded submodule only initializes the rest.
+    Returns:
+        list[str]: Names of the submodules that were initialized.
+    """
+    initialized = []
+    for name, submodule in module.named_modules():
+        tensors = itertools.chain(submodule.named_parameters(recurse=False),
+                                  submodule.named_buffers(recurse=False))
+        tensors = OrderedDict(tensors)
+        if not any(t.is_meta for t in tensors.values()):
+            continue
+        if not hasattr(submodule, 'reset_parameters'):
+            raise RuntimeError(
+                'module {!r} ({}) was not fully loaded and has no '
+                'reset_parameters() to initialize it'.format(
+                    name, type(submodule).__name__))
+        for key, tensor in tensors.items():
+            empty = torch.empty_like(tensor, device=device)
+            if isinstance(tensor, torch.nn.Parameter):
+                empty = torch.nn.Parameter(empty, tensor.requires_grad)
+            setattr(submodule, key, empty)
+        submodule.reset_parameters()
+        for key, tensor in tensors.items():
+            if not tensor.is_meta:
+                setattr(submodule, key, tensor)
+        initialized.append(name)
+    return initialized
+
+
 def weights_to_cpu(state_dict):
     """Copy a model state_dict to cpu.
     Args:
@@ -121,23 +272,132 @@ def weights_to_cpu(state_dict):
     return state_dict_cpu
 
 
-def save_checkpoint(model, filename, optimizer=None, meta=None):
+# a single writer keeps asynchronous saves ordered
+_save_executor = None
+
+
+def _copy_to_cpu(obj):
+    """Recursively copy the tensors of ``obj`` into new CPU tensors."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    elif isinstance(obj, dict):
+        return type(obj)((k, _copy_to_cpu(v)) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        return type(obj)(_copy_to_cpu(v) for v in obj)
+    return obj
+
+
+def _load_file(filename, map_location=None, mmap=False):
+    try:
+        # compressed checkpoints are recognized by their magic bytes
+        if serialization.is_chunked(filename):
+            return serialization.load(filename, map_location=map_location)
+        # files of the legacy format before torch 1.6 cannot be mapped
+        mmap = mmap and zipfile.is_zipfile(filename)
+        return torch.load(filename, map_location=map_location, mmap=mmap)
+    except Exception as e:
+        # tell a corrupted file apart from an incompatible one
+        errors = verify_checkpoint(filename)
+        if errors:
+            raise IOError('{} is corrupted: {}'.format(
+                filename, '; '.join(errors))) from e
+        raise
+
+
+def _write_checkpoint(checkpoint, filename, link_name=None, compress=None,
+                      manifest=True):
+    if not is_local(filename):
+        _upload_checkpoint(checkpoint, filename, link_name, compress, manifest)
+        return
+    filename = parse_uri(filename)[1]
+    if link_name is not None:
+        link_name = parse_uri(link_name)[1]
+    # write to a temporary file first so that an interrupted save never
+    # leaves a truncated checkpoint behind
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'wb') as f:
+        # the blocks are checksummed while they are written
+        writer = ChecksumWriter(f)
+        if compress:
+            serialization.save(checkpoint, writer, compress)
+        else:
+            torch.save(checkpoint, writer)
+    # the manifest goes first, so a published checkpoint always has one; a
+    # crash in between fails the old file, it never validates a bad one
+    if manifest:
+        write_manifest(filename, writer, checkpoint)
+    os.replace(tmp_filename, filename)
+    if link_name is not None:
+        symlink(filename, link_name)
+
+
+def _upload_checkpoint(checkpoint, uri, link_name, compress, manifest):
+    # written locally first, then uploaded in parallel parts
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        local_file = osp.join(tmp_dir, osp.basename(uri))
+        _write_checkpoint(checkpoint, local_file, None, compress, manifest)
+        backend = get_backend(uri)
+        if manifest:
+            backend.put_file(local_file + MANIFEST_SUFFIX, uri + MANIFEST_SUFFIX)
+        backend.put_file(local_file, uri)
+        if link_name is not None:
+            # object stores have no symlinks, the link is a copy
+            get_backend(link_name).put_file(local_file, link_name)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def save_checkpoint(
+    model,
+    filename,
+    optimizer = None,
+    meta = None,
+    extra = None,
+    link_name = None,
+    async_save = False,
+    compress = None,
+    manifest = True
+):
     """Save checkpoint to file.
     The checkpoint will have 3 fields: ``meta``, ``state_dict`` and
     ``optimizer``. By default ``meta`` will contain version and time info.
     Args:
         model (Module): Module whose params are to be saved.
-        filename (str): Checkpoint filename.
+        filename (str): Checkpoint filename or URI of a storage backend,
+            see :mod:`engine.utils.storage`. Remote checkpoints are written
+            to a temporary file and uploaded in parallel parts.
         optimizer (:obj:`Optimizer`, optional): Optimizer to be saved.
         meta (dict, optional): Metadata to be saved in checkpoint.
+        extra (dict, optional): Additional top-level fields, e.g. the EMA
+            weights. They must not overwrite the fields above.
+        link_name (str, optional): Symlink pointed to the checkpoint once
+            it is completely written, e.g. ``latest.pth``.
+        async_save (bool): Copy the checkpoint to CPU memory and write it
+            in a background thread. Training can continue while the file
+            is written.
+        compress (str, optional): Write a chunked file compressed in
+            parallel, e.g. 'fast' for frequent checkpoints or 'strong' for
+            archival, see :func:`~engine.trainer.serialization.resolve_codec`.
+            :func:`load_checkpoint` detects the format. By default the file
+            is written with :func:`torch.save`.
+        manifest (bool): Write ``<filename>.manifest.json`` with the
+            checksums of the file blocks and of the tensors, used by
+            :func:`~engine.trainer.integrity.verify_checkpoint`.
+    Returns:
+        :obj:`~concurrent.futures.Future` | None: The pending write if
+            ``async_save`` is set.
     """
+    global _save_executor
     if meta is None:
         meta = {}
     elif not isinstance(meta, dict):
         raise TypeError('meta must be a dict or None, but got {}'.format(type(meta)))
     meta.update(time=time.asctime())
 
-    mkdir_or_exist(osp.dirname(filename))
+    if is_local(filename):
+        filename = parse_uri(filename)[1]
+        mkdir_or_exist(osp.dirname(filename))
     if hasattr(model, 'module'):
         model = model.module
 
@@ -148,5 +408,24 @@ def save_checkpoint(model, filename, optimizer=None, meta=None):
 
     if optimizer is not None:
         checkpoint['optimizer'] = optimizer.state_dict()
+    if extra:
+        conflicts = set(extra) & set(checkpoint)
+        if conflicts:
+            raise KeyError('extra fields {} conflict with the checkpoint '
+                           'fields'.format(sorted(conflicts)))
+        checkpoint.update(extra)
 
-    torch.save(checkpoint, filename)
+    if compress:
+        # fail before training continues, not in the background write
+        serialization.resolve_codec(compress)
+    if not async_save:
+        _write_checkpoint(checkpoint, filename, link_name, compress, manifest)
+        return None
+    # the optimizer state and extra fields reference live tensors
+    checkpoint = _copy_to_cpu(checkpoint)
+    if _save_executor is None:
+        _save_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='checkpoint')
+    return _save_executor.submit(
+        _write_checkpoint, checkpoint, filename, link_name, compress,
+        manifest)
@@ -0,0 +1,315 @@
+import contextlib
+import io
+import itertools
+import mmap
+import os
+import os.path as osp
+import pickle
+import shutil
+import struct
+import tempfile
+import uuid
+import weakref
+
+import torch
+from torch.utils.data import DataLoader, Dataset, IterableDataset, Sampler
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+
+def _loader_kwargs(data_loader):
+    kwargs = dict(
+        num_workers=data_loader.num_workers,
+        collate_fn=data_loader.collate_fn,
+        pin_memory=data_loader.pin_memory,
+        timeout=data_loader.timeout,
+        worker_init_fn=data_loader.worker_init_fn,
+        multiprocessing_context=data_loader.multiprocessing_context,
+        generator=data_loader.generator,
+        persistent_workers=data_loader.persistent_workers)
+    if data_loader.num_workers > 0:
+        kwargs['prefetch_factor'] = data_loader.prefetch_factor
+    return kwargs
+
+
+class SkipSampler(Sampler):
+    """Skip the first items of a (batch) sampler without loading them.
+    Iterating the wrapped sampler only produces indices, so the skipped
+    samples are never read or decoded.
+    Args:
+        sampler (Sampler): The sampler or batch sampler to wrap.
+        num_skip (int): Number of leading items to skip.
+    """
+    def __init__(self, sampler, num_skip):
+        self.sampler = sampler
+        self.num_skip = num_skip
+        self._iterator = None
+        self._running = False
+
+    def prime(self):
+        """Start the next iteration of the wrapped sampler now.
+        Random samplers draw their seed when iteration starts, which would
+        otherwise happen when the first batch is requested. Does nothing if
+        an iteration is already primed or running.
+        """
+        if self._iterator is None and not self._running:
+            self._iterator = iter(self.sampler)
+            next(itertools.islice(self._iterator, self.num_skip, self.num_skip), None)
+
+    def __iter__(self):
+        self.prime()
+        iterator, self._iterator = self._iterator, None
+        self._running = True
+        try:
+            yield from iterator
+        finally:
+            self._running = False
+
+    def __len__(self):
+        return max(len(self.sampler) - self.num_skip, 0)
+
+
+def iter_from(data_loader, start):
+    """Iterate a data loader starting at batch ``start``.
+    For map-style datasets the skipped batches are never loaded. The
+    randomness of the sampler and of the worker seeds is drawn, in the same
+    order as by ``iter(data_loader)``, before this function returns; with the
+    global RNG state of the start of the epoch the same batches are produced
+    as in the original epoch. Iterable datasets are read and discarded.
+    Args:
+        data_loader (:obj:`DataLoader`): The data loader.
+        start (int): Index of the first batch.
+    Returns:
+        iterator: Iterator over the batches from ``start`` on.
+    """
+    if start == 0:
+        return iter(data_loader)
+    if isinstance(data_loader.dataset, IterableDataset):
+        iterator = iter(data_loader)
+        next(itertools.islice(iterator, start, start), None)
+        return iterator
+
+    kwargs = _loader_kwargs(data_loader)
+    if data_loader.batch_sampler is not None:
+        sampler = SkipSampler(data_loader.batch_sampler, start)
+        kwargs['batch_sampler'] = sampler
+    else:
+        sampler = SkipSampler(data_loader.sampler, start)
+        kwargs.update(sampler=sampler, batch_size=None)
+    iterator = iter(DataLoader(data_loader.dataset, **kwargs))
+    sampler.prime()
+    return iterator
+
+
+def rebatch_loader(data_loader, batch_size):
+    """Build a copy of a data loader with a different batch size.
+    The dataset, sampler, collate function and worker settings are kept.
+    Args:
+        data_loader (:obj:`DataLoader`): The data loader to copy.
+        batch_size (int): The new batch size.
+    Returns:
+        :obj:`DataLoader`: ``data_loader`` itself if the batch size already
+            matches, otherwise a new data loader.
+    """
+    if data_loader.batch_size == batch_size:
+        return data_loader
+    if data_loader.batch_size is None:
+        raise ValueError(
+            'cannot change the batch size of a data loader built with a '
+            'custom batch_sampler')
+    kwargs = _loader_kwargs(data_loader)
+    kwargs.update(batch_size=batch_size, drop_last=data_loader.drop_last)
+    if not isinstance(data_loader.dataset, IterableDataset):
+        kwargs['sampler'] = data_loader.sampler
+    return DataLoader(data_loader.dataset, **kwargs)
+
+
+# cache file layout: payload length, number of buffers, (offset, length) of
+# each buffer, the pickle payload, then the out-of-band buffers
+_HEADER = struct.Struct('<QI')
+_BUFFER = struct.Struct('<QQ')
+_ALIGN = 64
+
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        # dense cpu tensors are pickled as numpy arrays, whose data protocol
+        # 5 stores out-of-band and can be mapped back without a copy
+        if (type(obj) is torch.Tensor and obj.layout == torch.strided and
+                obj.device.type == 'cpu' and not obj.requires_grad):
+            try:
+                return torch.from_numpy, (obj.numpy(), )
+            except TypeError:  # dtypes numpy does not support
+                pass
+        return NotImplemented
+
+
+def _dump_sample(sample, filename):
+    buffers = []
+    f = io.BytesIO()
+    _Pickler(f, protocol=5, buffer_callback=buffers.append).dump(sample)
+    payload = f.getbuffer()
+    raws = [buffer.raw() for buffer in buffers]
+
+    offset = _HEADER.size + _BUFFER.size * len(raws) + len(payload)
+    table = []
+    for raw in raws:
+        offset = -(-offset // _ALIGN) * _ALIGN
+        table.append((offset, raw.nbytes))
+        offset += raw.nbytes
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(len(payload), len(raws)))
+        for entry in table:
+            f.write(_BUFFER.pack(*entry))
+        f.write(payload)
+        for (offset, _), raw in zip(table, raws):
+            f.seek(offset)
+            f.write(raw)
+    return offset
+
+
+def _load_sample(filename):
+    with open(filename, 'rb') as f:
+        # a private mapping gives writable arrays without copying the data
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(mm)
+    payload_len, num_buffers = _HEADER.unpack_from(view)
+    start = _HEADER.size + _BUFFER.size * num_buffers
+    buffers = []
+    for i in range(num_buffers):
+        offset, nbytes = _BUFFER.unpack_from(view, _HEADER.size + i * _BUFFER.size)
+        buffers.append(view[offset:offset + nbytes])
+    return pickle.loads(view[start:start + payload_len], buffers=buffers)
+
+
+class SharedMemoryCacheDataset(Dataset):
+    """Cache the samples of a map-style dataset in shared memory.
+    On first access a sample is stored as a file in ``cache_dir``, by
+    default a new directory under ``/dev/shm``. Later accesses from any
+    DataLoader worker and any epoch map the file instead of decoding the
+    sample again. Numpy arrays and cpu tensors are stored out-of-band with
+    pickle protocol 5 and come back as views of the mapping, so reading
+    them copies nothing; writes to them stay private to the reader.
+    With ``max_bytes`` the least recently used samples are evicted once the
+    cache would grow beyond the budget. Processes coordinate through a lock
+    file. Wrap the decoding part of the dataset only and pass random
+    augmentations as ``transform``, they run on every access.
+    Args:
+        dataset (:obj:`Dataset`): Map-style dataset to cache.
+        cache_dir (str, optional): Cache directory. Given directories are
+            kept and can be reused by later runs over the same dataset;
+            the default one is removed with this object.
+        max_bytes (int, optional): Byte budget of the cache.
+        transform (callable, optional): Applied to every returned sample.
+    """
+    def __init__(self, dataset, cache_dir=None, max_bytes=None, transform=None):
+        self.dataset = dataset
+        self.max_bytes = max_bytes
+        self.transform = transform
+        self.hits = 0
+        self.misses = 0
+        self._finalizer = None
+        if cache_dir is None:
+            root = '/dev/shm' if osp.isdir('/dev/shm') else tempfile.gettempdir()
+            cache_dir = osp.join(root, 'engine-cache-{}'.format(uuid.uuid4().hex))
+            self._finalizer = weakref.finalize(
+                self, _remove_cache, cache_dir, os.getpid())
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self._lock_file = osp.join(cache_dir, '.lock')
+        self._size_file = osp.join(cache_dir, '.size')
+
+    def __getstate__(self):
+        # workers share the directory but never remove it
+        state = self.__dict__.copy()
+        state.update(_finalizer=None, hits=0, misses=0)
+        return state
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        filename = osp.join(self.cache_dir, str(index))
+        try:
+            sample = _load_sample(filename)
+            self.hits += 1
+            if self.max_bytes is not None:
+                os.utime(filename)  # the mtime orders the lru eviction
+        except FileNotFoundError:
+            sample = self.dataset[index]
+            self.misses += 1
+            self._store(sample, filename)
+        if self.transform is not None:
+            sample = self.transform(sample)
+        return sample
+
+    def cleanup(self):
+        """Remove the cache directory."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _store(self, sample, filename):
+        tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+        try:
+            nbytes = _dump_sample(sample, tmp_filename)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # not picklable, serve it uncached; the pickler fails before
+            # the file is created
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_filename)
+            return
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            os.remove(tmp_filename)
+            return
+        with open(self._lock_file, 'a+b') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if osp.exists(filename):
+                # stored by another worker meanwhile
+                os.remove(tmp_filename)
+                return
+            size = self._read_size()
+            if self.max_bytes is not None and size + nbytes > self.max_bytes:
+                size = self._evict(self.max_bytes - nbytes)
+            os.replace(tmp_filename, filename)
+            self._write_size(size + nbytes)
+
+    def _read_size(self):
+        try:
+            with open(self._size_file, 'rb') as f:
+                return struct.unpack('<Q', f.read(8))[0]
+        except (FileNotFoundError, struct.error):
+            return 0
+
+    def _write_size(self, size):
+        with open(self._size_file, 'wb') as f:
+            f.write(struct.pack('<Q', size))
+
+    def _evict(self, target):
+        """Remove the least recently used samples until at most ``target``
+        bytes are cached; returns the cached bytes."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith('.') or entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        for _, nbytes, path in entries:
+            if size <= target:
+                break
+            # readers keep their mappings of removed files
+            os.remove(path)
+            size -= nbytes
+        return size
+
+
+def _remove_cache(cache_dir, pid):
+    if os.getpid() == pid:
+        shutil.rmtree(cache_dir, ignore_errors=True)
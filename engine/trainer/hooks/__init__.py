@@ -1,13 +1,26 @@
 from .hook import HOOKS, Hook
+from .async_val import AsyncValHook
+from .best_model import BestModelHook
 from .checkpoint import CheckpointHook
 from .lr_updater import LrUpdaterHook
 from .momentum_updater import MomentumUpdaterHook
 from .optimizer import OptimizerHook
 from .iter_timer import IterTimerHook
-from .logger import (LoggerHook, TextLoggerHook, WandBLoggerHook, PetfinderLoggerHook)
+from .memory import MemoryMonitorHook
+from .logger import LoggerHook, TextLoggerHook
 from .earlystopping import EarlyStoppingHook
+from .ema import EMAHook
+from . import logger as _logger
 
 
+def __getattr__(name):
+    # logger backends registered lazily in .logger
+    if name in _logger._LAZY_HOOKS:
+        return getattr(_logger, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+# the lazy logger backends are left out, a star import would import them
 __all__ = [
-   'HOOKS', 'Hook', 'CheckpointHook', 'LrUpdaterHook', 'MomentumUpdaterHook', 'OptimizerHook', 'IterTimerHook', 'EarlyStoppingHook', 'LoggerHook', 'TextLoggerHook', 'WandBLoggerHook', 'PetfinderLoggerHook'
+   'HOOKS', 'Hook', 'AsyncValHook', 'BestModelHook', 'CheckpointHook', 'LrUpdaterHook', 'MomentumUpdaterHook', 'OptimizerHook', 'IterTimerHook', 'MemoryMonitorHook', 'EarlyStoppingHook', 'EMAHook', 'LoggerHook', 'TextLoggerHook'
 ]
@@ -0,0 +1,154 @@
+import copy
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+
+from .hook import HOOKS, Hook
+from ..log_buffer import LogBuffer
+from ..utils import inference_mode, master_only
+
+# set once per worker process by ``_init_worker``
+_worker_args = {}
+
+
+def _init_worker(batch_processor, data_loader, kwargs, num_threads):
+    torch.set_num_threads(num_threads)
+    _worker_args.update(
+        batch_processor=batch_processor, data_loader=data_loader,
+        kwargs=kwargs)
+
+
+def _val_worker(model):
+    batch_processor = _worker_args['batch_processor']
+    kwargs = _worker_args['kwargs']
+    log_buffer = LogBuffer([])
+    model.eval()
+    with inference_mode():
+        for data_batch in _worker_args['data_loader']:
+            outputs = batch_processor(
+                model, data_batch, train_mode=False, **kwargs)
+            if not isinstance(outputs, dict):
+                raise TypeError('batch_processor() must return a dict')
+            if 'log_vars' in outputs:
+                log_buffer.update(outputs['log_vars'], outputs['num_samples'])
+    log_buffer.average()
+    return dict(log_buffer.output)
+
+
+@HOOKS.register_module()
+class AsyncValHook(Hook):
+    """Run validation in a process pool while training continues.
+    Every ``interval`` epochs (or iterations) the current weights are copied
+    into a CPU snapshot of the model, which is evaluated in a worker process
+    on CPU. Torch moves the snapshot to shared memory the first time it is
+    sent, so later evaluations do not copy the weights again. A new
+    evaluation is only started once the previous one has finished; the
+    snapshot is never modified while a worker reads it.
+    When the results arrive they are placed in ``trainer.log_buffer.output``
+    with ``trainer.mode`` set to ``'val'`` and ``after_async_val`` is called
+    on all hooks, e.g. loggers and :class:`EarlyStoppingHook`. The previous
+    output of the log buffer is restored afterwards.
+    The batch processor, the data loader and ``val_kwargs`` are pickled into
+    the workers, so they must be picklable (module level functions).
+    Args:
+        data_loader (:obj:`DataLoader`): Validation data loader.
+        interval (int): Validation interval in epochs or iterations.
+            Default: 1.
+        by_epoch (bool): Whether ``interval`` counts epochs or iterations.
+            Default: True.
+        num_threads (int): Torch threads of the worker process. Default: 1.
+        mp_context (str): Multiprocessing start method. Default: 'spawn'.
+        wait_at_end (bool): Wait for the evaluation in flight in
+            ``after_run`` and report its results. Default: True.
+        val_kwargs (dict, optional): Keyword arguments for the batch
+            processor.
+    """
+    def __init__(
+        self,
+        data_loader,
+        interval = 1,
+        by_epoch = True,
+        num_threads = 1,
+        mp_context = 'spawn',
+        wait_at_end = True,
+        val_kwargs = None
+    ):
+        self.data_loader = data_loader
+        self.interval = interval
+        self.by_epoch = by_epoch
+        self.num_threads = num_threads
+        self.mp_context = mp_context
+        self.wait_at_end = wait_at_end
+        self.val_kwargs = val_kwargs or {}
+        self.executor = None
+        self.future = None
+        self.snapshot = None
+
+    @master_only
+    def before_run(self, trainer):
+        model = trainer.model
+        if hasattr(model, 'module'):
+            model = model.module
+        self.snapshot = copy.deepcopy(model).cpu()
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=mp.get_context(self.mp_context),
+            initializer=_init_worker,
+            initargs=(trainer.batch_processor, self.data_loader,
+                      self.val_kwargs, self.num_threads))
+
+    def _submit(self, trainer):
+        if self.future is not None:
+            if not self.future.done():
+                trainer.logger.warning(
+                    'asynchronous validation is still running, skip the '
+                    'evaluation at epoch %d, iter %d',
+                    trainer.epoch + 1, trainer.iter + 1)
+                return
+            self._report(trainer)
+        model = trainer.model
+        if hasattr(model, 'module'):
+            model = model.module
+        self.snapshot.load_state_dict(model.state_dict())
+        self.future = self.executor.submit(_val_worker, self.snapshot)
+
+    def _report(self, trainer):
+        future, self.future = self.future, None
+        try:
+            metrics = future.result()
+        except Exception:
+            trainer.logger.exception('asynchronous validation failed')
+            return
+        log_buffer = trainer.log_buffer
+        output, ready, mode = log_buffer.output, log_buffer.ready, trainer.mode
+        log_buffer.output = metrics
+        log_buffer.ready = True
+        trainer.mode = 'val'
+        try:
+            trainer.call_hook('after_async_val')
+        finally:
+            log_buffer.output, log_buffer.ready = output, ready
+            trainer.mode = mode
+
+    @master_only
+    def after_train_iter(self, trainer):
+        if self.future is not None and self.future.done():
+            self._report(trainer)
+        if not self.by_epoch and self.every_n_iters(trainer, self.interval):
+            self._submit(trainer)
+
+    @master_only
+    def after_train_epoch(self, trainer):
+        if self.by_epoch and self.every_n_epcohs(trainer, self.interval):
+            self._submit(trainer)
+
+    @master_only
+    def after_run(self, trainer):
+        if self.future is not None:
+            if self.wait_at_end:
+                self._report(trainer)
+            else:
+                self.future.cancel()
+        self.executor.shutdown(wait=self.wait_at_end)
+        self.executor = None
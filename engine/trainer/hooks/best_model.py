@@ -0,0 +1,125 @@
+import os.path as osp
+import time
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from .hook import HOOKS, Hook
+from ..checkpoint import load_state_dict
+from ..utils import master_only
+from ...utils.path import mkdir_or_exist
+
+@HOOKS.register_module()
+class BestModelHook(Hook):
+    """Keep the best weights in memory and write them to disk rarely.
+    The weights are copied in place into a CPU buffer that is allocated once
+    in ``before_run`` (pinned if CUDA is available), so a new best model
+    costs a device-to-host copy but neither an allocation nor disk I/O.
+    The snapshot is written to ``out_dir/filename`` every ``save_interval``
+    epochs if it changed, and at the end of the run.
+    The metric is checked in ``after_val_epoch``, so the hook must be
+    registered after the logger hooks (priority 'VERY_LOW') that average
+    the validation outputs; results of
+    :class:`AsyncValHook` are not used because they belong to older weights.
+    Args:
+        monitor (str): Key of ``trainer.log_buffer.output`` to monitor.
+        mode (str): One of {auto, min, max}, see :class:`EarlyStoppingHook`.
+        min_delta (float): Minimum change that counts as an improvement.
+        out_dir (str, optional): Output directory, the work dir by default.
+        filename (str): Filename of the best checkpoint. Default: 'best.pth'.
+        save_interval (int): Write the snapshot every k epochs if it changed,
+            -1 to only write at the end of the run. Default: -1.
+        restore_best (bool): Copy the best weights back into the model in
+            ``after_run``. Default: False.
+    """
+    def __init__(
+        self,
+        monitor = 'val_loss',
+        mode = 'auto',
+        min_delta = 0.,
+        out_dir = None,
+        filename = 'best.pth',
+        save_interval = -1,
+        restore_best = False
+    ):
+        if mode not in ['auto', 'min', 'max']:
+            raise ValueError('mode must be one of "auto", "min" or "max", '
+                             'but got {}'.format(mode))
+        if mode == 'auto':
+            mode = 'max' if 'acc' in monitor else 'min'
+        self.monitor = monitor
+        self.monitor_op = np.greater if mode == 'max' else np.less
+        self.min_delta = min_delta if mode == 'max' else -min_delta
+        self.out_dir = out_dir
+        self.filename = filename
+        self.save_interval = save_interval
+        self.restore_best = restore_best
+        self.buffer = None
+
+    def _model(self, trainer):
+        model = trainer.model
+        return model.module if hasattr(model, 'module') else model
+
+    def before_run(self, trainer):
+        pin_memory = torch.cuda.is_available()
+        self.buffer = OrderedDict(
+            (name, torch.empty(
+                tensor.shape, dtype=tensor.dtype, pin_memory=pin_memory))
+            for name, tensor in self._model(trainer).state_dict().items())
+        self.best = np.inf if self.monitor_op == np.less else -np.inf
+        self.best_epoch = None
+        self.best_iter = None
+        self.dirty = False
+        if not self.out_dir:
+            self.out_dir = trainer.work_dir
+
+    def after_val_epoch(self, trainer):
+        current = trainer.log_buffer.output.get(self.monitor)
+        if current is None:
+            trainer.logger.warning(
+                'BestModelHook monitors `%s` which is not available',
+                self.monitor)
+            return
+        if not self.monitor_op(current - self.min_delta, self.best):
+            return
+        self.best = current
+        self.best_epoch = trainer.epoch
+        self.best_iter = trainer.iter
+        self.dirty = True
+        self._copy(self._model(trainer).state_dict().values(),
+                   self.buffer.values())
+
+    def after_train_epoch(self, trainer):
+        if self.dirty and self.every_n_epcohs(trainer, self.save_interval):
+            self.save(trainer)
+
+    def after_run(self, trainer):
+        if self.dirty:
+            self.save(trainer)
+        if self.restore_best and self.best_epoch is not None:
+            load_state_dict(self._model(trainer), self.buffer, logger=trainer.logger)
+            trainer.logger.info(
+                'restored the best weights of epoch %d (%s = %s)',
+                self.best_epoch, self.monitor, self.best)
+
+    def _copy(self, src, dst):
+        src, dst = list(src), list(dst)
+        if hasattr(torch, '_foreach_copy_'):
+            torch._foreach_copy_(dst, src)
+        else:
+            for d, s in zip(dst, src):
+                d.copy_(s)
+
+    @master_only
+    def save(self, trainer):
+        """Write the in-memory snapshot to disk."""
+        if not self.out_dir:
+            raise ValueError('BestModelHook needs out_dir or a trainer work_dir')
+        mkdir_or_exist(self.out_dir)
+        filename = osp.join(self.out_dir, self.filename)
+        meta = dict(epoch=self.best_epoch, iter=self.best_iter,
+                    monitor=self.monitor, best=float(self.best),
+                    time=time.asctime())
+        torch.save(dict(meta=meta, state_dict=self.buffer), filename)
+        self.dirty = False
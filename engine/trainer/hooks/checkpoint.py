@@ -1,31 +1,174 @@
+import signal
+import threading
+import time
+
 from .hook import HOOKS, Hook
 from ..utils import master_only
 
 @HOOKS.register_module
 class CheckpointHook(Hook):
+    """Save checkpoints periodically and when the job is preempted.
+    Args:
+        interval (int): Save every ``interval`` epochs, or iterations if
+            ``by_epoch`` is False. Disabled if not positive.
+        by_epoch (bool): Whether ``interval`` counts epochs or iterations.
+        time_interval (float, optional): Also save when this many seconds of
+            wall-clock time have passed since the last checkpoint.
+        save_optimizer (bool): Whether to save the optimizer state.
+        out_dir (str, optional): Checkpoint directory, the work dir of the
+            trainer by default.
+        signals (tuple[str]): Signals that request a checkpoint and a clean
+            stop. The current iteration is finished first, then an emergency
+            checkpoint is written and training stops. During validation the
+            checkpoint is written after the current batch and the signal is
+            raised again with the previous handler, which ends the process
+            by default. Each rank has to receive the signal, as with SLURM
+            and torchrun. Pass an empty tuple to keep the default handlers.
+        async_save (bool): Write checkpoints in a background thread, see
+            :func:`~engine.trainer.checkpoint.save_checkpoint`. At most one
+            write is pending at a time and ``after_run`` waits for it.
+        compress (str | dict, optional): Compression of the checkpoints,
+            see :func:`~engine.trainer.checkpoint.save_checkpoint`. A dict
+            selects it per kind: ``'iter'`` for iteration, time and
+            emergency checkpoints and ``'epoch'`` for epoch checkpoints, e.g.
+            ``dict(iter='fast', epoch='strong')``.
+    """
     def __init__(
         self,
         interval = -1,
+        by_epoch = True,
+        time_interval = None,
         save_optimizer = True,
         out_dir = None,
+        signals = ('SIGTERM', 'SIGUSR1'),
+        async_save = False,
+        compress = None,
         **kwargs
     ):
         self.interval = interval
+        self.by_epoch = by_epoch
+        self.time_interval = time_interval
         self.save_optimizer = save_optimizer
         self.out_dir = out_dir
+        self.signals = [getattr(signal, name) if isinstance(name, str) else name
+                        for name in signals]
+        self.async_save = async_save
+        if not isinstance(compress, dict):
+            compress = dict(iter=compress, epoch=compress)
+        self.compress = compress
         self.args = kwargs
+        self._saved_iter = None
+        self._last_save_time = None
+        self._pending = None
+        self._prev_handlers = {}
+        self._received_signal = None
+        self._stopped = False
+
+    def _handle_signal(self, signum, frame):
+        # only set a flag, the checkpoint is written after the current step
+        self._received_signal = signum
+
+    def before_run(self, trainer):
+        self._last_save_time = time.monotonic()
+        self._received_signal = None
+        self._stopped = False
+        # handlers can only be installed from the main thread, and without
+        # a directory there is nowhere to save to
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if not (self.out_dir or trainer.work_dir):
+            return
+        for signum in self.signals:
+            self._prev_handlers[signum] = signal.signal(
+                signum, self._handle_signal)
+
+    def _stop(self, trainer, num_iters):
+        if self._stopped:
+            return
+        self._stopped = True
+        trainer.logger.warning(
+            'received %s, saving a checkpoint and stopping at iter %d',
+            signal.Signals(self._received_signal).name, num_iters)
+        if self._saved_iter != num_iters:
+            self._save(trainer, f'iter_{num_iters}', num_iters)
+        trainer.stop_training = True
+
+    def _reraise(self, trainer):
+        # validation does not check ``stop_training``, hand the signal to
+        # the previous handler once the state is saved
+        self._wait(trainer)
+        signum = self._received_signal
+        for prev_signum, handler in self._prev_handlers.items():
+            signal.signal(prev_signum, handler)
+        self._prev_handlers.clear()
+        signal.raise_signal(signum)
+
+    def after_train_iter(self, trainer):
+        if self._received_signal is not None:
+            self._stop(trainer, trainer.iter + 1)
+            return
+
+        if not self.by_epoch and self.every_n_iters(trainer, self.interval):
+            self._save(trainer, f'iter_{trainer.iter + 1}', trainer.iter + 1)
+        elif (self.time_interval is not None and
+              time.monotonic() - self._last_save_time >= self.time_interval):
+            self._save(trainer, f'iter_{trainer.iter + 1}', trainer.iter + 1)
 
-    @master_only
     def after_train_epoch(self, trainer):
-        if not self.every_n_epcohs(trainer, self.interval):
+        if self._received_signal is not None:
+            self._stop(trainer, trainer.iter)
+            return
+        if not self.by_epoch or not self.every_n_epcohs(trainer, self.interval):
+            return
+        if self._saved_iter == trainer.iter:
+            return
+        self._save(trainer, f'epoch_{trainer.epoch}', trainer.iter)
+
+    def after_val_iter(self, trainer):
+        if self._received_signal is not None and self._prev_handlers:
+            self._stop(trainer, trainer.iter)
+            self._reraise(trainer)
+
+    def after_val_epoch(self, trainer):
+        self.after_val_iter(trainer)
+
+    def after_run(self, trainer):
+        # training was stopped early, keep the last state
+        if trainer.stop_training and self._saved_iter != trainer.iter:
+            self._save(trainer, f'iter_{trainer.iter}', trainer.iter)
+        self._wait(trainer)
+        for signum, handler in self._prev_handlers.items():
+            signal.signal(signum, handler)
+        self._prev_handlers.clear()
+        if self._received_signal is not None:
+            trainer.logger.info(
+                'stopped by %s, resume from the latest checkpoint',
+                signal.Signals(self._received_signal).name)
+
+    def _wait(self, trainer):
+        if self._pending is None:
             return
+        try:
+            self._pending.result()
+        except Exception:
+            trainer.logger.exception('failed to write checkpoint')
+        self._pending = None
 
+    @master_only
+    def _save(self, trainer, suffix, num_iters):
+        """Save a checkpoint after ``num_iters`` finished iterations."""
         if not self.out_dir:
             self.out_dir = trainer.work_dir
 
-        trainer.save_checkpoint(
+        self._saved_iter = num_iters
+        self._last_save_time = time.monotonic()
+        # bound the memory held by snapshots that are not written yet
+        self._wait(trainer)
+        self._pending = trainer.save_checkpoint(
             out_dir = self.out_dir,
-            filename_tmpl = f'{trainer.config.model.name}_epoch_{trainer.epoch}',
+            filename_tmpl = f'{trainer.config.model.name}_{suffix}',
             save_optimizer=self.save_optimizer,
+            async_save=self.async_save,
+            compress=self.compress.get(suffix.split('_')[0]),
             **self.args
         )
@@ -1,16 +1,32 @@
+import math
+import os.path as osp
+
 import numpy as np
+import torch
+
 from .hook import HOOKS, Hook
+from ..checkpoint import load_checkpoint
 
 @HOOKS.register_module()
 class EarlyStoppingHook(Hook):
-    """Stop training when a monitored quantity has stopped improving.
+    """Stop training when the monitored quantities have stopped improving.
+    The check runs after every validation, i.e. in `after_val_epoch` and in
+    `after_async_val`, so validating every N iterations with `AsyncValHook`
+    gives iteration-level early stopping.
+    Training is stopped through `trainer.stop_training`: the current epoch
+    is left after the running iteration and `after_run` hooks (e.g.
+    `CheckpointHook`) still run.
     # Arguments
-        monitor: quantity to be monitored.
+        monitor: quantity or list of quantities to be monitored. Looked up
+            in `trainer.log_buffer.output` first and then in
+            `trainer.throughput`, e.g. 'samples_per_sec'. With several
+            quantities, a check counts as an improvement if any of them
+            improved.
         min_delta: minimum change in the monitored quantity
             to qualify as an improvement, i.e. an absolute
             change of less than min_delta, will count as no
-            improvement.
-        patience: number of epochs with no improvement
+            improvement. Either one value or one per monitored quantity.
+        patience: number of checks with no improvement
             after which training will be stopped.
         verbose: verbosity mode.
         mode: one of {auto, min, max}. In `min` mode,
@@ -20,6 +36,25 @@ class EarlyStoppingHook(Hook):
             monitored has stopped increasing; in `auto`
             mode, the direction is automatically inferred
             from the name of the monitored quantity.
+            Either one value or one per monitored quantity.
+        divergence_key: key of `trainer.outputs` checked for divergence
+            after every training iteration, None to disable the check.
+        divergence_threshold: the loss is considered diverged if it is not
+            finite or larger than `divergence_threshold` times the lowest
+            loss seen so far. None only checks for NaN/inf.
+        divergence_patience: number of consecutive diverged iterations
+            before acting. Non-finite losses act immediately.
+        divergence_interval: the losses are kept on their device and
+            fetched together every `divergence_interval` iterations and at
+            the end of each epoch, so the check does not synchronize with
+            the device every iteration. Divergence is noticed up to
+            `divergence_interval - 1` iterations late.
+        on_divergence: one of {stop, rollback}. `rollback` restores model
+            and optimizer from the latest checkpoint in `rollback_dir` (the
+            work dir by default) and continues training, falling back to
+            `stop` when no checkpoint exists or `max_rollbacks` is reached.
+        max_rollbacks: maximum number of rollbacks per run.
+        rollback_dir: directory that contains `latest.pth`.
     """
 
     def __init__(
@@ -28,62 +63,169 @@ class EarlyStoppingHook(Hook):
         min_delta=0.0, 
         patience=0, 
         verbose=0, 
-        mode='auto'
+        mode='auto',
+        divergence_key='loss',
+        divergence_threshold=None,
+        divergence_patience=3,
+        divergence_interval=10,
+        on_divergence='stop',
+        max_rollbacks=1,
+        rollback_dir=None
     ):
         super(EarlyStoppingHook, self).__init__()
 
-        self.monitor = monitor
+        self.monitors = [monitor] if isinstance(monitor, str) else list(monitor)
+        num_monitors = len(self.monitors)
+        modes = [mode] * num_monitors if isinstance(mode, str) else list(mode)
+        min_deltas = ([min_delta] * num_monitors
+                      if isinstance(min_delta, (int, float)) else list(min_delta))
+        assert len(modes) == len(min_deltas) == num_monitors, \
+            '"mode" and "min_delta" must have one value per monitored quantity'
+        if on_divergence not in ['stop', 'rollback']:
+            raise ValueError('on_divergence must be "stop" or "rollback", '
+                             'but got {}'.format(on_divergence))
+
         self.patience = patience
         self.verbose = verbose
-        self.min_delta = min_delta
+        self.divergence_key = divergence_key
+        self.divergence_threshold = divergence_threshold
+        self.divergence_patience = divergence_patience
+        self.divergence_interval = divergence_interval
+        self.on_divergence = on_divergence
+        self.max_rollbacks = max_rollbacks
+        self.rollback_dir = rollback_dir
         self.wait = 0
         self.stopped_epoch = 0
 
-        if mode not in ['auto', 'min', 'max']:
-            print('EarlyStopping mode %s is unknown, fallback to auto mode.' % mode)
-            mode = 'auto'
+        self.monitor_ops = []
+        self.min_deltas = []
+        for monitor, mode, min_delta in zip(self.monitors, modes, min_deltas):
+            if mode not in ['auto', 'min', 'max']:
+                print('EarlyStopping mode %s is unknown, fallback to auto mode.' % mode)
+                mode = 'auto'
 
-        if mode == 'min':
-            self.monitor_op = np.less
-        elif mode == 'max':
-            self.monitor_op = np.greater
-        else:
-            if 'acc' in self.monitor:
-                self.monitor_op = np.greater
+            if mode == 'min':
+                monitor_op = np.less
+            elif mode == 'max':
+                monitor_op = np.greater
             else:
-                self.monitor_op = np.less
+                if 'acc' in monitor:
+                    monitor_op = np.greater
+                else:
+                    monitor_op = np.less
 
-        if self.monitor_op == np.greater:
-            self.min_delta *= 1
-        else:
-            self.min_delta *= -1
+            self.monitor_ops.append(monitor_op)
+            self.min_deltas.append(min_delta if monitor_op == np.greater else -min_delta)
 
     def before_run(self, trainer):
         # Allow instances to be re-used
         self.wait = 0
         self.stopped_epoch = 0
-        self.best = np.Inf if self.monitor_op == np.less else -np.Inf
+        self.best = [np.inf if op == np.less else -np.inf for op in self.monitor_ops]
+        self.lowest_loss = math.inf
+        self.num_diverged = 0
+        self.num_rollbacks = 0
+        self._losses = []
 
-    def after_val_epoch(self, trainer):
-        epoch = trainer.epoch
-        current = trainer.log_buffer.output.get(self.monitor)
-        stop_training = False
+    def _get_metric(self, trainer, key):
+        current = trainer.log_buffer.output.get(key)
         if current is None:
-            print('Early stopping conditioned on metric `%s` ''which is not available. Available metrics are: %s' %
-                (self.monitor, ','.join(list(trainer.log_buffer.output.keys()))), RuntimeWarning
-            )
-            exit(-1)
+            current = trainer.throughput.get(key)
+        return current
+
+    def after_val_epoch(self, trainer):
+        improved = False
+        num_found = 0
+        for i, monitor in enumerate(self.monitors):
+            current = self._get_metric(trainer, monitor)
+            if current is None:
+                trainer.logger.warning(
+                    'Early stopping conditioned on metric `%s` which is not '
+                    'available. Available metrics are: %s', monitor,
+                    ','.join(list(trainer.log_buffer.output.keys())))
+                continue
+            num_found += 1
+            if self.monitor_ops[i](current - self.min_deltas[i], self.best[i]):
+                self.best[i] = current
+                improved = True
+        if num_found == 0:
+            return
 
-        if self.monitor_op(current - self.min_delta, self.best):
-            self.best = current
+        if improved:
             self.wait = 0
         else:
             self.wait += 1
             if self.wait >= self.patience:
-                self.stopped_epoch = epoch
-                stop_training = True
+                self.stopped_epoch = trainer.epoch
+                trainer.stop_training = True
+
+    def after_async_val(self, trainer):
+        self.after_val_epoch(trainer)
+
+    def after_train_iter(self, trainer):
+        if self.divergence_key is None:
+            return
+        loss = trainer.outputs.get(self.divergence_key)
+        if loss is None:
+            return
+        if torch.is_tensor(loss):
+            # float() here would wait for the device every iteration
+            loss = loss.detach().float().reshape(())
+        else:
+            loss = torch.tensor(float(loss))
+        self._losses.append((trainer.iter, loss))
+        if len(self._losses) >= self.divergence_interval:
+            self._check_divergence(trainer)
+
+    def after_train_epoch(self, trainer):
+        if self._losses:
+            self._check_divergence(trainer)
+
+    def _check_divergence(self, trainer):
+        # one transfer for all losses since the last check
+        iters, losses = zip(*self._losses)
+        losses = torch.stack(losses).tolist()
+        self._losses = []
+        for iter, loss in zip(iters, losses):
+            if not math.isfinite(loss):
+                # the weights are likely broken already, do not wait
+                self.num_diverged = self.divergence_patience
+            elif (self.divergence_threshold is not None
+                  and loss > self.divergence_threshold * self.lowest_loss):
+                self.num_diverged += 1
+            else:
+                self.num_diverged = 0
+                self.lowest_loss = min(self.lowest_loss, loss)
+            if self.num_diverged >= self.divergence_patience:
+                break
+        else:
+            return
+
+        trainer.logger.warning(
+            'Training diverged at epoch %d, iter %d: %s = %s',
+            trainer.epoch + 1, iter + 1, self.divergence_key, loss)
+        self.num_diverged = 0
+        if self.on_divergence == 'rollback' and self._rollback(trainer):
+            return
+        self.stopped_epoch = trainer.epoch
+        trainer.stop_training = True
 
-        trainer.stop_training = stop_training
+    def _rollback(self, trainer):
+        if self.num_rollbacks >= self.max_rollbacks:
+            return False
+        rollback_dir = self.rollback_dir or trainer.work_dir
+        filename = osp.join(rollback_dir or '', 'latest.pth')
+        if not osp.isfile(filename):
+            trainer.logger.warning('No checkpoint to roll back to at %s', filename)
+            return False
+        # only the weights and the optimizer are restored, the iteration
+        # counters keep going so the batches that diverged are skipped
+        checkpoint = load_checkpoint(trainer.model, filename, 'cpu', logger=trainer.logger)
+        if 'optimizer' in checkpoint and trainer.optimizer is not None:
+            trainer.optimizer.load_state_dict(checkpoint['optimizer'])
+        self.num_rollbacks += 1
+        trainer.logger.info('Rolled back to %s', filename)
+        return True
 
     def after_run(self, trainer):
         if self.stopped_epoch > 0 and self.verbose > 0:
@@ -0,0 +1,138 @@
+import math
+
+import torch
+
+from .hook import HOOKS, Hook
+from ..checkpoint import weights_to_cpu
+
+@torch.no_grad()
+def _foreach_copy(dst, src):
+    if hasattr(torch, '_foreach_copy_'):
+        torch._foreach_copy_(dst, src)
+    else:
+        for d, s in zip(dst, src):
+            d.copy_(s)
+
+@HOOKS.register_module()
+class EMAHook(Hook):
+    """Exponential moving average of the model weights.
+    ``ema = decay * ema + (1 - decay) * weight`` is applied to all floating
+    point tensors of the model state dict with one fused
+    ``torch._foreach_lerp_`` call (``_foreach_mul_``/``_foreach_add_`` on
+    older torch) instead of a Python loop over parameters. Other tensors,
+    e.g. ``num_batches_tracked``, are copied.
+    The EMA weights are saved as ``ema_state_dict`` next to ``state_dict``
+    in checkpoints and restored by :meth:`Trainer.resume`.
+    Args:
+        decay (float): EMA decay per iteration. Default: 0.9999.
+        interval (int): Update every k iterations. ``decay ** interval`` is
+            used so the averaging horizon stays the same. Default: 1.
+        warmup_iters (int): Ramp the decay up as
+            ``decay * (1 - exp(-updates / warmup_iters))`` so the EMA is not
+            dominated by the initial weights. 0 disables warmup. Default: 0.
+        swap_for_val (bool): Evaluate the EMA weights in val epochs. The
+            training weights are restored before the next train epoch, a
+            checkpoint or the end of the run, so the ``after_val_epoch``
+            hooks of every priority, e.g. :class:`BestModelHook`, still see
+            the EMA weights. Default: True.
+    """
+    def __init__(self, decay=0.9999, interval=1, warmup_iters=0, swap_for_val=True):
+        assert 0 < decay < 1, '"decay" must be in range (0, 1)'
+        assert interval > 0, '"interval" must be a positive integer'
+        self.decay = decay
+        self.interval = interval
+        self.warmup_iters = warmup_iters
+        self.swap_for_val = swap_for_val
+        self.num_updates = 0
+        self.ema_state_dict = None
+        self._resume_state = None
+
+    def before_run(self, trainer):
+        model = trainer.model
+        if hasattr(model, 'module'):
+            model = model.module
+        self.src_state_dict = model.state_dict()
+        self.ema_state_dict = type(self.src_state_dict)(
+            (name, tensor.detach().clone())
+            for name, tensor in self.src_state_dict.items())
+        if self._resume_state is not None:
+            ema_state_dict, self.num_updates = self._resume_state
+            for name, tensor in ema_state_dict.items():
+                self.ema_state_dict[name].copy_(tensor)
+            self._resume_state = None
+
+        self._src_float, self._ema_float = [], []
+        self._src_other, self._ema_other = [], []
+        for name, tensor in self.src_state_dict.items():
+            if tensor.is_floating_point():
+                self._src_float.append(tensor)
+                self._ema_float.append(self.ema_state_dict[name])
+            else:
+                self._src_other.append(tensor)
+                self._ema_other.append(self.ema_state_dict[name])
+        self._backup = None
+        self._swapped = False
+
+    def get_decay(self):
+        decay = self.decay ** self.interval
+        if self.warmup_iters > 0:
+            decay *= 1 - math.exp(-self.num_updates * self.interval / self.warmup_iters)
+        return decay
+
+    @torch.no_grad()
+    def after_train_iter(self, trainer):
+        if not self.every_n_iters(trainer, self.interval):
+            return
+        self.num_updates += 1
+        weight = 1 - self.get_decay()
+        if hasattr(torch, '_foreach_lerp_'):
+            torch._foreach_lerp_(self._ema_float, self._src_float, weight)
+        else:
+            torch._foreach_mul_(self._ema_float, 1 - weight)
+            torch._foreach_add_(self._ema_float, self._src_float, alpha=weight)
+        for ema, src in zip(self._ema_other, self._src_other):
+            ema.copy_(src)
+
+    def _swap(self):
+        if self._swapped:
+            return
+        if self._backup is None:
+            self._backup = [torch.empty_like(tensor) for tensor in self._src_float]
+        _foreach_copy(self._backup, self._src_float)
+        _foreach_copy(self._src_float, self._ema_float)
+        self._swapped = True
+
+    def _restore(self):
+        if self._swapped:
+            _foreach_copy(self._src_float, self._backup)
+            self._swapped = False
+
+    def before_val_epoch(self, trainer):
+        if self.swap_for_val:
+            self._swap()
+
+    def before_train_epoch(self, trainer):
+        self._restore()
+
+    def after_run(self, trainer):
+        self._restore()
+
+    def before_save_checkpoint(self, trainer, checkpoint):
+        # the checkpoint holds the training weights
+        self._restore()
+        if self.ema_state_dict is None:
+            return
+        checkpoint['ema_state_dict'] = weights_to_cpu(self.ema_state_dict)
+        checkpoint['ema_num_updates'] = self.num_updates
+
+    def after_load_checkpoint(self, trainer, checkpoint):
+        if 'ema_state_dict' not in checkpoint:
+            return
+        state = (checkpoint['ema_state_dict'], checkpoint.get('ema_num_updates', 0))
+        if self.ema_state_dict is None:
+            # the EMA weights are allocated in before_run
+            self._resume_state = state
+        else:
+            for name, tensor in state[0].items():
+                self.ema_state_dict[name].copy_(tensor)
+            self.num_updates = state[1]
@@ -2,7 +2,84 @@ from ...utils.registry import Registry
 
 HOOKS = Registry('hook')
 
+# stages dispatched with ``Trainer.call_hook``
+STAGES = ('before_run', 'after_run', 'before_train_epoch', 'before_val_epoch',
+          'after_train_epoch', 'after_val_epoch', 'before_train_iter',
+          'before_val_iter', 'after_train_iter', 'after_val_iter',
+          'after_async_val')
+
+# stages whose default implementation forwards to a generic method
+_GENERIC_STAGES = {
+    'before_train_epoch': 'before_epoch', 'before_val_epoch': 'before_epoch',
+    'after_train_epoch': 'after_epoch', 'after_val_epoch': 'after_epoch',
+    'before_train_iter': 'before_iter', 'before_val_iter': 'before_iter',
+    'after_train_iter': 'after_iter', 'after_val_iter': 'after_iter',
+}
+
+
+def _overlaps(keys, other_keys):
+    # 'log_buffer' covers 'log_buffer.output'
+    for key in keys:
+        for other in other_keys:
+            if (key == other or key.startswith(other + '.') or
+                    other.startswith(key + '.')):
+                return True
+    return False
+
+
 class Hook(object):
+    """Base class of hooks.
+    Hooks may declare the trainer state they access in ``reads`` and
+    ``writes``, as dotted names such as ``'lr'``, ``'log_buffer'`` or
+    ``'log_buffer.output'``, either as an iterable for all stages or as a
+    dict mapping stage names to iterables, with ``'*'`` for the remaining
+    stages. ``None`` means unknown. Adjacent hooks with ``concurrent = True``
+    whose declarations do not conflict in a stage are run together on a
+    thread pool by the trainer, e.g. several loggers doing slow I/O.
+    """
+    reads = None
+    writes = None
+    concurrent = False
+
+    def declared(self, name, stage):
+        """Get the keys of ``reads`` or ``writes`` for a stage.
+        Returns:
+            tuple[str] | None: The keys, None if unknown.
+        """
+        keys = getattr(self, name)
+        if isinstance(keys, dict):
+            keys = keys.get(stage, keys.get('*'))
+        if keys is None:
+            return None
+        if isinstance(keys, str):
+            keys = (keys, )
+        keys = tuple(keys)
+        if not all(isinstance(key, str) for key in keys):
+            raise TypeError('{}.{} must contain str keys, but got {}'.format(
+                type(self).__name__, name, keys))
+        return keys
+
+    def conflicts(self, other, stage):
+        """Whether running this hook and ``other`` concurrently in a stage
+        may give a different result than running them in order."""
+        reads, writes = self.declared('reads', stage), self.declared('writes', stage)
+        other_reads = other.declared('reads', stage)
+        other_writes = other.declared('writes', stage)
+        if None in (reads, writes, other_reads, other_writes):
+            return True
+        return (_overlaps(writes, other_reads + other_writes) or
+                _overlaps(other_writes, reads))
+
+    def is_noop(self, stage):
+        """Whether the hook keeps the do-nothing default of a stage."""
+        if stage in vars(self):
+            return False
+        cls = type(self)
+        if getattr(cls, stage, None) is not getattr(Hook, stage, None):
+            return False
+        generic = _GENERIC_STAGES.get(stage)
+        return generic is None or getattr(cls, generic) is getattr(Hook, generic)
+
     def before_run(self, trainer):
         pass
 
@@ -45,6 +122,17 @@ class Hook(object):
     def after_val_iter(self, trainer):
         self.after_iter(trainer)
 
+    def after_async_val(self, trainer):
+        pass
+
+    def before_save_checkpoint(self, trainer, checkpoint):
+        """Add entries to the dict of extra checkpoint fields."""
+        pass
+
+    def after_load_checkpoint(self, trainer, checkpoint):
+        """Restore state from a checkpoint loaded by ``Trainer.resume``."""
+        pass
+
     def every_n_epcohs(self, trainer, n):
         return (trainer.epoch + 1) % n == 0 if n > 0 else False
 
@@ -52,7 +140,7 @@ class Hook(object):
         return (trainer.inner_iter + 1) % n == 0 if n > 0 else False
 
     def every_n_iters(self, trainer, n):
-        return (trainer.iters + 1) % n == 0 if n > 0 else False
+        return (trainer.iter + 1) % n == 0 if n > 0 else False
 
     def end_of_epoch(self, trainer):
         return trainer.inner_iter + 1 == len(trainer.data_loader)
@@ -1,15 +1,99 @@
 import time
 
+import torch
+
 from .hook import HOOKS, Hook
 
 @HOOKS.register_module()
 class IterTimerHook(Hook):
+    """Record data loading time and iteration time.
+
+    Timestamps are taken with :func:`time.perf_counter_ns`, which is
+    monotonic and has nanosecond resolution. CUDA kernels are launched
+    asynchronously, so without a device synchronization the measured time
+    only covers the kernel launches of the step; ``sync_device`` waits for
+    the device before each timestamp so that ``time`` covers execution.
+    The synchronization stalls the launch queue, so it is meant for
+    profiling runs rather than enabled by default.
+
+    Args:
+        sync_device (bool): Synchronize the current CUDA device before taking
+            a timestamp. Ignored when CUDA is not available. Default: False.
+        percentiles (tuple[float]): Percentiles of ``time`` and ``data_time``
+            reported over each logging window as ``time_p50`` etc.
+            Use an empty tuple to only report the mean. Default: (50, 95, 99).
+        stats (bool): Also keep streaming statistics of ``time`` over the
+            epoch, see :meth:`LogBuffer.track_stats`. They are reported as
+            ``time_std``, ``time_max``, ``time_q99`` etc. and can be merged
+            across ranks. Default: False.
+
+    During training the hook also accounts throughput: ``iters_per_sec``,
+    ``samples_per_sec`` (from ``outputs['num_samples']``) and
+    ``tokens_per_sec`` (from ``outputs['num_tokens']`` if the batch processor
+    returns it) are pushed to the log buffer, and the rates since the start
+    of the run together with the estimated time remaining (``eta``, seconds)
+    are kept in ``trainer.throughput``.
+    """
+    reads = ('outputs', )
+    writes = ('log_buffer', 'throughput')
+
+    def __init__(self, sync_device=False, percentiles=(50, 95, 99), stats=False):
+        self.sync_device = sync_device and torch.cuda.is_available()
+        self.percentiles = tuple(percentiles)
+        self.stats = stats
+
+    def _now(self):
+        if self.sync_device:
+            torch.cuda.synchronize()
+        return time.perf_counter_ns()
+
+    def before_run(self, trainer):
+        self._run_time = 0.
+        self._run_iters = 0
+        self._run_samples = 0
+        self._run_tokens = 0
+        if self.percentiles:
+            trainer.log_buffer.track_percentiles('time', self.percentiles)
+            trainer.log_buffer.track_percentiles('data_time', self.percentiles)
+        if self.stats:
+            trainer.log_buffer.track_stats('time', self.percentiles or (50, 95, 99))
+
     def before_epoch(self, trainer):
-        self.t = time.time()
+        self.t = self._now()
 
     def before_iter(self, trainer):
-        trainer.log_buffer.update({'data_time': time.time() - self.t})
+        trainer.log_buffer.update({'data_time': (self._now() - self.t) * 1e-9})
 
     def after_iter(self, trainer):
-        trainer.log_buffer.update({'time': time.time() - self.t})
-        self.t = time.time()
+        t = self._now()
+        self.iter_time = (t - self.t) * 1e-9
+        trainer.log_buffer.update({'time': self.iter_time})
+        self.t = t
+
+    def after_train_iter(self, trainer):
+        self.after_iter(trainer)
+        iter_time = max(self.iter_time, 1e-9)
+        outputs = trainer.outputs
+        rates = {'iters_per_sec': 1. / iter_time}
+        self._run_time += iter_time
+        self._run_iters += 1
+        if 'num_samples' in outputs:
+            num_samples = float(outputs['num_samples'])
+            rates['samples_per_sec'] = num_samples / iter_time
+            self._run_samples += num_samples
+        if 'num_tokens' in outputs:
+            num_tokens = float(outputs['num_tokens'])
+            rates['tokens_per_sec'] = num_tokens / iter_time
+            self._run_tokens += num_tokens
+        # weighting each rate by the iteration time makes the windowed
+        # average equal to the work done divided by the time it took
+        trainer.log_buffer.update(rates, iter_time)
+
+        throughput = trainer.throughput
+        throughput['iters_per_sec'] = self._run_iters / self._run_time
+        if self._run_samples:
+            throughput['samples_per_sec'] = self._run_samples / self._run_time
+        if self._run_tokens:
+            throughput['tokens_per_sec'] = self._run_tokens / self._run_time
+        remaining_iters = max(trainer.max_iters - trainer.iter - 1, 0)
+        throughput['eta'] = remaining_iters * self._run_time / self._run_iters
@@ -1,8 +1,23 @@
+from ..hook import HOOKS
 from .base import LoggerHook
 from .text import TextLoggerHook
-from .wandb import WandBLoggerHook
-from .petfinder import PetfinderLoggerHook
 
-__all__ = [
-    'LoggerHook', 'TextLoggerHook', 'WandBLoggerHook', 'PetfinderLoggerHook'
-]
+# backends with optional or slow to import dependencies are only imported
+# when they are used
+_LAZY_HOOKS = {
+    'WandBLoggerHook': __name__ + '.wandb:WandBLoggerHook',
+    'PetfinderLoggerHook': __name__ + '.custom:PetfinderLoggerHook',
+    'PrometheusExporterHook': __name__ + '.prometheus:PrometheusExporterHook',
+}
+for _name, _path in _LAZY_HOOKS.items():
+    HOOKS.register_lazy(_name, _path)
+
+
+def __getattr__(name):
+    if name in _LAZY_HOOKS:
+        return HOOKS.get(name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+# the lazy backends are left out, a star import would import them
+__all__ = ['LoggerHook', 'TextLoggerHook']
@@ -1,3 +1,5 @@
+import math
+import time
 from abc import ABCMeta, abstractmethod
 
 from ..hook import Hook
@@ -10,43 +12,130 @@ class LoggerHook(Hook):
         ignore_last (bool): Ignore the log of last iterations in each epoch
             if less than `interval`.
         reset_flag (bool): Whether to clear the output buffer after logging.
+        interval_seconds (float, optional): Log every ``interval_seconds``
+            of wall-clock time instead of every ``interval`` iterations.
+            The logged values are averaged over the iterations since the
+            last log. The time is measured per process.
+        overhead_budget (float, optional): Fraction of the training time
+            logging may take, e.g. 0.01. When logging costs more, the
+            interval is raised until it fits the budget, and lowered again
+            down to ``interval`` when logging becomes cheap.
     """
 
     __metaclass__ = ABCMeta
 
-    def __init__(self, interval=10, ignore_last=True, reset_flag=False):
+    # loggers only read the trainer state, except for clearing the log
+    # buffer at the start of an epoch and, for the last logger, the output
+    # after logging. Subclasses that are safe to run next to other loggers
+    # set ``concurrent = True``.
+    reads = ('log_buffer', 'lr', 'momentum', 'throughput')
+
+    @property
+    def writes(self):
+        return {
+            'before_run': ('hooks', ),
+            'before_train_epoch': ('log_buffer', ),
+            'before_val_epoch': ('log_buffer', ),
+            '*': ('log_buffer.output', ) if self.reset_flag else (),
+        }
+
+    def __init__(self, interval=10, ignore_last=True, reset_flag=False,
+                 interval_seconds=None, overhead_budget=None):
         self.interval = interval
         self.ignore_last = ignore_last
         self.reset_flag = reset_flag
+        self.interval_seconds = interval_seconds
+        self.overhead_budget = overhead_budget
+        self.base_interval = interval
+        self._iters_since_log = 0
+        self._last_log_time = None
+        self._last_iter_time = None
+        self._step_time = None
+        self._log_cost = 0.
 
     @abstractmethod
     def log(self, trainer):
         pass
 
     def before_run(self, trainer):
-        for hook in trainer.hooks[::-1]:
-            if isinstance(hook, LoggerHook):
-                hook.reset_flag = True
-                break
+        loggers = [hook for hook in trainer.hooks if isinstance(hook, LoggerHook)]
+        loggers[-1].reset_flag = True
+        # concurrent loggers share the averaged output, so they must
+        # average the same window
+        if (self.interval_seconds is not None or
+                self.overhead_budget is not None or
+                any(hook.interval != self.interval or
+                    hook.interval_seconds is not None or
+                    hook.overhead_budget is not None for hook in loggers)):
+            self.concurrent = False
 
     def before_train_epoch(self, trainer):
         trainer.log_buffer.clear()  # clear logs of last epoch
+        self._iters_since_log = 0
+        self._last_log_time = self._last_iter_time = time.perf_counter()
 
     def before_val_epoch(self, trainer):
         trainer.log_buffer.clear()  # clear logs of last epoch
         self.log(trainer)
 
+    def _update_step_time(self):
+        now = time.perf_counter()
+        if self._last_iter_time is not None:
+            # the previous log is not part of the step
+            step_time = max(now - self._last_iter_time - self._log_cost, 0.)
+            if self._step_time is None:
+                self._step_time = step_time
+            else:
+                self._step_time = 0.9 * self._step_time + 0.1 * step_time
+        self._last_iter_time = now
+        self._log_cost = 0.
+        return now
+
+    def _adapt_interval(self, trainer):
+        if not self._step_time:
+            return
+        # iterations after which this log cost stays within the budget
+        needed = self._log_cost / (self.overhead_budget * self._step_time)
+        interval = self.interval
+        if needed > self.interval:
+            interval = math.ceil(needed)
+        elif needed < self.interval / 4:
+            interval = max(self.base_interval, self.interval // 2)
+        if interval != self.interval:
+            trainer.logger.debug(
+                '%s: logging takes %.2g s per %.2g s step, interval %d -> %d',
+                type(self).__name__, self._log_cost, self._step_time,
+                self.interval, interval)
+            self.interval = interval
+
     def after_train_iter(self, trainer):
-        if self.every_n_inner_iters(trainer, self.interval):
-            trainer.log_buffer.average(self.interval)
-        elif self.end_of_epoch(trainer) and not self.ignore_last:
-            # not precise but more stable
-            trainer.log_buffer.average(self.interval)
+        if self.interval_seconds is None and self.overhead_budget is None:
+            if self.every_n_inner_iters(trainer, self.interval):
+                trainer.log_buffer.average(self.interval)
+            elif self.end_of_epoch(trainer) and not self.ignore_last:
+                # not precise but more stable
+                trainer.log_buffer.average(self.interval)
+        else:
+            now = self._update_step_time()
+            self._iters_since_log += 1
+            if self.interval_seconds is not None:
+                due = now - self._last_log_time >= self.interval_seconds
+            else:
+                due = self._iters_since_log >= self.interval
+            if due or (self.end_of_epoch(trainer) and not self.ignore_last):
+                trainer.log_buffer.average(self._iters_since_log)
 
         if trainer.log_buffer.ready:
+            start = time.perf_counter()
             self.log(trainer)
             if self.reset_flag:
                 trainer.log_buffer.clear_output()
+            end = time.perf_counter()
+            self._iters_since_log = 0
+            self._last_log_time = end
+            self._log_cost = end - start
+            if self.overhead_budget is not None:
+                self._adapt_interval(trainer)
 
     def after_train_epoch(self, trainer):
         if trainer.log_buffer.ready:
@@ -57,3 +146,6 @@ class LoggerHook(Hook):
     def after_val_epoch(self, trainer):
         trainer.log_buffer.average()
         self.log(trainer)
+
+    def after_async_val(self, trainer):
+        self.log(trainer)
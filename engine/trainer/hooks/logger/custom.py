@@ -1,7 +1,9 @@
 import torch
-import wandb
+from ..hook import HOOKS
 from .base import LoggerHook
+from .wandb import import_wandb
 
+@HOOKS.register_module()
 class PetfinderLoggerHook(LoggerHook):
 
     def log(self, trainer):
@@ -13,7 +15,7 @@ class PetfinderLoggerHook(LoggerHook):
             log_str = 'Epoch [{}][{}/{}]\tlr: {}, '.format(
                 trainer.epoch + 1, trainer.inner_iter + 1,
                 len(trainer.data_loader), lr_str)
-            wandb.log(
+            self.wandb.log(
                 {
                     'lr': float(lr_str),
                     'momentum': float(momentum_str),
@@ -34,10 +36,10 @@ class PetfinderLoggerHook(LoggerHook):
                 wandb_log_buffer['train_{}'.format(name)] = val
             log_str += ', '.join(log_items)
             trainer.logger.info(log_str)
-            wandb.log(wandb_log_buffer)
+            self.wandb.log(wandb_log_buffer)
         else:
             log_str = 'Epoch({}) [{}][{}]\t'.format(trainer.mode, trainer.epoch, trainer.inner_iter + 1)
-            wandb.log(
+            self.wandb.log(
                 {
                     'val_epoch': trainer.epoch + 1,
                 }
@@ -56,15 +58,13 @@ class PetfinderLoggerHook(LoggerHook):
                 wandb_log_buffer['val_{}'.format(name)] = val
             log_str += ', '.join(log_items)
             trainer.logger.info(log_str)
-            wandb.log(wandb_log_buffer)
+            self.wandb.log(wandb_log_buffer)
 
     def before_run(self, trainer):
-        for hook in trainer.hooks[::-1]:
-            if isinstance(hook, LoggerHook):
-                hook.reset_flag = True
-                break
-        wandb.init(config=trainer.config, project=trainer.config.name, entity="shawndong98")
-        wandb.watch(trainer.model, log_freq=self.interval)
+        self.wandb = import_wandb()
+        super().before_run(trainer)
+        self.wandb.init(config=trainer.config, project=trainer.config.name, entity="shawndong98")
+        self.wandb.watch(trainer.model, log_freq=self.interval)
 
     def before_train_epoch(self, trainer):
         trainer.log_buffer.clear()  # clear logs of last epoch
@@ -0,0 +1,163 @@
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import torch
+
+from ..hook import HOOKS
+from .base import LoggerHook
+from ...utils import get_rss_bytes
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        # a reference to the last rendered snapshot, never waits on training
+        body = self.server.metrics
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _format_value(value):
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+@HOOKS.register_module()
+class PrometheusExporterHook(LoggerHook):
+    """Serve the latest training metrics in the Prometheus text format.
+    On rank 0 an HTTP server thread is started in ``before_run`` and serves
+    ``/metrics``. Every log renders a new snapshot of the averaged log
+    buffer output (``{prefix}_log_<key>`` per mode), the throughput, the lr and momentum of each
+    param group, the epoch and iteration counts and the memory usage, and
+    swaps it in with a single assignment. Scrapes only read the current
+    snapshot, so they never block training and training never waits for
+    them. ``{prefix}_last_log_timestamp_seconds`` shows stalled jobs.
+    Args:
+        port (int): Port of the server, 0 picks a free one. If the port is
+            taken, e.g. by another job of the node, a free one is used and
+            logged. Training never fails because of the server.
+            Default: 9400.
+        host (str): Address to bind to. Default: all interfaces.
+        prefix (str): Prefix of the metric names. Default: 'engine'.
+        **kwargs: Arguments of :class:`LoggerHook`, e.g. ``interval``.
+    """
+    concurrent = True
+
+    def __init__(self, port=9400, host='', prefix='engine', **kwargs):
+        super().__init__(**kwargs)
+        self.port = port
+        self.host = host
+        self.prefix = prefix
+        self.server = None
+        self._thread = None
+        # mode -> latest log buffer output
+        self._outputs = {}
+
+    def _name(self, name):
+        name = re.sub(r'[^a-zA-Z0-9_:]', '_', '{}_{}'.format(self.prefix, name))
+        return '_' + name if name[0].isdigit() else name
+
+    def _bind(self, trainer):
+        # the port may be taken, e.g. by another job of the node
+        for port in ([self.port, 0] if self.port else [0]):
+            try:
+                return ThreadingHTTPServer((self.host, port), _MetricsHandler)
+            except OSError as e:
+                trainer.logger.warning(
+                    'cannot serve metrics on port %d: %s', port, e)
+        return None
+
+    def before_run(self, trainer):
+        super().before_run(trainer)
+        if trainer.rank != 0:
+            return
+        self.server = self._bind(trainer)
+        if self.server is None:
+            trainer.logger.warning('metrics are not exported')
+            return
+        self.server.daemon_threads = True
+        self.server.metrics = self.render(trainer)
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name='prometheus-exporter',
+            daemon=True)
+        self._thread.start()
+        trainer.logger.info('serving metrics on http://%s:%d/metrics',
+                            self.host or '0.0.0.0', self.server.server_address[1])
+
+    def after_run(self, trainer):
+        if self.server is not None:
+            self.server.metrics = self.render(trainer)
+            self.server.shutdown()
+            self.server.server_close()
+            self._thread.join()
+            self.server = None
+
+    def log(self, trainer):
+        if self.server is None:
+            return
+        output = {}
+        for key, value in trainer.log_buffer.output.items():
+            try:
+                output[key] = float(value)
+            except (TypeError, ValueError):
+                continue
+        if output:
+            self._outputs[trainer.mode] = output
+        self.server.metrics = self.render(trainer)
+
+    def render(self, trainer):
+        """Render the current metrics in the Prometheus text format."""
+        metrics = {}
+
+        def add(name, value, labels=''):
+            metrics.setdefault(self._name(name), []).append(
+                (labels, float(value)))
+
+        for mode, output in self._outputs.items():
+            for key, value in output.items():
+                # a namespace of their own, keys such as lr or epoch would
+                # collide with the gauges below
+                add('log_' + key, value, 'mode="{}"'.format(mode))
+        for key, value in trainer.throughput.items():
+            add('throughput_' + ('eta_seconds' if key == 'eta' else key), value)
+        add('epoch', trainer.epoch)
+        add('iter', trainer.iter)
+        add('inner_iter', trainer.inner_iter)
+        add('max_iters', trainer.max_iters)
+        if trainer.optimizer is not None:
+            for i, lr in enumerate(trainer.current_lr()):
+                add('lr', lr, 'group="{}"'.format(i))
+            momentums = trainer.current_momentum()
+            if isinstance(momentums, list):
+                for i, momentum in enumerate(momentums):
+                    add('momentum', momentum, 'group="{}"'.format(i))
+        add('memory_rss_bytes', get_rss_bytes())
+        if torch.cuda.is_available() and torch.cuda.is_initialized():
+            add('cuda_memory_allocated_bytes', torch.cuda.memory_allocated())
+            add('cuda_memory_reserved_bytes', torch.cuda.memory_reserved())
+            add('cuda_max_memory_allocated_bytes', torch.cuda.max_memory_allocated())
+        add('last_log_timestamp_seconds', time.time())
+
+        lines = []
+        for name, samples in metrics.items():
+            lines.append('# TYPE {} gauge'.format(name))
+            for labels, value in samples:
+                lines.append('{}{} {}'.format(
+                    name, '{' + labels + '}' if labels else '',
+                    _format_value(value)))
+        return ('\n'.join(lines) + '\n').encode()
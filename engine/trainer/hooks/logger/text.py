@@ -1,7 +1,12 @@
+import datetime
+
+from ..hook import HOOKS
 from .base import LoggerHook
 
 
+@HOOKS.register_module()
 class TextLoggerHook(LoggerHook):
+    concurrent = True
 
     def log(self, trainer):
         if trainer.mode == 'train':
@@ -13,6 +18,9 @@ class TextLoggerHook(LoggerHook):
         else:
             log_str = 'Epoch({}) [{}][{}]\t'.format(trainer.mode, trainer.epoch,
                                                     trainer.inner_iter + 1)
+        if trainer.mode == 'train' and 'eta' in trainer.throughput:
+            eta_str = str(datetime.timedelta(seconds=int(trainer.throughput['eta'])))
+            log_str += 'eta: {}, '.format(eta_str)
         if 'time' in trainer.log_buffer.output:
             log_str += (
                 'time: {log[time]:.3f}, data_time: {log[data_time]:.3f}, '.
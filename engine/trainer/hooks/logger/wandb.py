@@ -1,37 +1,45 @@
-import wandb
 from ...utils import master_only
+from ..hook import HOOKS
 from .base import LoggerHook
 
 
+def import_wandb():
+    """Import wandb on first use, it takes seconds to import."""
+    try:
+        import wandb
+    except ImportError:
+        raise ImportError(
+            "WandB is not installed. Please install WandB to use this hook."
+        )
+    return wandb
+
+
+@HOOKS.register_module()
 class WandBLoggerHook(LoggerHook):
+    concurrent = True
+
     def __init__(
         self,
         init_kwargs = None,
         interval = 10,
         ignore_last = True,
-        reset_flag = True
+        reset_flag = True,
+        interval_seconds = None,
+        overhead_budget = None
     ):
-        super().__init__(interval, ignore_last, reset_flag)
+        super().__init__(interval, ignore_last, reset_flag, interval_seconds,
+                         overhead_budget)
         self.import_wandb()
         self.init_kwargs = init_kwargs
 
     def import_wandb(self):
-        try:
-            import wandb
-        except ImportError:
-            raise ImportError(
-                "WandB is not installed. Please install WandB to use this hook."
-            )
-        self.wandb = wandb
+        self.wandb = import_wandb()
 
     @master_only
     def before_run(self, trainer):
-        for hook in trainer.hooks[::-1]:
-            if isinstance(hook, LoggerHook):
-                hook.reset_flag = True
-                break
-        wandb.init(config=trainer.config, project=trainer.config.name, entity="shawndong98")
-        wandb.watch(trainer.model, log_freq=self.interval)
+        super().before_run(trainer)
+        self.wandb.init(config=trainer.config, project=trainer.config.name, entity="shawndong98")
+        self.wandb.watch(trainer.model, log_freq=self.interval)
 
     @master_only
     def log(self, trainer):
@@ -41,7 +49,7 @@ class WandBLoggerHook(LoggerHook):
             log_str = 'Epoch [{}][{}/{}]\tlr: {}, '.format(
                 trainer.epoch + 1, trainer.inner_iter + 1,
                 len(trainer.data_loader), lr_str)
-            wandb.log(
+            self.wandb.log(
                 {
                     'lr': float(lr_str),
                     'train_epoch': trainer.epoch + 1,
@@ -61,10 +69,10 @@ class WandBLoggerHook(LoggerHook):
                 wandb_log_buffer['train_{}'.format(name)] = val
             log_str += ', '.join(log_items)
             trainer.logger.info(log_str)
-            wandb.log(wandb_log_buffer)
+            self.wandb.log(wandb_log_buffer)
         else:
             log_str = 'Epoch({}) [{}][{}]\t'.format(trainer.mode, trainer.epoch, trainer.inner_iter + 1)
-            wandb.log(
+            self.wandb.log(
                 {
                     'val_epoch': trainer.epoch + 1,
                 }
@@ -83,4 +91,4 @@ class WandBLoggerHook(LoggerHook):
                 wandb_log_buffer['val_{}'.format(name)] = val
             log_str += ', '.join(log_items)
             trainer.logger.info(log_str)
-            wandb.log(wandb_log_buffer)
+            self.wandb.log(wandb_log_buffer)
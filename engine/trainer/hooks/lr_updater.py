@@ -19,6 +19,9 @@ class LrUpdaterHook(Hook):
             means the number of epochs that warmup lasts, otherwise means the
             number of iteration that warmup lasts
     """
+    reads = ('optimizer', )
+    writes = ('lr', )
+
     def __init__(
         self,
         by_epoch = True,
@@ -54,6 +57,27 @@ class LrUpdaterHook(Hook):
 
         self.base_lr = []  # initial lr for all param groups
         self.regular_lr = [] # expected lr if no warming up is performed
+        self._resume_state = None
+
+    def state_dict(self):
+        state = dict(base_lr=self.base_lr, regular_lr=self.regular_lr,
+                     warmup_iters=self.warmup_iters,
+                     warmup_epochs=self.warmup_epochs)
+        if hasattr(self, 'lr_phases'):
+            state['lr_phases'] = self.lr_phases
+        return state
+
+    def load_state_dict(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def before_save_checkpoint(self, trainer, checkpoint):
+        checkpoint.setdefault('hook_states', {})[type(self).__name__] = self.state_dict()
+
+    def after_load_checkpoint(self, trainer, checkpoint):
+        # applied in the first before_train_epoch, after before_run has
+        # initialized the hook
+        self._resume_state = checkpoint.get('hook_states', {}).get(type(self).__name__)
 
     def _set_lr(self, trainer, lr_groups):
         for param_group, lr in zip(trainer.optimizer.param_groups, lr_groups):
@@ -86,6 +110,9 @@ class LrUpdaterHook(Hook):
         ]
 
     def before_train_epoch(self, trainer):
+        if self._resume_state is not None:
+            self.load_state_dict(self._resume_state)
+            self._resume_state = None
         if self.warmup_iters is None:
             epoch_len = len(trainer.data_loader)
             self.warmup_iters = self.warmup_epochs * epoch_len
@@ -109,14 +136,8 @@ class LrUpdaterHook(Hook):
             if self.warmup is None and cur_iter > self.warmup_iters:
                 return
             elif cur_iter >= self.warmup_iters:
-                print("Im in 1")
-                print("cur_iter:", cur_iter)
-                print("warmup_iters:", self.warmup_iters)
                 self._set_lr(trainer, self.regular_lr)
             else:
-                print("I'm in 2")
-                print("cur_iter:", cur_iter)
-                print("warmup_iters:", self.warmup_iters)
                 warmup_lr = self.get_warmup_lr(cur_iter)
                 self._set_lr(trainer, warmup_lr)
 
@@ -155,7 +176,7 @@ class StepLrUpdaterHook(LrUpdaterHook):
         super(StepLrUpdaterHook, self).__init__(**kwargs)
 
     def get_lr(self, trainer, base_lr):
-        progress = trainer.epoch if self.by_epoch else trainer.step
+        progress = trainer.epoch if self.by_epoch else trainer.iter
 
         if isinstance(self.step, int):
             return base_lr * (self.gamma ** (progress // self.step))
@@ -186,9 +207,9 @@ class PolyLrUpdaterHook(LrUpdaterHook):
     def get_lr(self, trainer, base_lr):
         if self.by_epoch:
             progress = trainer.epoch
-            max_progress = trainer.max_epoch
+            max_progress = trainer.max_epochs
         else:
-            progres = trainer.iter
+            progress = trainer.iter
             max_progress = trainer.max_iters
 
         return base_lr * (1 - progress / max_progress) ** self.power
@@ -341,6 +362,7 @@ class CyclicLrUpdaterHook(LrUpdaterHook):
         # total lr_phases are separated as up and down
         max_iter_per_phase = trainer.max_iters // self.cyclic_times
         iter_up_phase = int(self.step_ratio_up * max_iter_per_phase)
+        self.lr_phases = []
         self.lr_phases.append(
             [0, iter_up_phase, max_iter_per_phase, 1, self.target_ratio[0]])
         self.lr_phases.append([
@@ -461,6 +483,7 @@ class OneCycleLrUpdaterHook(LrUpdaterHook):
             for group, lr in zip(trainer.optimizer.param_groups, self.base_lr):
                 group.setdefault('initial_lr', lr)
 
+        self.lr_phases = []
         if self.three_phase:
             self.lr_phases.append(
                 [float(self.pct_start * total_steps) - 1, 1, self.div_factor])
@@ -487,6 +510,25 @@ class OneCycleLrUpdaterHook(LrUpdaterHook):
             start_iter = end_iter
         return lr
 
+def get_position_from_periods(iteration, cumulative_periods):
+    """Get the position from a period list.
+    It will return the index of the right-closest number in the period list.
+    For example, the cumulative_periods = [100, 200, 300, 400],
+    if iteration == 50, return 0;
+    if iteration == 210, return 2;
+    if iteration == 300, return 3.
+    Args:
+        iteration (int): Current iteration.
+        cumulative_periods (list[int]): Cumulative period list.
+    Returns:
+        int: The position of the right-closest number in the period list.
+    """
+    for i, period in enumerate(cumulative_periods):
+        if iteration < period:
+            return i
+    raise ValueError(f'Current iteration {iteration} exceeds '
+                     f'cumulative_periods {cumulative_periods}')
+
 def annealing_cos(start, end, factor, weight=1):
     """Calculate annealing cos learning rate.
     Cosine anneal from `weight * start + (1 - weight) * end` to `end` as
@@ -0,0 +1,85 @@
+import tracemalloc
+
+import torch
+
+from .hook import HOOKS, Hook
+from ..utils import get_rss_bytes
+
+_MB = 1024 * 1024
+
+@HOOKS.register_module()
+class MemoryMonitorHook(Hook):
+    """Sample memory usage and push it to the log buffer.
+    The following values (in MB) are logged: ``rss_mb`` for the process,
+    ``py_heap_mb``/``py_heap_peak_mb`` if ``trace_python`` is set and
+    ``cuda_alloc_mb``/``cuda_peak_mb``/``cuda_reserved_mb`` for the torch
+    CUDA caching allocator. Peaks are reset after every sample, so each
+    sample reports the peak of its own window.
+    Args:
+        interval (int): Sample every k training iterations. Use the logging
+            interval to get one sample per logging window. Default: 10.
+        trace_python (bool): Trace Python heap allocations with
+            :mod:`tracemalloc`. This slows down allocation-heavy Python code
+            noticeably. Default: False.
+        growth_threshold (float): Warn when the RSS at the end of an epoch
+            has grown by more than this ratio compared to the end of the
+            first epoch. Default: 0.2.
+    """
+    def __init__(self, interval=10, trace_python=False, growth_threshold=0.2):
+        self.interval = interval
+        self.trace_python = trace_python
+        self.growth_threshold = growth_threshold
+        self.epoch_rss = []
+        self.last_sample = {}
+        self._started_tracing = False
+
+    def _cuda_tracked(self):
+        return torch.cuda.is_available() and torch.cuda.is_initialized()
+
+    def sample(self):
+        """Return the current memory usage as a dict of MB values."""
+        mem = {'rss_mb': get_rss_bytes() / _MB}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            mem['py_heap_mb'] = current / _MB
+            mem['py_heap_peak_mb'] = peak / _MB
+        if self._cuda_tracked():
+            mem['cuda_alloc_mb'] = torch.cuda.memory_allocated() / _MB
+            mem['cuda_peak_mb'] = torch.cuda.max_memory_allocated() / _MB
+            mem['cuda_reserved_mb'] = torch.cuda.memory_reserved() / _MB
+        return mem
+
+    def reset_peaks(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        if self._cuda_tracked():
+            torch.cuda.reset_peak_memory_stats()
+
+    def before_run(self, trainer):
+        if self.trace_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.epoch_rss = []
+        self.reset_peaks()
+
+    def after_train_iter(self, trainer):
+        if not self.every_n_inner_iters(trainer, self.interval):
+            return
+        self.last_sample = self.sample()
+        trainer.log_buffer.update(self.last_sample)
+        self.reset_peaks()
+
+    def after_train_epoch(self, trainer):
+        rss = get_rss_bytes()
+        self.epoch_rss.append(rss)
+        growth = rss / self.epoch_rss[0] - 1
+        if growth > self.growth_threshold:
+            trainer.logger.warning(
+                'RSS grew by %.1f%% since the end of the first epoch '
+                '(%.1f MB -> %.1f MB), memory may be leaking',
+                growth * 100, self.epoch_rss[0] / _MB, rss / _MB)
+
+    def after_run(self, trainer):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
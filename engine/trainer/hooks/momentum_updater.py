@@ -2,6 +2,9 @@ from .hook import HOOKS, Hook
 from .lr_updater import annealing_cos, annealing_linear, format_param
 
 class MomentumUpdaterHook(Hook):
+    reads = ('optimizer', )
+    writes = ('momentum', )
+
     def __init__(
         self, 
         by_epoch=True, 
@@ -26,7 +29,27 @@ class MomentumUpdaterHook(Hook):
         self.warmup_ratio = warmup_ratio
 
         self.base_momentum = []
-        self.regular_momentum = []
+        self.regular_mom = []
+        self._resume_state = None
+
+    def state_dict(self):
+        state = dict(base_momentum=self.base_momentum,
+                     regular_mom=self.regular_mom)
+        if hasattr(self, 'momentum_phases'):
+            state['momentum_phases'] = self.momentum_phases
+        return state
+
+    def load_state_dict(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def before_save_checkpoint(self, trainer, checkpoint):
+        checkpoint.setdefault('hook_states', {})[type(self).__name__] = self.state_dict()
+
+    def after_load_checkpoint(self, trainer, checkpoint):
+        # applied in the first before_train_epoch, after before_run has
+        # initialized the hook
+        self._resume_state = checkpoint.get('hook_states', {}).get(type(self).__name__)
 
     def _set_momentum(self, trainer, momentum_groups):
         for param_group, mom in zip(trainer.optimizer.param_groups, momentum_groups):
@@ -48,7 +71,7 @@ class MomentumUpdaterHook(Hook):
         if self.warmup == 'constant':
             warmup_momentum = [
                 _momentum / self.warmup_ratio
-                for _momentum in self.regular_momentum
+                for _momentum in self.regular_mom
             ]
         elif self.warmup == 'linear':
             k = (1 - cur_iters / self.warmup_iters) * (1 - self.warmup_ratio)
@@ -77,6 +100,9 @@ class MomentumUpdaterHook(Hook):
         ]
 
     def before_train_epoch(self, trainer):
+        if self._resume_state is not None:
+            self.load_state_dict(self._resume_state)
+            self._resume_state = None
         if not self.by_epoch:
             return
         self.regular_mom = self.get_regular_momentum(trainer)
@@ -90,7 +116,7 @@ class MomentumUpdaterHook(Hook):
                 self._set_momentum(trainer, self.regular_mom)
             else:
                 warmup_momentum = self.get_warmup_momentum(cur_iter)
-                self._set_momentum(tariner, warmup_momentum)
+                self._set_momentum(trainer, warmup_momentum)
         elif self.by_epoch:
             if self.warmup is None or cur_iter > self.warmup_iters:
                 return
@@ -163,7 +189,7 @@ class OneCycleMomentumUpdaterHook(MomentumUpdaterHook):
         elif anneal_strategy == 'cos':
             self.anneal_func = annealing_cos
         elif anneal_strategy == 'linear':
-            self.anneal_func = anneal_linear
+            self.anneal_func = annealing_linear
         self.three_phase = three_phase
         self.momentum_phases = []
         super(OneCycleMomentumUpdaterHook, self).__init__(**kwargs)
@@ -185,6 +211,7 @@ class OneCycleMomentumUpdaterHook(MomentumUpdaterHook):
             group['base_momentum'] = b_momentum
             group['max_momentum'] = m_momentum
 
+        self.momentum_phases = []
         if self.three_phase:
             self.momentum_phases.append({
                 'end_iter':
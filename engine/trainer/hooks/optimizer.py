@@ -4,6 +4,9 @@ from .hook import HOOKS, Hook
 
 @HOOKS.register_module()
 class OptimizerHook(Hook):
+    reads = ('outputs', )
+    writes = ('model', 'optimizer')
+
     def __init__(self, grad_clip):
         self.grad_clip = grad_clip
 
@@ -0,0 +1,239 @@
+"""Checkpoint manifests and verification.
+
+Next to every checkpoint ``save_checkpoint`` writes a manifest,
+``<checkpoint>.manifest.json``, with the size of the file, the crc32 of
+each block of the file and the crc32 of each tensor. A checkpoint is
+verified by checksumming its blocks in parallel, without unpickling it.
+
+Verify checkpoints, or find the newest valid one of a directory, with::
+
+    python -m engine.trainer.integrity work_dir/latest.pth [--deep]
+    python -m engine.trainer.integrity work_dir
+"""
+import argparse
+import json
+import os
+import os.path as osp
+import re
+import sys
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from . import serialization
+
+MANIFEST_SUFFIX = '.manifest.json'
+BLOCK_SIZE = 16 << 20
+# names of the checkpoints written by CheckpointHook and
+# Trainer.save_checkpoint, e.g. resnet_iter_2000 or epoch_3.pth
+CHECKPOINT_REGEX = re.compile(r'(^|_)(iter|epoch)_\d+(\.pth)?$')
+
+
+def manifest_path(filename):
+    # the manifest of a symlink such as latest.pth is the one of its target
+    return osp.realpath(filename) + MANIFEST_SUFFIX
+
+
+class ChecksumWriter(object):
+    """Wrap a binary file to compute the crc32 of each written block."""
+
+    def __init__(self, file, block_size=BLOCK_SIZE):
+        self.file = file
+        self.block_size = block_size
+        self.blocks = []
+        self.size = 0
+        self._crc = 0
+        self._fill = 0
+
+    def write(self, data):
+        view = memoryview(data).cast('B')
+        num_bytes = len(view)
+        self.file.write(view)
+        self.size += num_bytes
+        while len(view):
+            take = min(self.block_size - self._fill, len(view))
+            self._crc = zlib.crc32(view[:take], self._crc)
+            self._fill += take
+            view = view[take:]
+            if self._fill == self.block_size:
+                self.blocks.append(self._crc)
+                self._crc, self._fill = 0, 0
+        return num_bytes
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        self.file.flush()
+
+    def checksums(self):
+        """Get the crc32 of all blocks, including the last partial one."""
+        return self.blocks + ([self._crc] if self._fill else [])
+
+
+def _iter_tensors(obj, prefix=''):
+    if isinstance(obj, torch.Tensor):
+        yield prefix, obj
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from _iter_tensors(
+                value, '{}.{}'.format(prefix, key) if prefix else str(key))
+    elif isinstance(obj, (list, tuple)):
+        for i, value in enumerate(obj):
+            yield from _iter_tensors(
+                value, '{}.{}'.format(prefix, i) if prefix else str(i))
+
+
+def tensor_checksums(obj, num_workers=None):
+    """Get the crc32 of the bytes of every tensor in ``obj`` by path."""
+    names, tensors = [], []
+    for name, tensor in _iter_tensors(obj):
+        names.append(name)
+        tensors.append(tensor)
+    with ThreadPoolExecutor(num_workers or os.cpu_count() or 1) as executor:
+        crcs = executor.map(
+            lambda t: zlib.crc32(serialization._tensor_bytes(t)), tensors)
+        return dict(zip(names, crcs))
+
+
+def write_manifest(filename, writer, checkpoint=None, num_workers=None):
+    """Write the manifest of a checkpoint written through ``writer``.
+    Args:
+        filename (str): Final path of the checkpoint. The manifest may be
+            written before the checkpoint is moved there.
+        writer (:obj:`ChecksumWriter`): Writer the checkpoint went through.
+        checkpoint (dict, optional): The saved object, to also record the
+            checksums of its tensors.
+    """
+    manifest = dict(version=1, file=osp.basename(filename), size=writer.size,
+                    block_size=writer.block_size, blocks=writer.checksums())
+    if checkpoint is not None:
+        manifest['tensors'] = tensor_checksums(checkpoint, num_workers)
+    path = manifest_path(filename)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+def _verify_blocks(filename, manifest, num_workers):
+    size = os.path.getsize(filename)
+    if size != manifest['size']:
+        return ['size is {} bytes, expected {}'.format(size, manifest['size'])]
+    block_size = manifest['block_size']
+    with open(filename, 'rb') as f:
+        def check(i):
+            data = os.pread(f.fileno(), block_size, i * block_size)
+            return zlib.crc32(data) == manifest['blocks'][i]
+
+        with ThreadPoolExecutor(num_workers) as executor:
+            ok = list(executor.map(check, range(len(manifest['blocks']))))
+    return ['block {} (offset {}) has a wrong checksum'.format(i, i * block_size)
+            for i, block_ok in enumerate(ok) if not block_ok]
+
+
+def _verify_format(filename):
+    # without a manifest only the structure of the file can be checked
+    try:
+        if serialization.is_chunked(filename):
+            reader = serialization._Reader(filename)
+            try:
+                serialization.read_index(reader)
+            finally:
+                reader.close()
+            return []
+        with zipfile.ZipFile(filename) as f:
+            bad = f.testzip()
+        return ['member {} has a wrong checksum'.format(bad)] if bad else []
+    except (IOError, ValueError, zipfile.BadZipFile) as e:
+        return [str(e)]
+
+
+def verify_checkpoint(filename, deep=False, num_workers=None):
+    """Verify a checkpoint against its manifest.
+    Args:
+        filename (str): Path of the checkpoint.
+        deep (bool): Also load the checkpoint and compare the checksums of
+            its tensors.
+        num_workers (int, optional): Threads reading the file, the number
+            of cpus by default.
+    Returns:
+        list[str]: The problems found, empty if the checkpoint is valid.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    if not osp.isfile(filename):
+        return ['{} does not exist'.format(filename)]
+    path = manifest_path(filename)
+    if not osp.isfile(path):
+        return _verify_format(filename)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except ValueError as e:
+        return ['manifest {} is corrupted: {}'.format(path, e)]
+    errors = _verify_blocks(filename, manifest, num_workers)
+    if deep and not errors and 'tensors' in manifest:
+        from .checkpoint import _load_file
+        checksums = tensor_checksums(_load_file(filename, 'cpu'), num_workers)
+        errors = ['tensor {} has a wrong checksum'.format(name)
+                  for name, crc in manifest['tensors'].items()
+                  if checksums.get(name) != crc]
+    return errors
+
+
+def find_valid_checkpoint(dirname, deep=False, num_workers=None, logger=None,
+                          exclude=('best.pth',)):
+    """Get the newest checkpoint of ``dirname`` that verifies.
+    The candidates are the files with a manifest and the checkpoints named
+    by :class:`CheckpointHook`, newest first. Symlinks such as
+    ``latest.pth`` and the files in ``exclude``, by default the weights of
+    :class:`BestModelHook` which have no optimizer state, are skipped.
+    Returns:
+        str | None: Path of the checkpoint, None if none is valid.
+    """
+    candidates = []
+    for name in os.listdir(dirname):
+        path = osp.join(dirname, name)
+        if name in exclude or osp.islink(path) or not osp.isfile(path):
+            continue
+        if (CHECKPOINT_REGEX.search(name)
+                or osp.isfile(path + MANIFEST_SUFFIX)):
+            candidates.append(path)
+    candidates.sort(key=osp.getmtime, reverse=True)
+    for path in candidates:
+        errors = verify_checkpoint(path, deep, num_workers)
+        if not errors:
+            return path
+        if logger is not None:
+            logger.warning('skipping invalid checkpoint %s: %s', path,
+                           '; '.join(errors))
+    return None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Verify checkpoints without loading them')
+    parser.add_argument('paths', nargs='+', help='checkpoints or directories')
+    parser.add_argument('--deep', action='store_true',
+                        help='also load and checksum every tensor')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(args)
+
+    failed = False
+    for path in args.paths:
+        if osp.isdir(path):
+            found = find_valid_checkpoint(path, args.deep, args.workers)
+            print('{}: newest valid checkpoint {}'.format(path, found))
+            failed |= found is None
+            continue
+        errors = verify_checkpoint(path, args.deep, args.workers)
+        print('{}: {}'.format(path, 'FAILED' if errors else 'OK'))
+        for error in errors:
+            print('  ' + error)
+        failed |= bool(errors)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,10 @@
+import threading
 from collections import OrderedDict
 
 import numpy as np
+import torch.distributed as dist
+
+from .stats import StreamingStats
 
 class LogBuffer(object):
 
@@ -8,17 +12,99 @@ class LogBuffer(object):
         self.val_history = OrderedDict()
         self.n_history = OrderedDict()
         self.output = OrderedDict()
+        self.percentiles = OrderedDict()
+        self.stats = OrderedDict()
         self.ready = False
         self.average_filter = average_filter
+        # concurrent loggers average the same window only once
+        self._lock = threading.Lock()
+        self._version = 0
+        self._averaged = None
 
     def clear(self):
         self.val_history.clear()
         self.n_history.clear()
+        for key, stats in self.stats.items():
+            self.stats[key] = StreamingStats(
+                stats.quantiles, stats.sketch.relative_accuracy)
         self.clear_output()
 
     def clear_output(self):
         self.output.clear()
         self.ready = False
+        self._averaged = None
+
+    def state_dict(self):
+        """Return the value histories, e.g. to resume within an epoch."""
+        def to_python(val):
+            # keep checkpoints loadable with ``weights_only=True``
+            return val.item() if isinstance(val, np.generic) else val
+
+        return dict(
+            val_history={k: [to_python(v) for v in vals]
+                         for k, vals in self.val_history.items()},
+            n_history={k: [to_python(n) for n in nums]
+                       for k, nums in self.n_history.items()},
+            stats={k: s.state_dict() for k, s in self.stats.items()})
+
+    def load_state_dict(self, state_dict):
+        self.clear()
+        for key, vals in state_dict['val_history'].items():
+            self.val_history[key] = list(vals)
+            self.n_history[key] = list(state_dict['n_history'][key])
+        for key, stats_state in state_dict.get('stats', {}).items():
+            self.stats[key] = StreamingStats()
+            self.stats[key].load_state_dict(stats_state)
+
+    def track_percentiles(self, key, percentiles):
+        """Report percentiles of ``key`` as ``{key}_p{q}`` in :meth:`average`.
+        Args:
+            key (str): Name of the logged variable.
+            percentiles (Sequence[float]): Percentiles in range [0, 100].
+        """
+        self.percentiles[key] = tuple(percentiles)
+
+    def track_stats(self, key, quantiles=(50, 95, 99), relative_accuracy=0.01):
+        """Keep streaming statistics of ``key`` since the last :meth:`clear`.
+        Unlike :meth:`track_percentiles` the statistics take constant memory
+        and can be merged across ranks with :meth:`gather_stats`. They are
+        reported in :meth:`average` as ``{key}_std``, ``{key}_min``,
+        ``{key}_max`` and ``{key}_q{q}``, and kept in :attr:`stats`.
+        The values are still appended to :attr:`val_history`, which is
+        cleared with the statistics: windowed averages, percentiles and
+        loggers reading the raw values need them, so tracking adds the
+        statistics to a key rather than replacing its history.
+        Args:
+            key (str): Name of the logged variable.
+            quantiles (Sequence[float]): Quantiles in range [0, 100].
+            relative_accuracy (float): Relative error of the quantiles.
+        """
+        if key not in self.stats:
+            self.stats[key] = StreamingStats(quantiles, relative_accuracy)
+
+    def gather_stats(self):
+        """Merge the streaming statistics of all ranks.
+        This is a collective call, every rank has to call it at the same
+        point, so it is never made implicitly by :meth:`average`.
+        Returns:
+            dict[str, StreamingStats]: Merged statistics per key.
+        """
+        states = {k: s.state_dict() for k, s in self.stats.items()}
+        if dist.is_available() and dist.is_initialized():
+            gathered = [None] * dist.get_world_size()
+            dist.all_gather_object(gathered, states)
+        else:
+            gathered = [states]
+        merged = OrderedDict()
+        for rank_states in gathered:
+            for key, state in rank_states.items():
+                stats = StreamingStats()
+                stats.load_state_dict(state)
+                if key in merged:
+                    merged[key].merge(stats)
+                else:
+                    merged[key] = stats
+        return merged
 
     def update(self, vars, count=1):
         assert isinstance(vars, dict)
@@ -28,10 +114,22 @@ class LogBuffer(object):
                 self.n_history[key] = []
             self.val_history[key].append(val)
             self.n_history[key].append(count)
+            if key in self.stats:
+                self.stats[key].update(val, count)
+        self._version += 1
 
     def average(self, n=0):
         """Average latest n value or all values"""
         assert n >= 0
+        with self._lock:
+            # nothing changed since the same average was computed
+            if self._averaged == (self._version, n):
+                self.ready = True
+                return
+            self._average(n)
+            self._averaged = (self._version, n)
+
+    def _average(self, n):
         for key in self.val_history:
             if key in self.average_filter:
                 continue
@@ -39,5 +137,14 @@ class LogBuffer(object):
             nums = np.array(self.n_history[key][-n:])
             avg = np.sum(values * nums) / np.sum(nums)
             self.output[key] = avg
+            if key in self.percentiles:
+                qs = self.percentiles[key]
+                for q, val in zip(qs, np.percentile(values, qs)):
+                    self.output['{}_p{:g}'.format(key, q)] = val
+        for key, stats in self.stats.items():
+            if stats.moments.count == 0:
+                continue
+            for name, val in stats.summary().items():
+                if name != 'mean':
+                    self.output['{}_{}'.format(key, name)] = val
         self.ready = True
-
@@ -0,0 +1,346 @@
+"""Chunked, compressed checkpoint files.
+
+A file starts with :data:`MAGIC`, followed by the compressed chunks of
+all tensor bytes, the pickled object with tensors replaced by references,
+and a json index. The last bytes are the length of the index and
+:data:`MAGIC` again, so the index is found without reading the chunks::
+
+    MAGIC | chunk 0 | ... | chunk n | skeleton | index | len(index) | MAGIC
+
+The tensor bytes are one stream cut into chunks of ``chunk_size`` bytes,
+so small tensors share a chunk and large ones span several. Chunks are
+compressed and decompressed in parallel on a thread pool; zlib, zstd and
+lz4 release the GIL while they work.
+"""
+import collections
+import io
+import json
+import os
+import pickle
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC = b'\x89ENGCKPT'
+FORMAT_VERSION = 1
+_TRAILER = struct.Struct('<Q')
+
+# the only globals the skeleton of a checkpoint may reference
+_SAFE_GLOBALS = {('collections', 'OrderedDict'): collections.OrderedDict,
+                 ('torch', 'Size'): torch.Size}
+
+
+def _zstd_compress(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_decompress(data, size):
+    return zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+
+
+# codec -> (compress(data, level), decompress(data, raw_size))
+_CODECS = {
+    'none': (lambda data, level: bytes(data), lambda data, size: data),
+    'zlib': (zlib.compress, lambda data, size: zlib.decompress(data, bufsize=size)),
+    'zstd': (_zstd_compress, _zstd_decompress),
+    'lz4': (lambda data, level: lz4_frame.compress(data, compression_level=level),
+            lambda data, size: lz4_frame.decompress(data)),
+}
+
+
+def available_codecs():
+    """Get the codecs that can be used in this environment."""
+    codecs = ['none', 'zlib']
+    if zstandard is not None:
+        codecs.append('zstd')
+    if lz4_frame is not None:
+        codecs.append('lz4')
+    return codecs
+
+
+def resolve_codec(compress, level=None):
+    """Get the ``(codec, level)`` of a preset or codec name.
+    Args:
+        compress (str): 'fast' (lz4, zstd or zlib at a low level, for
+            frequent checkpoints), 'strong' (zstd or zlib at a high level,
+            for archival) or a codec name: 'zstd', 'lz4', 'zlib' or 'none'.
+        level (int, optional): Compression level of the codec.
+    """
+    if compress == 'fast':
+        if lz4_frame is not None:
+            codec, default = 'lz4', 0
+        elif zstandard is not None:
+            codec, default = 'zstd', 1
+        else:
+            codec, default = 'zlib', 1
+    elif compress == 'strong':
+        codec, default = ('zstd', 15) if zstandard is not None else ('zlib', 9)
+    elif compress in _CODECS:
+        codec, default = compress, dict(zstd=3, lz4=0, zlib=6, none=0)[compress]
+    else:
+        raise ValueError('unknown compression {!r}, expected "fast", "strong" '
+                         'or one of {}'.format(compress, list(_CODECS)))
+    if codec not in available_codecs():
+        raise ImportError('compression {!r} needs the {} package'.format(
+            compress, dict(zstd='zstandard', lz4='lz4')[codec]))
+    return codec, default if level is None else level
+
+
+def is_chunked(filename):
+    """Whether ``filename`` was written by :func:`save`."""
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class _Pickler(pickle.Pickler):
+
+    def __init__(self, file, tensors):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.tensors = tensors
+        # tied weights are stored once. ``state_dict`` returns a new tensor
+        # per name, so they are found by the memory they view; the stored
+        # tensors stay alive, so their addresses are not reused meanwhile
+        self.views = {}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, torch.Tensor):
+            if obj.layout != torch.strided or obj.is_quantized:
+                raise TypeError('only dense tensors can be saved compressed, '
+                                'got a {} tensor'.format(obj.layout))
+            view = (obj.untyped_storage().data_ptr(), obj.device,
+                    obj.storage_offset(), obj.stride(), obj.shape, obj.dtype)
+            if view not in self.views:
+                self.views[view] = len(self.tensors)
+                self.tensors.append(obj)
+            return ('tensor', self.views[view])
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, tensors):
+        super().__init__(file)
+        self.tensors = tensors
+
+    def persistent_load(self, pid):
+        return self.tensors[pid[1]]
+
+    def find_class(self, module, name):
+        if (module, name) not in _SAFE_GLOBALS:
+            raise pickle.UnpicklingError(
+                'global {}.{} is not allowed in a checkpoint'.format(module, name))
+        return _SAFE_GLOBALS[(module, name)]
+
+
+def _tensor_bytes(tensor):
+    # a flat uint8 view works for every dtype, including bfloat16
+    tensor = tensor.detach().cpu().contiguous()
+    return tensor.reshape(-1).view(torch.uint8).numpy()
+
+
+def _chunks(buffers, chunk_size):
+    """Cut the concatenated ``buffers`` into lists of views per chunk."""
+    chunk, size = [], 0
+    for buf in buffers:
+        view = memoryview(buf)
+        while len(view):
+            take = min(chunk_size - size, len(view))
+            chunk.append(view[:take])
+            view = view[take:]
+            size += take
+            if size == chunk_size:
+                yield chunk
+                chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+def _compress_chunk(codec, level, views):
+    data = views[0] if len(views) == 1 else b''.join(views)
+    return _CODECS[codec][0](data, level), len(data)
+
+
+def save(obj, f, compress='fast', level=None, chunk_size=4 << 20,
+         num_workers=None):
+    """Save ``obj`` like :func:`torch.save`, compressing its tensors.
+    Args:
+        obj: Object to save, e.g. a checkpoint dict.
+        f (str | file): Output file name or a binary file object with
+            ``write`` and ``tell``.
+        compress (str): Preset or codec, see :func:`resolve_codec`.
+        level (int, optional): Compression level of the codec.
+        chunk_size (int): Bytes of tensor data per chunk.
+        num_workers (int, optional): Compression threads, the number of
+            cpus by default.
+    """
+    codec, level = resolve_codec(compress, level)
+    tensors = []
+    skeleton = io.BytesIO()
+    _Pickler(skeleton, tensors).dump(obj)
+    buffers = [_tensor_bytes(t) for t in tensors]
+
+    index = dict(version=FORMAT_VERSION, codec=codec, chunk_size=chunk_size,
+                 chunks=[], tensors=[],
+                 devices=[str(tensor.device) for tensor in tensors])
+    offset = 0
+    for tensor, buf in zip(tensors, buffers):
+        index['tensors'].append(
+            [str(tensor.dtype).split('.')[-1], list(tensor.shape), offset,
+             buf.nbytes])
+        offset += buf.nbytes
+
+    if isinstance(f, str):
+        with open(f, 'wb') as file:
+            return save(obj, file, compress, level, chunk_size, num_workers)
+
+    num_workers = num_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(num_workers) as executor:
+        f.write(MAGIC)
+        pending = deque()
+
+        def write_next():
+            data, raw_size = pending.popleft().result()
+            index['chunks'].append([f.tell(), len(data), raw_size])
+            f.write(data)
+
+        # keep a bounded number of compressed chunks in flight
+        for views in _chunks(buffers, chunk_size):
+            pending.append(executor.submit(_compress_chunk, codec, level, views))
+            if len(pending) >= 2 * num_workers:
+                write_next()
+        while pending:
+            write_next()
+
+        data = zlib.compress(skeleton.getvalue())
+        index['skeleton'] = [f.tell(), len(data)]
+        f.write(data)
+        data = json.dumps(index).encode()
+        f.write(data)
+        f.write(_TRAILER.pack(len(data)))
+        f.write(MAGIC)
+
+
+class _Reader(object):
+    """Positional reads of a file shared by several threads."""
+
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        self.lock = threading.Lock()
+
+    def read(self, offset, size):
+        if hasattr(os, 'pread'):
+            return os.pread(self.file.fileno(), size, offset)
+        with self.lock:
+            self.file.seek(offset)
+            return self.file.read(size)
+
+    def close(self):
+        self.file.close()
+
+
+def read_index(reader):
+    """Read the json index of an opened chunked file."""
+    size = os.fstat(reader.file.fileno()).st_size
+    tail = _TRAILER.size + len(MAGIC)
+    if size < len(MAGIC) + tail:
+        raise IOError('{} is truncated'.format(reader.file.name))
+    trailer = reader.read(size - tail, tail)
+    if trailer[_TRAILER.size:] != MAGIC:
+        raise IOError('{} is truncated or not a chunked checkpoint'.format(
+            reader.file.name))
+    index_size, = _TRAILER.unpack(trailer[:_TRAILER.size])
+    return json.loads(reader.read(size - tail - index_size, index_size))
+
+
+def _device(map_location, tensor, location):
+    """Get the device a tensor saved on ``location`` is loaded to."""
+    if map_location is None:
+        return torch.device('cpu')
+    if isinstance(map_location, dict):
+        return torch.device(map_location.get(location, location))
+    if callable(map_location):
+        # called with the cpu storage as by torch.load, None keeps the
+        # saved location
+        storage = map_location(tensor.untyped_storage(), location)
+        return torch.device(location if storage is None else storage.device)
+    return torch.device(map_location)
+
+
+def load(filename, map_location=None, num_workers=None):
+    """Load a file written by :func:`save`.
+    Args:
+        filename (str): Input file.
+        map_location (str | :obj:`torch.device` | dict | callable, optional):
+            Where to load the tensors, as in :func:`torch.load`: a device,
+            a dict mapping saved locations such as ``'cuda:1'`` to others,
+            or ``map_location(storage, location)`` returning the storage on
+            the target device. Tensors are loaded on CPU by default.
+        num_workers (int, optional): Decompression threads, the number of
+            cpus by default.
+    """
+    reader = _Reader(filename)
+    try:
+        index = read_index(reader)
+        if index['version'] > FORMAT_VERSION:
+            raise IOError('{} has an unsupported format version {}'.format(
+                filename, index['version']))
+        decompress = _CODECS[index['codec']][1]
+        specs = index['tensors']
+        starts = [spec[2] for spec in specs]
+        buffers = [torch.empty(spec[3], dtype=torch.uint8).numpy()
+                   for spec in specs]
+        chunk_size = index['chunk_size']
+
+        def load_chunk(i):
+            offset, size, raw_size = index['chunks'][i]
+            data = memoryview(decompress(reader.read(offset, size), raw_size))
+            if len(data) != raw_size:
+                raise IOError('chunk {} of {} is corrupted'.format(i, filename))
+            # scatter the chunk to the tensors it overlaps
+            start, end = i * chunk_size, i * chunk_size + raw_size
+            t = bisect_right(starts, start) - 1
+            while start < end:
+                t_start, nbytes = specs[t][2], specs[t][3]
+                take = min(end, t_start + nbytes) - start
+                buffers[t][start - t_start:start - t_start + take] = \
+                    data[start - i * chunk_size:start - i * chunk_size + take]
+                start += take
+                t += 1
+
+        num_workers = num_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(num_workers) as executor:
+            list(executor.map(load_chunk, range(len(index['chunks']))))
+        offset, size = index['skeleton']
+        skeleton = zlib.decompress(reader.read(offset, size))
+    finally:
+        reader.close()
+
+    # older files do not record the devices
+    locations = index.get('devices', ['cpu'] * len(specs))
+    tensors = []
+    for (dtype, shape, _, _), buf, location in zip(specs, buffers, locations):
+        dtype = getattr(torch, dtype)
+        if buf.size:
+            tensor = torch.from_numpy(buf).view(dtype).reshape(shape)
+        else:
+            tensor = torch.empty(shape, dtype=dtype)
+        device = _device(map_location, tensor, location)
+        if device != tensor.device:
+            tensor = tensor.to(device)
+        tensors.append(tensor)
+    return _Unpickler(io.BytesIO(skeleton), tensors).load()
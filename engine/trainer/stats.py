@@ -0,0 +1,195 @@
+import math
+
+# values closer to zero than this are counted as zero by the sketch
+_MIN_VALUE = 1e-12
+
+
+class RunningStats(object):
+    """Weighted mean, variance, min and max in constant memory.
+    Uses Welford's update, weighted as by West, and the pairwise merge of
+    Chan et al., so partial statistics of several processes can be
+    combined exactly.
+    """
+    def __init__(self):
+        self.count = 0.
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value, weight=1.):
+        if weight <= 0:
+            return
+        self.count += weight
+        delta = value - self.mean
+        self.mean += delta * weight / self.count
+        self.m2 += weight * delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """float: Population variance of the weighted values."""
+        return self.m2 / self.count if self.count > 0 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def state_dict(self):
+        return dict(count=self.count, mean=self.mean, m2=self.m2,
+                    min=self.min, max=self.max)
+
+    def load_state_dict(self, state_dict):
+        for name, value in state_dict.items():
+            setattr(self, name, value)
+
+
+class DDSketch(object):
+    """Mergeable quantile sketch with relative accuracy guarantees.
+    Values are counted in logarithmic bins, so any quantile is returned
+    within ``relative_accuracy`` of an exact value of the stream (Masson
+    et al., "DDSketch", VLDB 2019). When there are more than ``max_bins``
+    bins per sign, the bins closest to zero are collapsed, which keeps the
+    memory bounded and the accuracy of the upper quantiles.
+    Args:
+        relative_accuracy (float): Relative error of the quantiles.
+        max_bins (int): Maximum number of bins per sign.
+    """
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be in (0, 1), but got '
+                             '{}'.format(relative_accuracy))
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0.
+        self.count = 0.
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def _collapse(self, bins):
+        indices = sorted(bins)
+        num_collapse = len(bins) - self.max_bins + 1
+        total = sum(bins.pop(index) for index in indices[:num_collapse])
+        bins[indices[num_collapse - 1]] = total
+
+    def add(self, value, weight=1.):
+        if weight <= 0:
+            return
+        self.count += weight
+        if value > _MIN_VALUE:
+            bins, index = self.positive, self._index(value)
+        elif value < -_MIN_VALUE:
+            bins, index = self.negative, self._index(-value)
+        else:
+            self.zero += weight
+            return
+        bins[index] = bins.get(index, 0.) + weight
+        if len(bins) > self.max_bins:
+            self._collapse(bins)
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError('cannot merge sketches of different accuracy')
+        for bins, other_bins in ((self.positive, other.positive),
+                                 (self.negative, other.negative)):
+            for index, weight in other_bins.items():
+                bins[index] = bins.get(index, 0.) + weight
+            while len(bins) > self.max_bins:
+                self._collapse(bins)
+        self.zero += other.zero
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Get the ``q`` quantile, ``q`` in [0, 1]; nan if empty."""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        total = 0.
+        for index in sorted(self.negative, reverse=True):
+            total += self.negative[index]
+            if total > rank:
+                return -self._value(index)
+        total += self.zero
+        if total > rank:
+            return 0.
+        for index in sorted(self.positive):
+            total += self.positive[index]
+            if total > rank:
+                return self._value(index)
+        return self._value(max(self.positive)) if self.positive else 0.
+
+    def state_dict(self):
+        return dict(relative_accuracy=self.relative_accuracy,
+                    max_bins=self.max_bins, positive=dict(self.positive),
+                    negative=dict(self.negative), zero=self.zero,
+                    count=self.count)
+
+    def load_state_dict(self, state_dict):
+        self.__init__(state_dict['relative_accuracy'], state_dict['max_bins'])
+        self.positive = dict(state_dict['positive'])
+        self.negative = dict(state_dict['negative'])
+        self.zero = state_dict['zero']
+        self.count = state_dict['count']
+
+
+class StreamingStats(object):
+    """Mean, standard deviation, min, max and quantiles of a stream.
+    Args:
+        quantiles (Sequence[float]): Percentiles in [0, 100] to report.
+        relative_accuracy (float): Relative error of the quantiles.
+    """
+    def __init__(self, quantiles=(50, 95, 99), relative_accuracy=0.01):
+        self.quantiles = tuple(quantiles)
+        self.moments = RunningStats()
+        self.sketch = DDSketch(relative_accuracy)
+
+    def update(self, value, weight=1.):
+        value = float(value)
+        self.moments.update(value, weight)
+        self.sketch.add(value, weight)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self):
+        """dict: ``mean``, ``std``, ``min``, ``max`` and ``q{q}`` values."""
+        moments = self.moments
+        summary = dict(mean=moments.mean, std=moments.std, min=moments.min,
+                       max=moments.max)
+        for q in self.quantiles:
+            summary['q{:g}'.format(q)] = self.sketch.quantile(q / 100)
+        return summary
+
+    def state_dict(self):
+        return dict(quantiles=list(self.quantiles),
+                    moments=self.moments.state_dict(),
+                    sketch=self.sketch.state_dict())
+
+    def load_state_dict(self, state_dict):
+        self.quantiles = tuple(state_dict['quantiles'])
+        self.moments.load_state_dict(state_dict['moments'])
+        self.sketch.load_state_dict(state_dict['sketch'])
@@ -0,0 +1,322 @@
+import copy
+import csv
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import os.path as osp
+import random
+import statistics
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import torch
+
+from .hooks import HOOKS, Hook
+from ..utils.path import mkdir_or_exist
+
+# set once per worker process by ``_init_worker``
+_worker_args = {}
+
+
+def _get_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _share_memory(obj, visited=None):
+    """Move the tensors of a dataset to shared memory, in place."""
+    # objects may reference each other, e.g. a dataset and its parent
+    if visited is None:
+        visited = set()
+    if id(obj) in visited:
+        return obj
+    visited.add(id(obj))
+    if isinstance(obj, torch.Tensor):
+        obj.share_memory_()
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            _share_memory(value, visited)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            _share_memory(value, visited)
+    elif hasattr(obj, '__dict__'):
+        for value in vars(obj).values():
+            _share_memory(value, visited)
+    return obj
+
+
+def set_by_path(config, path, value):
+    """Set a dotted attribute or key path, e.g. ``'optimizer.lr'``."""
+    *parents, name = path.split('.')
+    for parent in parents:
+        config = config[parent] if isinstance(config, dict) else getattr(config, parent)
+    if isinstance(config, dict):
+        config[name] = value
+    else:
+        setattr(config, name, value)
+
+
+def _init_worker(slots, cpus_per_worker, num_threads, dataset):
+    # every worker takes one slot of cpus for its lifetime
+    slot = slots.get()
+    cpus = _get_cpus()
+    if cpus_per_worker and hasattr(os, 'sched_setaffinity'):
+        # wraps around if there are more workers than cpus
+        cpus = sorted({cpus[(slot * cpus_per_worker + i) % len(cpus)]
+                       for i in range(cpus_per_worker)})
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(num_threads or max(len(cpus), 1))
+    _worker_args.update(slot=slot, dataset=dataset)
+
+
+def _run_trial(build_fn, config, params, trial_id, work_dir, seed, monitor,
+               mode, reports, grace_epochs, min_trials):
+    row = dict(trial=trial_id, **params)
+    start = time.perf_counter()
+    stopper = MedianStoppingHook(
+        monitor, trial_id, reports, mode=mode, grace_epochs=grace_epochs,
+        min_trials=min_trials)
+    try:
+        random.seed(seed)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+        config = copy.deepcopy(config)
+        for path, value in params.items():
+            set_by_path(config, path, value)
+        run = build_fn(config, _worker_args['dataset'], work_dir)
+        trainer = run['trainer']
+        trainer.register_hook(stopper, priority='LOWEST')
+        trainer.fit(run['data_loaders'], run['workflow'], run['max_epochs'])
+        row.update(status='pruned' if stopper.pruned else 'done',
+                   epochs=trainer.epoch)
+    except Exception:
+        row.update(status='failed', error=traceback.format_exc(limit=-1))
+    row.update(
+        **{monitor: stopper.last, 'best_' + monitor: stopper.best},
+        seconds=time.perf_counter() - start, worker=_worker_args['slot'])
+    return row
+
+
+@HOOKS.register_module()
+class MedianStoppingHook(Hook):
+    """Stop a sweep trial whose metric is worse than the median of the
+    other trials after the same number of epochs.
+    The metrics are shared through ``reports``, a dict proxy of a
+    :class:`multiprocessing.Manager`. Like :class:`EarlyStoppingHook` the
+    hook stops the run by setting ``trainer.stop_training``. Register it
+    after the hooks computing the metric.
+    Args:
+        monitor (str): Key of the metric in ``trainer.log_buffer.output``.
+        trial_id (int): Index of the trial.
+        reports (dict): Shared dict of ``(trial_id, epoch)`` -> metric.
+        mode (str): 'min' or 'max'.
+        grace_epochs (int): Never stop before this many epochs.
+        min_trials (int): Minimum number of other trials reporting an
+            epoch before the median is used.
+    """
+    def __init__(
+        self,
+        monitor,
+        trial_id,
+        reports,
+        mode = 'min',
+        grace_epochs = 1,
+        min_trials = 2
+    ):
+        if mode not in ('min', 'max'):
+            raise ValueError('mode must be "min" or "max", but got {}'.format(mode))
+        self.monitor = monitor
+        self.trial_id = trial_id
+        self.reports = reports
+        self.mode = mode
+        self.grace_epochs = grace_epochs
+        self.min_trials = min_trials
+        self.last = None
+        self.best = None
+        self.pruned = False
+
+    def _better(self, a, b):
+        return a < b if self.mode == 'min' else a > b
+
+    def after_val_epoch(self, trainer):
+        value = trainer.log_buffer.output.get(self.monitor)
+        if value is None:
+            return
+        value = float(value)
+        self.last = value
+        if self.best is None or self._better(value, self.best):
+            self.best = value
+        epoch = trainer.epoch
+        self.reports[(self.trial_id, epoch)] = value
+        if epoch < self.grace_epochs:
+            return
+        others = [v for (trial, e), v in self.reports.items()
+                  if e == epoch and trial != self.trial_id]
+        if len(others) < self.min_trials:
+            return
+        median = statistics.median(others)
+        if self._better(median, value):
+            trainer.logger.info(
+                'trial %d: %s %.4f is worse than the median %.4f of %d trials '
+                'at epoch %d, stopping', self.trial_id, self.monitor, value,
+                median, len(others), epoch)
+            self.pruned = True
+            trainer.stop_training = True
+
+    def after_async_val(self, trainer):
+        self.after_val_epoch(trainer)
+
+
+class SweepRunner(object):
+    """Run a hyperparameter sweep with several trainers in parallel.
+    Trials run in a pool of worker processes. Each worker imports torch
+    once and runs trials one after another. Every worker is pinned to its
+    own slice of the available cpus, and the torch threads are sized to
+    that slice, so the workers do not oversubscribe the machine. The
+    dataset is moved to shared memory once and mapped read-only by all
+    workers instead of being rebuilt per trial. Trials worse than the
+    median of the others are stopped early by :class:`MedianStoppingHook`.
+    ``build_fn(config, dataset, work_dir)`` must be a module level function
+    and returns a dict with the ``trainer`` (hooks registered), its
+    ``data_loaders``, ``workflow`` and ``max_epochs``.
+    Example:
+        >>> runner = SweepRunner(
+        >>>     build, config,
+        >>>     {'optimizer.lr': [1e-3, 1e-2], 'model.dropout': [0., 0.1]},
+        >>>     monitor='loss', out_dir='work_dirs/sweep', num_workers=4)
+        >>> rows = runner.run(dataset)
+    Args:
+        build_fn (callable): Builds the trainer of a trial.
+        config: Base config, copied for each trial. A dict or an object.
+        search_space (dict): Dotted config paths mapped to lists of values.
+            The grid of all combinations is searched.
+        monitor (str): Validation metric used for stopping and reporting.
+        mode (str): 'min' or 'max'.
+        out_dir (str, optional): Directory of the trial work dirs and of
+            ``sweep_results.csv``.
+        num_samples (int, optional): Run only this many random
+            combinations of the grid.
+        num_workers (int): Number of worker processes.
+        cpus_per_worker (int, optional): Cpus each worker is pinned to,
+            the available cpus divided by ``num_workers`` by default. Use
+            0 to disable pinning.
+        num_threads (int, optional): Torch threads per worker, the number
+            of cpus of the worker by default.
+        grace_epochs (int): Epochs before a trial may be stopped.
+        min_trials (int): Trials that must have reported an epoch before
+            the median stopping rule applies.
+        seed (int): Seed of the sampling; trial ``i`` runs with ``seed + i``.
+        mp_context (str): Multiprocessing start method. Default: 'spawn'.
+    """
+    def __init__(
+        self,
+        build_fn,
+        config,
+        search_space,
+        monitor,
+        mode = 'min',
+        out_dir = None,
+        num_samples = None,
+        num_workers = 2,
+        cpus_per_worker = None,
+        num_threads = None,
+        grace_epochs = 1,
+        min_trials = 2,
+        seed = 0,
+        mp_context = 'spawn'
+    ):
+        assert callable(build_fn)
+        if mode not in ('min', 'max'):
+            raise ValueError('mode must be "min" or "max", but got {}'.format(mode))
+        self.build_fn = build_fn
+        self.config = config
+        self.search_space = search_space
+        self.monitor = monitor
+        self.mode = mode
+        self.out_dir = out_dir
+        self.num_samples = num_samples
+        self.num_workers = num_workers
+        if cpus_per_worker is None:
+            cpus_per_worker = max(len(_get_cpus()) // num_workers, 1)
+        self.cpus_per_worker = cpus_per_worker
+        self.num_threads = num_threads
+        self.grace_epochs = grace_epochs
+        self.min_trials = min_trials
+        self.seed = seed
+        self.mp_context = mp_context
+        self.logger = logging.getLogger(__name__)
+
+    def trials(self):
+        """Get the parameter dicts of the trials."""
+        names = list(self.search_space)
+        trials = [dict(zip(names, values)) for values in
+                  itertools.product(*(self.search_space[n] for n in names))]
+        if self.num_samples is not None and self.num_samples < len(trials):
+            trials = random.Random(self.seed).sample(trials, self.num_samples)
+        return trials
+
+    def run(self, dataset=None):
+        """Run all trials.
+        Args:
+            dataset (optional): Passed to ``build_fn`` in every worker. Its
+                tensors are moved to shared memory.
+        Returns:
+            list[dict]: A row per trial with the parameters, ``status``
+                ('done', 'pruned' or 'failed'), the last and best value of
+                the monitored metric, the epochs and the run time, sorted
+                from best to worst.
+        """
+        trials = self.trials()
+        if self.out_dir:
+            mkdir_or_exist(self.out_dir)
+        dataset = _share_memory(dataset)
+        ctx = mp.get_context(self.mp_context)
+        rows = []
+        with ctx.Manager() as manager:
+            reports = manager.dict()
+            slots = ctx.Queue()
+            for slot in range(self.num_workers):
+                slots.put(slot)
+            with ProcessPoolExecutor(
+                    self.num_workers, mp_context=ctx, initializer=_init_worker,
+                    initargs=(slots, self.cpus_per_worker, self.num_threads,
+                              dataset)) as executor:
+                futures = []
+                for i, params in enumerate(trials):
+                    work_dir = None
+                    if self.out_dir:
+                        work_dir = osp.join(self.out_dir, 'trial_{:03d}'.format(i))
+                    futures.append(executor.submit(
+                        _run_trial, self.build_fn, self.config, params, i,
+                        work_dir, self.seed + i, self.monitor, self.mode,
+                        reports, self.grace_epochs, self.min_trials))
+                for future in as_completed(futures):
+                    row = future.result()
+                    self.logger.info(
+                        'trial %d %s: %s = %s (%.1fs)', row['trial'],
+                        row['status'], self.monitor, row[self.monitor],
+                        row['seconds'])
+                    rows.append(row)
+
+        best_key = 'best_' + self.monitor
+        sign = 1 if self.mode == 'min' else -1
+        rows.sort(key=lambda row: (row[best_key] is None,
+                                   sign * (row[best_key] or 0.)))
+        if self.out_dir:
+            self.write_results(rows, osp.join(self.out_dir, 'sweep_results.csv'))
+        return rows
+
+    @staticmethod
+    def write_results(rows, filename):
+        """Write the result rows to a csv file."""
+        fields = []
+        for row in rows:
+            fields += [key for key in row if key not in fields]
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fields)
+            writer.writeheader()
+            writer.writerows(rows)
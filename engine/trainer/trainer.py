@@ -1,21 +1,33 @@
+import bisect
+import gc
 import logging
 import os.path as osp
 import time
 import copy
+from concurrent.futures import ThreadPoolExecutor
 
 import torch
 
-from . import hooks
 from .log_buffer import LogBuffer
 from .hooks import (HOOKS, Hook, LrUpdaterHook, CheckpointHook, IterTimerHook,
-                    OptimizerHook, EarlyStoppingHook, lr_updater)
-from .checkpoint import load_checkpoint, save_checkpoint
+                    OptimizerHook, EarlyStoppingHook, BestModelHook, lr_updater)
+from .hooks.hook import STAGES
+from .checkpoint import (_copy_to_cpu, load_checkpoint, materialize_module,
+                         save_checkpoint)
+from .integrity import find_valid_checkpoint
+from .data import iter_from, rebatch_loader
 from .priority import get_priority
-from .utils import get_dist_info, get_host_info, get_time_str, obj_from_dict
+from .utils import (get_dist_info, get_host_info, get_peak_rss_bytes,
+                    get_rng_state, get_rss_bytes, get_time_str, inference_mode,
+                    obj_from_dict, reset_peak_rss, set_rng_state)
 from ..utils.misc import is_str, is_list_of
-from ..utils.path import mkdir_or_exist, symlink
+from ..utils.path import mkdir_or_exist
 from ..utils.registry import build_from_cfg
 
+# messages of the RuntimeErrors raised when an allocation fails
+_OOM_MESSAGES = ('out of memory', "can't allocate memory")
+
+
 class Trainer(object):
     """A training helper for PyTorch.
     Args:
@@ -28,6 +40,9 @@ class Trainer(object):
         work_dir (str, optional): The working directory to save checkpoints
             and logs.
         log_level (int): Logging level.
+        eval_batch_size (int, optional): Batch size used by :meth:`val`.
+            Without gradients larger batches usually fit and run faster.
+            If not specified, the batch size of the val data loader is used.
     """
     def __init__(
         self, 
@@ -36,7 +51,8 @@ class Trainer(object):
         batch_processor,
         optimizer = None,
         work_dir = None,
-        log_level = logging.INFO
+        log_level = logging.INFO,
+        eval_batch_size = None
     ):
         assert callable(batch_processor)
         self.config = config
@@ -46,6 +62,8 @@ class Trainer(object):
         else:
             self.optimizer = None
         self.batch_processor = batch_processor
+        self.eval_batch_size = eval_batch_size
+        self._eval_loaders = {}
 
         if is_str(work_dir):
             self.work_dir = osp.abspath(work_dir)
@@ -66,13 +84,79 @@ class Trainer(object):
 
         self.mode = None
         self._hooks = []
+        self._hook_priorities = []
+        # stage name -> groups of hooks, see compile_hooks()
+        self._hook_plan = {}
+        self._hook_executor = None
         self._epoch = 0
         self._iter = 0
         self._inner_iter = 0
         self._max_epochs = 0
         self._max_iters = 0
+        self.data_loader = None
+
+        # position inside the current train epoch, used to resume mid-epoch
+        self._epoch_start_iter = 0
+        self._num_consumed = 0
+        self._epoch_done = False
+        self._epoch_rng_state = None
+        self._resume_state = None
 
         self.stop_training = False
+        # filled by IterTimerHook: rates since the start of the run and the
+        # estimated remaining time in seconds
+        self.throughput = {}
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        config,
+        model_fn,
+        batch_processor,
+        checkpoint,
+        device = 'cpu',
+        strict = True,
+        mmap = True,
+        revise_keys = ((r'^module\.', ''), ),
+        skip_mismatched = False,
+        **kwargs
+    ):
+        """Build a trainer whose model is materialized from a checkpoint.
+        The model is constructed on the meta device, so no memory is
+        allocated and no random initialization runs. Its tensors are then
+        assigned from the checkpoint, which is memory-mapped if it is a
+        local :func:`torch.save` file. Submodules missing from the
+        checkpoint with ``strict=False``, or whose shapes differ from it with
+        ``skip_mismatched=True``, e.g. a new head for fine-tuning, are
+        allocated on ``device`` and initialized by their
+        ``reset_parameters``.
+        Args:
+            config: Same as :class:`Trainer`.
+            model_fn (callable): Returns the model, called without arguments.
+            batch_processor (callable): Same as :class:`Trainer`.
+            checkpoint (str): Path or URI of the checkpoint.
+            device (str | :obj:`torch.device`): Device of the weights.
+            strict (bool): Whether the checkpoint must match the model.
+            mmap (bool): Memory-map the checkpoint file.
+            revise_keys (Sequence[tuple[str, str]]): Key rules, see
+                :func:`load_checkpoint`.
+            skip_mismatched (bool): Initialize tensors whose shape differs
+                from the checkpoint instead of raising.
+            **kwargs: Other arguments of :class:`Trainer`, e.g. the
+                optimizer, which is built from the materialized model.
+        """
+        with torch.device('meta'):
+            model = model_fn()
+        load_checkpoint(model, checkpoint, map_location=device, strict=strict,
+                        revise_keys=revise_keys, assign=True, mmap=mmap,
+                        skip_mismatched=skip_mismatched)
+        initialized = materialize_module(model, device)
+        trainer = cls(config, model, batch_processor, **kwargs)
+        trainer.logger.info('materialized the model from %s', checkpoint)
+        if initialized:
+            trainer.logger.info('initialized modules missing from the '
+                                'checkpoint: %s', ', '.join(initialized))
+        return trainer
 
     @property
     def model_name(self):
@@ -225,15 +309,11 @@ class Trainer(object):
             raise ValueError('"priority" is a reserved attribute for hooks')
         priority = get_priority(priority)
         hook.priority = priority
-        # insert the hook to a sorted list
-        inserted = False
-        for i in range(len(self._hooks) - 1, -1, -1):
-            if priority >= self._hooks[i].priority:
-                self._hooks.insert(i + 1, hook)
-                inserted = True
-                break
-        if not inserted:
-            self._hooks.insert(0, hook)
+        # insert the hook to a sorted list, after hooks of the same priority
+        i = bisect.bisect_right(self._hook_priorities, priority)
+        self._hook_priorities.insert(i, priority)
+        self._hooks.insert(i, hook)
+        self._hook_plan = {}
 
     def build_hook(self, args, hook_type=None):
         if isinstance(args, Hook):
@@ -245,38 +325,142 @@ class Trainer(object):
             raise TypeError('"args" must be either a Hook object '
                             ' or dict, not {}'.format(type(args)))
 
-    def call_hook(self, fn_name):
+    def _compile_stage(self, fn_name):
+        groups = []
         for hook in self._hooks:
-            getattr(hook, fn_name)(self)
+            if hook.is_noop(fn_name):
+                continue
+            if (hook.concurrent and groups and groups[-1][0].concurrent and
+                    not any(hook.conflicts(other, fn_name)
+                            for other in groups[-1])):
+                groups[-1].append(hook)
+            else:
+                groups.append([hook])
+        return [tuple(group) for group in groups]
+
+    def compile_hooks(self):
+        """Compile the execution plan of the registered hooks.
+        For every stage the plan lists the hooks to call in priority order,
+        leaving out hooks that keep the do-nothing default. Adjacent hooks
+        marked ``concurrent`` that do not conflict according to their
+        ``reads``/``writes`` declarations form a group that is run on a
+        thread pool. The plan is compiled on the first :meth:`call_hook`,
+        again after ``before_run`` and whenever a hook is registered.
+        Returns:
+            dict: Stage names mapped to lists of tuples of hooks.
+        """
+        self._hook_plan = {stage: self._compile_stage(stage) for stage in STAGES}
+        for stage, groups in self._hook_plan.items():
+            for group in groups:
+                if len(group) > 1:
+                    self.logger.debug(
+                        'running %s concurrently in %s',
+                        ', '.join(type(hook).__name__ for hook in group), stage)
+        return self._hook_plan
+
+    def _call_concurrent(self, group, fn_name):
+        if self._hook_executor is None:
+            self._hook_executor = ThreadPoolExecutor(thread_name_prefix='hook')
+        futures = [self._hook_executor.submit(getattr(hook, fn_name), self)
+                   for hook in group]
+        # wait for all hooks, then raise the first error in hook order
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
 
-    def load_checkpoint(self, filename, map_location='cpu', strict=False):
+    def call_hook(self, fn_name):
+        groups = self._hook_plan.get(fn_name)
+        if groups is None:
+            groups = self._hook_plan[fn_name] = self._compile_stage(fn_name)
+        for group in groups:
+            if len(group) == 1:
+                getattr(group[0], fn_name)(self)
+            else:
+                self._call_concurrent(group, fn_name)
+
+    def load_checkpoint(self, filename, map_location='cpu', strict=False,
+                        revise_keys=((r'^module\.', ''), )):
         self.logger.info('load checkpoint from %s', filename)
-        return load_checkpoint(self.model, filename, map_location, strict, self.logger)
+        return load_checkpoint(self.model, filename, map_location, strict,
+                               self.logger, revise_keys)
 
     def save_checkpoint(
         self,
         out_dir,
         filename_tmpl = 'epoch_{}.pth',
         save_optimizer = True,
-        meta = None
+        meta = None,
+        async_save = False,
+        compress = None
     ):
+        """Save a checkpoint and link it as ``latest.pth``.
+        Args:
+            out_dir (str): Directory of the checkpoint.
+            filename_tmpl (str): Filename template, formatted with the
+                (1-based) epoch.
+            save_optimizer (bool): Whether to save the optimizer state.
+            meta (dict, optional): Extra metadata.
+            async_save (bool): Write the file in a background thread, see
+                :func:`save_checkpoint`. ``latest.pth`` is updated once the
+                file is complete.
+            compress (str, optional): Compression preset or codec, see
+                :func:`save_checkpoint`.
+        Returns:
+            :obj:`~concurrent.futures.Future` | None: The pending write if
+                ``async_save`` is set.
+        """
+        epoch, iter, inner_iter = self._train_position()
         if meta is None:
-            meta = dict(epoch=self.epoch, iter=self.iter)
+            meta = dict(epoch=epoch, iter=iter, inner_iter=inner_iter)
         else:
-            meta.update(epoch=self.epoch, iter=self.iter)
+            meta.update(epoch=epoch, iter=iter, inner_iter=inner_iter)
 
         filename = osp.join(out_dir, filename_tmpl.format(self.epoch + 1))
         linkname = osp.join(out_dir, 'latest.pth')
         optimizer = self.optimizer if save_optimizer else None
-        save_checkpoint(self.model, filename, optimizer = optimizer, meta = meta)
-        symlink(filename, linkname)
+        extra = dict(rng_state=get_rng_state())
+        if inner_iter:
+            extra.update(epoch_rng_state=self._epoch_rng_state,
+                         log_buffer=self.log_buffer.state_dict())
+        for hook in self._hooks:
+            hook.before_save_checkpoint(self, extra)
+        return save_checkpoint(
+            self.model, filename, optimizer = optimizer, meta = meta,
+            extra = extra, link_name = linkname, async_save = async_save,
+            compress = compress)
+
+    def _train_position(self):
+        """Get the (epoch, iter, inner_iter) training should resume from."""
+        if self._epoch_done:
+            return self._epoch + 1, self._iter, 0
+        return (self._epoch, self._epoch_start_iter + self._num_consumed,
+                self._num_consumed)
 
     def train(self, data_loader, **kwargs):
         self.model.train()
         self.mode = 'train'
         self.data_loader = data_loader
+        resume_state, self._resume_state = self._resume_state, None
         self.call_hook('before_train_epoch')
-        for i, data_batch in enumerate(data_loader):
+
+        num_skip = 0
+        if resume_state is not None:
+            # replay the sampler with the RNG state of the interrupted epoch,
+            # then continue with the state saved in the checkpoint
+            num_skip = resume_state['inner_iter']
+            rng_state = get_rng_state()
+            set_rng_state(resume_state['epoch_rng_state'])
+        self._epoch_rng_state = get_rng_state()
+        self._epoch_start_iter = self._iter - num_skip
+        self._num_consumed = num_skip
+        self._epoch_done = False
+        data_iter = iter_from(data_loader, num_skip)
+        if resume_state is not None:
+            set_rng_state(rng_state)
+            self.log_buffer.load_state_dict(resume_state['log_buffer'])
+
+        for i, data_batch in enumerate(data_iter, num_skip):
             self._inner_iter = i
             self.call_hook('before_train_iter')
             outputs = self.batch_processor(
@@ -287,13 +471,29 @@ class Trainer(object):
             if 'log_vars' in outputs:
                 self.log_buffer.update(outputs['log_vars'], outputs['num_samples'])
             self.outputs = outputs
+            self._num_consumed = i + 1
             self.call_hook('after_train_iter')
             self._iter += 1
+            if self.stop_training:
+                break
+        else:
+            self._epoch_done = True
 
         self.call_hook('after_train_epoch')
-        self._epoch += 1
+        if self._epoch_done:
+            # a stopped epoch keeps its position so it can be resumed
+            self._epoch += 1
+            self._epoch_start_iter = self._iter
+            self._num_consumed = 0
+            self._epoch_done = False
 
     def val(self, data_loader, **kwargs):
+        if self.eval_batch_size is not None:
+            # keep the rebuilt loader so persistent workers survive epochs
+            if data_loader not in self._eval_loaders:
+                self._eval_loaders[data_loader] = rebatch_loader(
+                    data_loader, self.eval_batch_size)
+            data_loader = self._eval_loaders[data_loader]
         self.model.eval()
         self.mode = 'val'
         self.data_loader = data_loader
@@ -302,7 +502,7 @@ class Trainer(object):
         for i, data_batch in enumerate(data_loader):
             self._inner_iter = i
             self.call_hook('before_val_iter')
-            with torch.no_grad():
+            with inference_mode():
                 outputs = self.batch_processor(
                     self.model, data_batch, train_mode=False, **kwargs
                 )
@@ -315,23 +515,206 @@ class Trainer(object):
         self.call_hook('after_val_epoch')
 
     def resume(self, checkpoint, resume_optimizer=True, map_location='default'):
+        """Resume training from a checkpoint.
+        Besides the weights and the optimizer this restores the RNG states,
+        the states of hooks such as the lr and momentum updaters and, for
+        checkpoints saved within an epoch, the position in the epoch. The
+        next :meth:`train` then skips the consumed batches without loading
+        them and replays the sampler so the remaining batches are the same
+        as in the interrupted run.
+        Args:
+            checkpoint (str): Path of the checkpoint, or a directory to
+                resume from its newest checkpoint that verifies against its
+                manifest, see :func:`~engine.trainer.integrity.find_valid_checkpoint`.
+            resume_optimizer (bool): Whether to restore the optimizer state.
+            map_location (str): Same as :func:`torch.load`. ``'default'``
+                loads to the current CUDA device if available, else to CPU.
+        """
+        if osp.isdir(checkpoint):
+            dirname = checkpoint
+            # the best weights have no optimizer state to resume from
+            exclude = {'best.pth'} | {h.filename for h in self._hooks
+                                      if isinstance(h, BestModelHook)}
+            checkpoint = find_valid_checkpoint(
+                dirname, logger=self.logger, exclude=exclude)
+            if checkpoint is None:
+                raise IOError('no valid checkpoint in {}'.format(dirname))
         if map_location == 'default':
-            device_id = torch.cuda.current_device()
-            checkpoint = self.load_checkpoint(
-                checkpoint,
-                map_location = lambda storage, loc: storage.cuda(device_id)
-            )
-        else:
-            checkpoint = self.load_checkpoint(
-                checkpoint, map_location=map_location
-            )
-
-        self._epoch = checkpoint['meta']['epoch']
-        self._iter = checkpoint['meta'['iter']]
+            if torch.cuda.is_available():
+                map_location = 'cuda:{}'.format(torch.cuda.current_device())
+            else:
+                map_location = 'cpu'
+        checkpoint = self.load_checkpoint(checkpoint, map_location=map_location)
+
+        meta = checkpoint['meta']
+        inner_iter = meta.get('inner_iter', 0)
+        self._epoch = meta['epoch']
+        self._iter = meta['iter']
+        self._epoch_start_iter = self._iter - inner_iter
+        self._num_consumed = 0
+        self._epoch_done = False
         if 'optimizer' in checkpoint and resume_optimizer:
             self.optimizer.load_state_dict(checkpoint['optimizer'])
+        if 'rng_state' in checkpoint:
+            set_rng_state(checkpoint['rng_state'])
+        if inner_iter:
+            self._resume_state = dict(
+                inner_iter=inner_iter,
+                epoch_rng_state=checkpoint['epoch_rng_state'],
+                log_buffer=checkpoint['log_buffer'])
+        for hook in self._hooks:
+            hook.after_load_checkpoint(self, checkpoint)
 
-        self.logger.info('resume epoch %d, iter %d', self.epoch, self.iter)
+        self.logger.info('resume epoch %d, iter %d (inner iter %d)',
+                         self.epoch, self.iter, inner_iter)
+
+    def _probe_batch_size(self, data_factory, batch_size, num_steps,
+                          memory_budget, **kwargs):
+        """Time training steps with one batch size.
+        Returns:
+            tuple[float, int] | None: Samples per second and peak memory,
+                None if the steps ran out of memory or over the budget.
+        """
+        optimizer_hooks = [h for h in self._hooks if isinstance(h, OptimizerHook)]
+        on_cuda = torch.cuda.is_available()
+        try:
+            data_batch = data_factory(batch_size)
+            if on_cuda:
+                torch.cuda.synchronize()
+                torch.cuda.reset_peak_memory_stats()
+            else:
+                peak_reset = reset_peak_rss()
+            # the first step allocates the optimizer state and is not timed
+            for step in range(num_steps + 1):
+                if step == 1:
+                    if on_cuda:
+                        torch.cuda.synchronize()
+                    start = time.perf_counter()
+                self.outputs = self.batch_processor(
+                    self.model, data_batch, train_mode=True, **kwargs)
+                if optimizer_hooks:
+                    for hook in optimizer_hooks:
+                        hook.after_train_iter(self)
+                else:
+                    self.optimizer.zero_grad()
+                    self.outputs['loss'].backward()
+                    self.optimizer.step()
+            if on_cuda:
+                torch.cuda.synchronize()
+                memory = torch.cuda.max_memory_allocated()
+            else:
+                # the peak of the probe where the OS can reset it, else
+                # the RSS after it
+                memory = get_peak_rss_bytes() if peak_reset else get_rss_bytes()
+            elapsed = time.perf_counter() - start
+        except (RuntimeError, MemoryError) as e:
+            # torch.cuda.OutOfMemoryError is a RuntimeError, as are the
+            # failures of the CPU allocator
+            if not isinstance(e, MemoryError) and not any(
+                    message in str(e) for message in _OOM_MESSAGES):
+                raise
+            return None
+        finally:
+            self.outputs = None
+            data_batch = None
+            self.optimizer.zero_grad(set_to_none=True)
+            gc.collect()
+            if on_cuda:
+                torch.cuda.empty_cache()
+        if memory_budget is not None and memory > memory_budget:
+            return None
+        return batch_size * num_steps / elapsed, memory
+
+    def find_batch_size(
+        self,
+        data_factory,
+        start = 1,
+        max_batch_size = None,
+        memory_budget = None,
+        num_steps = 3,
+        tolerance = 0.05,
+        **kwargs
+    ):
+        """Find the training batch size with the best throughput.
+        Batch sizes are doubled from ``start`` until a step runs out of
+        memory, exceeds ``memory_budget`` or reaches ``max_batch_size``;
+        the largest size that fits is then found by binary search. Each
+        probed size runs ``num_steps`` timed training steps through the
+        batch processor and the registered :class:`OptimizerHook` (or a
+        plain backward and optimizer step). The model, optimizer and RNG
+        states are restored afterwards, so this can run right before
+        :meth:`fit`.
+        Args:
+            data_factory (callable): ``data_factory(batch_size)`` returns a
+                data batch of that size for the batch processor.
+            start (int): First batch size.
+            max_batch_size (int, optional): Largest batch size to try.
+            memory_budget (int, optional): Bytes a step may use: the peak
+                allocated CUDA memory, or the peak RSS of the process on
+                CPU (the RSS after the steps where the peak cannot be reset).
+            num_steps (int): Timed steps per batch size.
+            tolerance (float): Prefer the smallest batch size within this
+                relative distance of the best throughput.
+        Returns:
+            int: The chosen batch size.
+        """
+        if self.optimizer is None:
+            raise RuntimeError('find_batch_size requires an optimizer')
+        # keep the copies off the device, they would distort the probes
+        model_state = _copy_to_cpu(self.model.state_dict())
+        optimizer_state = _copy_to_cpu(self.optimizer.state_dict())
+        rng_state = get_rng_state()
+        self.model.train()
+        self.mode = 'train'
+
+        results = {}
+
+        def fits(batch_size):
+            result = self._probe_batch_size(
+                data_factory, batch_size, num_steps, memory_budget, **kwargs)
+            if result is not None:
+                results[batch_size] = result
+            self.logger.info(
+                'batch size %d: %s', batch_size, 'does not fit' if result is None
+                else '{:.1f} samples/s, {:.1f} MB'.format(
+                    result[0], result[1] / 1024 / 1024))
+            return result is not None
+
+        try:
+            # grow until the first failure, then bisect between the last
+            # size that fits and the first one that does not
+            low, high = 0, None
+            batch_size = start
+            while True:
+                if max_batch_size is not None and batch_size >= max_batch_size:
+                    batch_size = max_batch_size
+                if not fits(batch_size):
+                    high = batch_size
+                    break
+                low = batch_size
+                if batch_size == max_batch_size:
+                    break
+                batch_size *= 2
+            while high is not None and high - low > 1:
+                middle = (low + high) // 2
+                if fits(middle):
+                    low = middle
+                else:
+                    high = middle
+        finally:
+            self.model.load_state_dict(model_state)
+            self.optimizer.load_state_dict(optimizer_state)
+            set_rng_state(rng_state)
+
+        if not results:
+            raise RuntimeError(
+                'batch size {} does not fit into memory'.format(start))
+        best = max(throughput for throughput, _ in results.values())
+        batch_size = min(size for size, (throughput, _) in results.items()
+                         if throughput >= (1 - tolerance) * best)
+        self.logger.info('best batch size %d (%.1f samples/s)',
+                         batch_size, results[batch_size][0])
+        return batch_size
 
     def fit(self, data_loaders, workflow, max_epochs, **kwargs):
         """Start running.
@@ -354,8 +737,10 @@ class Trainer(object):
         self.logger.info('Starting running, host: %s, work_dir: %s', get_host_info(), work_dir)
         self.logger.info('workflow: %s, max: %d epochs', workflow, max_epochs)
         self.call_hook('before_run')
+        # hooks may change their declarations in before_run
+        self.compile_hooks()
 
-        while self.epoch < max_epochs:
+        while self.epoch < max_epochs and not self.stop_training:
             for i, flow in enumerate(workflow):
                 mode, epochs = flow
                 if isinstance(mode, str): # self.train()
@@ -371,14 +756,21 @@ class Trainer(object):
 
                 for _ in range(epochs):
                     if mode == 'train' and self.epoch >= max_epochs:
-                        return
+                        break
+                    if self.stop_training:
+                        break
                     epoch_runner(data_loaders[i], **kwargs)
-
-            if self.stop_training:
+                else:
+                    continue
+                # finished or stopped, skip the remaining flows but still
+                # run the after_run hooks
                 break
 
         time.sleep(1) # wait for some hooks like loggers to finish
         self.call_hook('after_run')
+        if self._hook_executor is not None:
+            self._hook_executor.shutdown()
+            self._hook_executor = None
 
     def register_lr_hook(self, lr_config):
         if isinstance(lr_config, LrUpdaterHook):
@@ -389,7 +781,7 @@ class Trainer(object):
             lr_config_cp = copy.deepcopy(lr_config)
             policy_type = lr_config_cp.pop('policy')
             if policy_type == policy_type.lower():
-                hook_name = policy_type.title()
+                policy_type = policy_type.title()
             hook_name = policy_type + 'LrUpdaterHook'
             if not hasattr(lr_updater, hook_name):
                 raise ValueError('"{}" does not exist'.format(hook_name))
@@ -417,8 +809,10 @@ class Trainer(object):
     def register_logger_hook(self, log_config):
         log_interval = log_config['interval']
         for info in log_config['hooks']:
-            logger_hook = obj_from_dict(
-                info, hooks, default_args=dict(interval=log_interval)
+            # resolved through the registry, so only the configured logger
+            # backends are set up
+            logger_hook = build_from_cfg(
+                info, HOOKS, default_args=dict(interval=log_interval)
             )
             self.register_hook(logger_hook, priority="VERY_LOW")
 
@@ -430,7 +824,8 @@ class Trainer(object):
         checkpoint_config=None,
         log_config=None,
         momentum_config=None,
-        earlystopping_config=None
+        earlystopping_config=None,
+        best_model_config=None
     ):
         """Register default hooks for training.
         - LrUpdaterHook
@@ -439,6 +834,8 @@ class Trainer(object):
         - CheckpointSaverHook
         - IterTimerHook
         - LoggerHook(s)
+        - EarlyStoppingHook
+        - BestModelHook
         """
         if optimizer_config is None:
             optimizer_config = {}
@@ -453,5 +850,7 @@ class Trainer(object):
             self.register_logger_hook(log_config)
         if earlystopping_config is not None:
             self.register_hook(self.build_hook(earlystopping_config, EarlyStoppingHook), priority='VERY_LOW')
+        if best_model_config is not None:
+            self.register_hook(self.build_hook(best_model_config, BestModelHook), priority='VERY_LOW')
 
 
@@ -40,6 +40,63 @@ def master_only(func):
 
     return wrapper
 
+def get_rss_bytes():
+    """Get the resident set size of the current process in bytes.
+    Uses ``psutil`` when installed, ``/proc/self/statm`` on Linux and falls
+    back to the peak RSS reported by :mod:`resource` otherwise.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def reset_peak_rss():
+    """Reset the peak resident set size of the process to its current one.
+    Only Linux supports this, through ``/proc/self/clear_refs``, which
+    may also be read-only, e.g. in some containers.
+    Returns:
+        bool: Whether the peak was reset.
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def get_peak_rss_bytes():
+    """Get the peak resident set size of the process in bytes, since the
+    last :func:`reset_peak_rss` on Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def inference_mode():
+    """Context manager for evaluation, ``torch.inference_mode`` if available
+    and ``torch.no_grad`` on older torch versions."""
+    if hasattr(torch, 'inference_mode'):
+        return torch.inference_mode()
+    return torch.no_grad()
+
 def get_time_str():
     return time.strftime('%Y%m%d_%H%M%S', time.localtime())
 
@@ -77,6 +134,34 @@ def obj_from_dict(info, parrent=None, default_args=None):
     return obj_type(**args)
 
 
+def get_rng_state():
+    """Get the states of the python, numpy, torch and CUDA generators.
+    The numpy state is stored as tensors so that the result can be loaded
+    with ``torch.load(..., weights_only=True)``.
+    """
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    state = dict(
+        python=random.getstate(),
+        numpy=(name, torch.from_numpy(keys.astype(np.int64)), pos, has_gauss,
+               cached_gaussian),
+        torch=torch.get_rng_state())
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    """Restore generator states returned by :func:`get_rng_state`."""
+    version, internal_state, gauss_next = state['python']
+    random.setstate((version, tuple(internal_state), gauss_next))
+    name, keys, pos, has_gauss, cached_gaussian = state['numpy']
+    np.random.set_state((name, keys.cpu().numpy().astype(np.uint32), pos,
+                         has_gauss, cached_gaussian))
+    torch.set_rng_state(state['torch'].cpu())
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all([s.cpu() for s in state['cuda']])
+
+
 def seed_everything(
     seed = 3407,
     deterministic = False, 
@@ -24,6 +24,6 @@ def mkdir_or_exist(dir_name, mode=0o777):
             os.makedirs(dir_name, mode=mode)
 
 def symlink(src, dst, overwrite=True, **kwargs):
-    if osp.exists(dst) and overwrite:
+    if osp.lexists(dst) and overwrite:
         os.remove(dst)
     os.symlink(src, dst, **kwargs)
\ No newline at end of file
@@ -1,15 +1,55 @@
 import inspect
-from functools import partial
+from collections import OrderedDict
+from functools import lru_cache, partial
+from importlib import import_module
 
 from .misc import is_seq_of
 
-def build_from_cfg(cfg, registry, default_args=None):
+
+@lru_cache(maxsize=None)
+def scan_entry_points(group):
+    """Find the plugins of an entry point group.
+    The installed distributions are only scanned once per group.
+    Args:
+        group (str): Entry point group, e.g. ``'engine.hook'``.
+    Returns:
+        dict: Entry point names mapped to ``'module:attr'`` paths.
+    """
+    from importlib.metadata import entry_points
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=group)
+    else:  # python < 3.10
+        eps = eps.get(group, [])
+    return {ep.name: ep.value for ep in eps}
+
+
+def _freeze(obj):
+    """Turn a config into a hashable key, raises TypeError if impossible."""
+    if isinstance(obj, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in obj.items()))
+    elif isinstance(obj, (list, tuple)):
+        return type(obj), tuple(_freeze(v) for v in obj)
+    hash(obj)
+    return obj
+
+# the objects last built with ``build_from_cfg(..., memoize=True)``, least
+# recently used first; bounded so it does not keep every object alive
+_built_objects = OrderedDict()
+MAX_MEMOIZED = 128
+
+def build_from_cfg(cfg, registry, default_args=None, memoize=False):
     """Builds a registry from a configuration dict.
 
     Args:
         cfg (dict): The configuration.
         registry (dict): The registry.
         default_args (dict): The default arguments.
+        memoize (bool): Return the object built before from an equal
+            config instead of a new one. Only use this for objects without
+            state, hooks for example must not be shared. Configs with
+            unhashable values are always built, and only the
+            ``MAX_MEMOIZED`` most recently used objects are kept.
 
     Returns:
         object: The built object.
@@ -30,11 +70,20 @@ def build_from_cfg(cfg, registry, default_args=None):
     if not (isinstance(default_args, dict) or default_args is None):
         raise TypeError(f'default_args must be a dict or None, but got {type(default_args)}')
 
-    args = cfg.copy()
-
-    if default_args is not None:
-        for name, value in default_args.items():
-            args.setdefault(name, value)
+    if default_args:
+        args = dict(default_args, **cfg)
+    else:
+        args = cfg.copy()
+
+    key = None
+    if memoize:
+        try:
+            key = (registry, _freeze(args))
+        except TypeError:
+            pass
+        if key is not None and key in _built_objects:
+            _built_objects.move_to_end(key)
+            return _built_objects[key]
 
     obj_name = args.pop('name')
     if isinstance(obj_name, str):
@@ -47,27 +96,46 @@ def build_from_cfg(cfg, registry, default_args=None):
         raise TypeError(f'`name` must be a str or a class, but got {type(obj_name)}')
 
     try:
-        return obj_cls(**args)
+        obj = obj_cls(**args)
     except Exception as e:
         raise type(e)(f'{obj_cls.__name__}:{e}')
+    if key is not None:
+        _built_objects[key] = obj
+        if len(_built_objects) > MAX_MEMOIZED:
+            _built_objects.popitem(last=False)
+    return obj
 
 
 class Registry(object):
     """A registry to map strings to classes.
 
+    Classes can also be declared by their import path with
+    :meth:`register_lazy`, or by installed packages through the entry point
+    group ``entry_point_group``. They are imported on the first :meth:`get`.
+
     Args:
         name (str): Registry name.
+        entry_point_group (str, optional): Entry point group of plugins,
+            ``'engine.<name>'`` by default.
     """
-    def __init__(self, name):
+    def __init__(self, name, entry_point_group=None):
         self._name = name
         self._module_dict = dict()
+        self._lazy_dict = dict()
+        if entry_point_group is None:
+            entry_point_group = 'engine.{}'.format(name)
+        self._entry_point_group = entry_point_group
+        self._plugins_scanned = False
 
     def __len__(self):
-        return len(self._module_dict)
+        return len(self._module_dict) + len(self._lazy_dict)
+
+    def __contains__(self, key):
+        return key in self._module_dict or key in self._lazy_dict
 
     def __repr__(self):
         format_str = self.__class__.__name__ + '(name={}, items={}'.format(
-            self._name, list(self._module_dict.keys()))
+            self._name, list(self._module_dict.keys()) + list(self._lazy_dict))
         return format_str
 
     @property
@@ -80,6 +148,8 @@ class Registry(object):
 
     def get(self, key):
         """Get the registry record.
+        Lazy entries are imported here on first use. If the key is unknown,
+        the entry point plugins are scanned once.
 
         Args:
             key (str): The class name in string format.
@@ -87,17 +157,66 @@ class Registry(object):
             class: The corresponding class.
 
         """
-        return self._module_dict.get(key, None)
+        obj_cls = self._module_dict.get(key)
+        if obj_cls is not None:
+            return obj_cls
+        if key not in self._lazy_dict and not self._plugins_scanned:
+            self.scan_plugins()
+        if key in self._lazy_dict:
+            return self._import_lazy(key)
+        return None
+
+    def scan_plugins(self):
+        """Add the entry point plugins of this registry as lazy entries."""
+        self._plugins_scanned = True
+        if not self._entry_point_group:
+            return
+        for name, path in scan_entry_points(self._entry_point_group).items():
+            if name not in self:
+                self._lazy_dict[name] = path
+
+    def _import_lazy(self, key):
+        path = self._lazy_dict[key]
+        module_name, _, attr = path.partition(':')
+        if not attr:
+            module_name, _, attr = path.rpartition('.')
+        module = import_module(module_name)
+        # importing the module may have registered the class already
+        obj_cls = self._module_dict.get(key)
+        if obj_cls is None:
+            obj_cls = getattr(module, attr)
+            self._register_module(obj_cls, name=key)
+        self._lazy_dict.pop(key, None)
+        return obj_cls
 
-    def _register_module(self, module_class, force=False):
+    def _register_module(self, module_class, force=False, name=None):
         if not inspect.isclass(module_class):
             raise TypeError('module must be a class, but got {}'.format(
                 type(module_class)))
-        module_name = module_class.__name__
+        module_name = module_class.__name__ if name is None else name
         if not force and module_name in self._module_dict:
             raise KeyError('{} is already registered in {}'.format(
                 module_name, self.name))
         self._module_dict[module_name] = module_class
+        # a lazy entry is resolved once its module registers the class
+        self._lazy_dict.pop(module_name, None)
+
+    def register_lazy(self, name, path, force=False):
+        """Declare a class by its import path without importing it.
+        Example:
+            >>> HOOKS.register_lazy(
+            >>>     'WandBLoggerHook',
+            >>>     'engine.trainer.hooks.logger.wandb:WandBLoggerHook')
+        Args:
+            name (str): Key of the class in the registry.
+            path (str): ``'module:attr'`` or dotted ``'module.attr'`` path.
+            force (bool, optional): Whether to override an existing entry.
+        """
+        if not force and name in self:
+            raise KeyError('{} is already registered in {}'.format(
+                name, self.name))
+        self._module_dict.pop(name, None)
+        self._lazy_dict[name] = path
 
     def register_module(self, cls=None, force=False):
         """Register a module.
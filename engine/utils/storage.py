@@ -0,0 +1,354 @@
+"""Storage backends chosen by the scheme of a URI.
+
+Paths without a scheme and ``file://`` URIs are local files, ``http://``
+and ``https://`` URIs are read-only, and other schemes (``s3://``,
+``gs://``, ...) go through fsspec when it is installed. Reads are split
+into ranged requests issued in parallel, writes into parts uploaded in
+parallel where the backend allows it.
+
+Example:
+    >>> backend = get_backend('s3://bucket/ckpt/latest.pth')
+    >>> backend.get_file('s3://bucket/ckpt/latest.pth', '/tmp/latest.pth')
+    >>> # an object store backed by a local directory, e.g. for tests
+    >>> register_backend('dir', DirectoryBackend('/tmp/store'))
+"""
+import os
+import os.path as osp
+import re
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+from .path import mkdir_or_exist
+
+_SCHEME = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*)://')
+
+
+def parse_uri(uri):
+    """Split ``uri`` into its scheme and path; the scheme of local paths
+    is ``'file'``."""
+    match = _SCHEME.match(uri)
+    if match is None:
+        return 'file', uri
+    return match.group(1).lower(), uri[match.end():]
+
+
+def is_local(uri):
+    return parse_uri(uri)[0] == 'file'
+
+
+class StorageBackend(object):
+    """Base class of the storage backends.
+    Subclasses implement :meth:`size`, :meth:`read_range` and
+    :meth:`exists`, and writable ones the multipart protocol of
+    :meth:`_begin`, :meth:`_put_part`, :meth:`_commit` and :meth:`_abort`.
+    Parts may be uploaded concurrently and in any order.
+    Args:
+        part_size (int): Bytes per ranged read or uploaded part.
+        num_workers (int): Concurrent requests per transfer.
+    """
+    read_only = False
+
+    def __init__(self, part_size=16 << 20, num_workers=8):
+        self.part_size = part_size
+        self.num_workers = num_workers
+
+    def size(self, uri):
+        raise NotImplementedError
+
+    def read_range(self, uri, offset, size):
+        raise NotImplementedError
+
+    def exists(self, uri):
+        raise NotImplementedError
+
+    def _begin(self, uri, size):
+        raise NotImplementedError
+
+    def _put_part(self, upload, index, offset, data):
+        raise NotImplementedError
+
+    def _commit(self, upload):
+        raise NotImplementedError
+
+    def _abort(self, upload):
+        pass
+
+    def _ranges(self, size):
+        return [(offset, min(self.part_size, size - offset))
+                for offset in range(0, size, self.part_size)]
+
+    def get(self, uri):
+        """Read an object with parallel ranged reads.
+        Returns:
+            bytes: The content of the object.
+        """
+        size = self.size(uri)
+        buf = bytearray(size)
+
+        def read(part):
+            offset, length = part
+            buf[offset:offset + length] = self.read_range(uri, offset, length)
+
+        with ThreadPoolExecutor(self.num_workers) as executor:
+            list(executor.map(read, self._ranges(size)))
+        return bytes(buf)
+
+    def get_file(self, uri, filename):
+        """Download an object to a local file with parallel ranged reads."""
+        size = self.size(uri)
+        mkdir_or_exist(osp.dirname(osp.abspath(filename)))
+        tmp_filename = '{}.{}.tmp'.format(filename, uuid.uuid4().hex)
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+
+            def read(part):
+                offset, length = part
+                os.pwrite(fd, self.read_range(uri, offset, length), offset)
+
+            with ThreadPoolExecutor(self.num_workers) as executor:
+                list(executor.map(read, self._ranges(size)))
+        except BaseException:
+            os.close(fd)
+            os.remove(tmp_filename)
+            raise
+        os.close(fd)
+        os.replace(tmp_filename, filename)
+
+    def _put_parts(self, uri, size, read_part):
+        if self.read_only:
+            raise IOError('{} is read-only'.format(uri))
+        upload = self._begin(uri, size)
+        try:
+            def put(index_part):
+                index, (offset, length) = index_part
+                self._put_part(upload, index, offset, read_part(offset, length))
+
+            with ThreadPoolExecutor(self.num_workers) as executor:
+                list(executor.map(put, enumerate(self._ranges(size))))
+        except BaseException:
+            self._abort(upload)
+            raise
+        self._commit(upload)
+
+    def put(self, data, uri):
+        """Write ``data`` to an object with a parallel multipart upload."""
+        view = memoryview(data).cast('B')
+        self._put_parts(uri, len(view),
+                        lambda offset, length: view[offset:offset + length])
+
+    def put_file(self, filename, uri):
+        """Upload a local file with a parallel multipart upload."""
+        with open(filename, 'rb') as f:
+            self._put_parts(
+                uri, os.fstat(f.fileno()).st_size,
+                lambda offset, length: os.pread(f.fileno(), length, offset))
+
+
+class LocalBackend(StorageBackend):
+    """Local files; ``file://`` prefixes are stripped."""
+
+    @staticmethod
+    def _path(uri):
+        return parse_uri(uri)[1]
+
+    def size(self, uri):
+        return osp.getsize(self._path(uri))
+
+    def read_range(self, uri, offset, size):
+        with open(self._path(uri), 'rb') as f:
+            return os.pread(f.fileno(), size, offset)
+
+    def exists(self, uri):
+        return osp.exists(self._path(uri))
+
+    def _begin(self, uri, size):
+        path = self._path(uri)
+        mkdir_or_exist(osp.dirname(osp.abspath(path)))
+        tmp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(fd, size)
+        return path, tmp_path, fd
+
+    def _put_part(self, upload, index, offset, data):
+        os.pwrite(upload[2], data, offset)
+
+    def _commit(self, upload):
+        path, tmp_path, fd = upload
+        os.close(fd)
+        os.replace(tmp_path, path)
+
+    def _abort(self, upload):
+        os.close(upload[2])
+        os.remove(upload[1])
+
+
+class DirectoryBackend(StorageBackend):
+    """An object store kept in a local directory, a stand-in for remote
+    stores in tests. Objects are files under ``root`` named by the path
+    of the URI; uploaded parts are kept apart until the upload is
+    committed, as in S3 multipart uploads.
+    Args:
+        root (str): Directory of the objects.
+    """
+
+    def __init__(self, root, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+
+    def _path(self, uri):
+        return osp.join(self.root, parse_uri(uri)[1].lstrip('/'))
+
+    def size(self, uri):
+        return osp.getsize(self._path(uri))
+
+    def read_range(self, uri, offset, size):
+        with open(self._path(uri), 'rb') as f:
+            return os.pread(f.fileno(), size, offset)
+
+    def exists(self, uri):
+        return osp.isfile(self._path(uri))
+
+    def _begin(self, uri, size):
+        part_dir = osp.join(self.root, '.uploads', uuid.uuid4().hex)
+        mkdir_or_exist(part_dir)
+        return self._path(uri), part_dir, {}
+
+    def _put_part(self, upload, index, offset, data):
+        part = osp.join(upload[1], str(index))
+        with open(part, 'wb') as f:
+            f.write(data)
+        upload[2][index] = part
+
+    def _commit(self, upload):
+        path, part_dir, parts = upload
+        mkdir_or_exist(osp.dirname(path))
+        tmp_path = osp.join(part_dir, 'object')
+        with open(tmp_path, 'wb') as out:
+            for index in sorted(parts):
+                with open(parts[index], 'rb') as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp_path, path)
+        shutil.rmtree(part_dir)
+
+    def _abort(self, upload):
+        shutil.rmtree(upload[1], ignore_errors=True)
+
+
+class FsspecBackend(StorageBackend):
+    """Object stores and other file systems supported by fsspec.
+    Reads are parallel ranged reads. fsspec has no generic API for
+    parallel parts, so writes stream through a file opened with
+    ``block_size=part_size``, which object stores such as s3fs upload
+    as a multipart upload.
+    Args:
+        protocol (str): fsspec protocol, e.g. 's3'.
+        **storage_options: Options of the file system.
+    """
+
+    def __init__(self, protocol, part_size=16 << 20, num_workers=8,
+                 **storage_options):
+        super().__init__(part_size, num_workers)
+        import fsspec
+        self.fs = fsspec.filesystem(protocol, **storage_options)
+
+    def size(self, uri):
+        return self.fs.size(uri)
+
+    def read_range(self, uri, offset, size):
+        return self.fs.cat_file(uri, start=offset, end=offset + size)
+
+    def exists(self, uri):
+        return self.fs.exists(uri)
+
+    def put(self, data, uri):
+        with self.fs.open(uri, 'wb', block_size=self.part_size) as f:
+            f.write(data)
+
+    def put_file(self, filename, uri):
+        with open(filename, 'rb') as src, \
+                self.fs.open(uri, 'wb', block_size=self.part_size) as dst:
+            shutil.copyfileobj(src, dst, self.part_size)
+
+
+class HTTPBackend(StorageBackend):
+    """Read-only HTTP(S) with ``Range`` requests.
+    Servers that do not accept ranges are read with a single request.
+    """
+    read_only = True
+
+    def __init__(self, part_size=16 << 20, num_workers=8, timeout=60):
+        super().__init__(part_size, num_workers)
+        self.timeout = timeout
+
+    def _head(self, uri):
+        with urlopen(Request(uri, method='HEAD'), timeout=self.timeout) as r:
+            return r.headers
+
+    def size(self, uri):
+        return int(self._head(uri)['Content-Length'])
+
+    def exists(self, uri):
+        try:
+            self._head(uri)
+        except IOError:
+            return False
+        return True
+
+    def read_range(self, uri, offset, size):
+        request = Request(uri, headers={
+            'Range': 'bytes={}-{}'.format(offset, offset + size - 1)})
+        with urlopen(request, timeout=self.timeout) as r:
+            if r.status != 206:
+                raise IOError('{} does not support range requests'.format(uri))
+            return r.read()
+
+    def get(self, uri):
+        headers = self._head(uri)
+        if headers.get('Accept-Ranges') != 'bytes':
+            with urlopen(uri, timeout=self.timeout) as r:
+                return r.read()
+        return super().get(uri)
+
+    def get_file(self, uri, filename):
+        headers = self._head(uri)
+        if headers.get('Accept-Ranges') == 'bytes' and 'Content-Length' in headers:
+            return super().get_file(uri, filename)
+        mkdir_or_exist(osp.dirname(osp.abspath(filename)))
+        tmp_filename = '{}.{}.tmp'.format(filename, uuid.uuid4().hex)
+        try:
+            with urlopen(uri, timeout=self.timeout) as r, \
+                    open(tmp_filename, 'wb') as f:
+                shutil.copyfileobj(r, f, self.part_size)
+        except BaseException:
+            if osp.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+        os.replace(tmp_filename, filename)
+
+
+_backends = {'file': LocalBackend(), 'http': HTTPBackend(), 'https': HTTPBackend()}
+_lock = threading.Lock()
+
+
+def register_backend(scheme, backend):
+    """Use ``backend`` for the URIs of ``scheme``."""
+    with _lock:
+        _backends[scheme.lower()] = backend
+
+
+def get_backend(uri):
+    """Get the backend of a URI, creating an fsspec backend on first use
+    of an unregistered scheme."""
+    scheme = parse_uri(uri)[0]
+    with _lock:
+        if scheme not in _backends:
+            try:
+                _backends[scheme] = FsspecBackend(scheme)
+            except (ImportError, ValueError) as e:
+                raise ValueError('no storage backend for {}://, install '
+                                 'fsspec or register one'.format(scheme)) from e
+        return _backends[scheme]
@@ -0,0 +1,237 @@
+"""A content-addressed cache of remote weights shared by the jobs of a node.
+
+Layout of the cache directory::
+
+    blobs/<sha256>        downloaded files, named by their content hash
+    urls/<sha256 of url>  json record of the url, its hash and size
+    locks/                one lock file per url, ``<sha256>.pin`` per blob
+                          and ``.lock`` for eviction
+
+Only one process downloads a url. The others block on its lock and then
+use the file it stored. Blobs are evicted least recently used first once
+``max_bytes`` is exceeded; :meth:`WeightsCache.pin` holds a shared lock on
+the pin file of a blob while it is opened, and eviction skips blobs whose
+pin file it cannot lock exclusively. In offline mode nothing is downloaded
+and a missing file is an error.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import os.path as osp
+import re
+import threading
+import uuid
+
+from .path import mkdir_or_exist
+from .storage import get_backend
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+# torch hub convention: the file name ends with a prefix of its sha256,
+# e.g. resnet18-f37072fd.pth
+HASH_REGEX = re.compile(r'-([a-f0-9]*)\.')
+
+
+def _sha256(filename, chunk_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+class WeightsCache(object):
+    """Download remote files once per node.
+    Args:
+        cache_dir (str, optional): Directory of the cache,
+            ``$ENGINE_CACHE_DIR`` or ``~/.cache/engine/weights`` by default.
+        max_bytes (int, optional): Size budget of the blobs,
+            ``$ENGINE_CACHE_MAX_BYTES`` or unlimited by default.
+        offline (bool, optional): Never download, ``$ENGINE_OFFLINE`` by
+            default.
+    """
+    def __init__(self, cache_dir=None, max_bytes=None, offline=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get(
+                'ENGINE_CACHE_DIR', osp.expanduser('~/.cache/engine/weights'))
+        if max_bytes is None and os.environ.get('ENGINE_CACHE_MAX_BYTES'):
+            max_bytes = int(os.environ['ENGINE_CACHE_MAX_BYTES'])
+        if offline is None:
+            offline = _env_flag('ENGINE_OFFLINE')
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.offline = offline
+        for sub in ('blobs', 'urls', 'locks', 'tmp'):
+            mkdir_or_exist(osp.join(cache_dir, sub))
+
+    def _blob(self, sha256):
+        return osp.join(self.cache_dir, 'blobs', sha256)
+
+    def _lookup(self, key, sha256=None):
+        """Get the cached blob of a url key or content hash, or None."""
+        if sha256 is None:
+            try:
+                with open(osp.join(self.cache_dir, 'urls', key)) as f:
+                    sha256 = json.load(f)['sha256']
+            except (FileNotFoundError, ValueError, KeyError):
+                return None
+        blob = self._blob(sha256)
+        try:
+            # the modification time orders the blobs for eviction
+            os.utime(blob)
+        except FileNotFoundError:
+            return None
+        return blob
+
+    def fetch(self, url, sha256=None, check_hash=True):
+        """Get the local path of the file at ``url``, downloading it first if
+        it is not cached.
+        Args:
+            url (str): URI of any storage backend, e.g. ``https://...``.
+            sha256 (str, optional): Expected content hash. A blob with this
+                hash is used even if it was downloaded from another url.
+            check_hash (bool): Check the hash prefix in the file name, as
+                torch hub does.
+        Returns:
+            str: Path of the cached file.
+        """
+        key = hashlib.sha256(url.encode()).hexdigest()
+        blob = self._lookup(key, sha256)
+        if blob is not None:
+            return blob
+        if self.offline:
+            raise IOError('{} is not cached in {} and downloads are disabled '
+                          '(offline mode)'.format(url, self.cache_dir))
+
+        lock_file = osp.join(self.cache_dir, 'locks', key)
+        with open(lock_file, 'a+b') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # downloaded by another process while we waited
+            blob = self._lookup(key, sha256)
+            if blob is not None:
+                return blob
+            return self._download(url, key, sha256, check_hash)
+
+    def _pin_file(self, blob):
+        # kept after the blob is evicted, an unlinked lock file would let a
+        # pin and an eviction lock different files
+        return osp.join(self.cache_dir, 'locks', osp.basename(blob) + '.pin')
+
+    @contextlib.contextmanager
+    def pin(self, url, sha256=None, check_hash=True, retries=3):
+        """Fetch ``url`` like :meth:`fetch` and keep its blob from being
+        evicted by any process until the context exits. Open or map the
+        file in the context; the opened file outlives an eviction. Only this
+        blob is locked, other urls can be fetched in the context.
+        Example:
+            >>> with cache.pin(url) as filename:
+            ...     state_dict = torch.load(filename, mmap=True)
+        """
+        for _ in range(retries):
+            blob = self.fetch(url, sha256, check_hash)
+            if fcntl is None:
+                yield blob
+                return
+            with open(self._pin_file(blob), 'a+b') as lock:
+                # evictions lock the pin file exclusively
+                fcntl.flock(lock, fcntl.LOCK_SH)
+                # otherwise evicted between the lookup and the lock, fetch
+                # it again
+                if osp.isfile(blob):
+                    yield blob
+                    return
+        raise FileNotFoundError(
+            'the blob of {} was evicted {} times in a row'.format(
+                url, retries))
+
+    def _download(self, url, key, sha256, check_hash):
+        tmp_filename = osp.join(self.cache_dir, 'tmp', uuid.uuid4().hex)
+        try:
+            get_backend(url).get_file(url, tmp_filename)
+            digest = _sha256(tmp_filename)
+            expected = sha256
+            if expected is None and check_hash:
+                match = HASH_REGEX.search(osp.basename(url))
+                expected = match.group(1) if match else None
+            if expected is not None and not digest.startswith(expected):
+                raise RuntimeError('invalid hash of {}: expected {}, got {}'.format(
+                    url, expected, digest))
+            size = osp.getsize(tmp_filename)
+            self._evict(self.max_bytes - size if self.max_bytes else None)
+            blob = self._blob(digest)
+            os.replace(tmp_filename, blob)
+        finally:
+            if osp.exists(tmp_filename):
+                os.remove(tmp_filename)
+
+        record = osp.join(self.cache_dir, 'urls', key)
+        with open(record + '.tmp', 'w') as f:
+            json.dump(dict(url=url, sha256=digest, size=size), f)
+        os.replace(record + '.tmp', record)
+        return blob
+
+    def _evict(self, target):
+        """Remove the least recently used blobs until at most ``target``
+        bytes are cached."""
+        if target is None:
+            return
+        with open(osp.join(self.cache_dir, 'locks', '.lock'), 'a+b') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = []
+            for entry in os.scandir(osp.join(self.cache_dir, 'blobs')):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            entries.sort()
+            size = sum(entry[1] for entry in entries)
+            for _, nbytes, path in entries:
+                if size <= target:
+                    break
+                # readers keep their mappings of removed files, and the url
+                # records of a removed blob miss on the next lookup
+                if self._remove_unpinned(path):
+                    size -= nbytes
+
+    def _remove_unpinned(self, blob):
+        """Remove a blob unless it is pinned.
+        Returns:
+            bool: Whether the blob was removed.
+        """
+        if fcntl is None:
+            os.remove(blob)
+            return True
+        with open(self._pin_file(blob), 'a+b') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                os.remove(blob)
+            except FileNotFoundError:
+                pass
+            return True
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_weights_cache():
+    """Get the cache configured by the environment variables."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = WeightsCache()
+        return _default_cache
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from engine.trainer.trainer import Trainer
+
+
+def batch_processor(model, data, train_mode, **kwargs):
+    x, y = data
+    loss = ((model(x) - y) ** 2).mean()
+    return dict(loss=loss, log_vars={'loss': loss.item()},
+                num_samples=x.size(0))
+
+
+def toy_model():
+    torch.manual_seed(0)
+    return nn.Sequential(nn.Linear(4, 8), nn.ReLU(), nn.Linear(8, 1))
+
+
+@pytest.fixture
+def model():
+    return toy_model()
+
+
+@pytest.fixture
+def make_trainer(tmp_path):
+    """Build a trainer of a small regression model and its data loader,
+    with the default training hooks and a text logger."""
+
+    def make(work_dir=tmp_path, num_samples=32, batch_size=8,
+             checkpoint_config=None, best_model_config=None,
+             lr_config=dict(policy='Fixed'), shuffle=False, **kwargs):
+        config = SimpleNamespace(log_average_filter=[], name='toy',
+                                 model=SimpleNamespace(name='toy'))
+        trainer = Trainer(config, toy_model(), batch_processor,
+                          optimizer=dict(name='SGD', lr=0.01, momentum=0.9),
+                          work_dir=str(work_dir), **kwargs)
+        trainer.register_training_hooks(
+            lr_config, dict(grad_clip=None),
+            checkpoint_config=checkpoint_config,
+            log_config=dict(interval=1, hooks=[dict(name='TextLoggerHook')]),
+            best_model_config=best_model_config)
+        dataset = TensorDataset(torch.randn(num_samples, 4),
+                                torch.randn(num_samples, 1))
+        return trainer, DataLoader(dataset, batch_size=batch_size,
+                                   shuffle=shuffle)
+
+    return make
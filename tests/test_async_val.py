@@ -0,0 +1,34 @@
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from engine.trainer.hooks import AsyncValHook, Hook
+
+
+class _Results(Hook):
+
+    def __init__(self):
+        self.results = []
+
+    def after_async_val(self, trainer):
+        self.results.append((trainer.mode, dict(trainer.log_buffer.output)))
+
+
+def test_async_val(make_trainer):
+    trainer, loader = make_trainer()
+    torch.manual_seed(1)
+    val_loader = DataLoader(
+        TensorDataset(torch.randn(12, 4), torch.randn(12, 1)), batch_size=4)
+    results = _Results()
+    trainer.register_hook(AsyncValHook(val_loader, interval=1))
+    trainer.register_hook(results)
+    trainer.fit([loader], [('train', 1)], 1)
+
+    assert len(results.results) == 1
+    mode, metrics = results.results[0]
+    assert mode == 'val'
+    # the weights after the first epoch, evaluated over the whole loader
+    model = trainer.model.eval()
+    with torch.no_grad():
+        losses = [((model(x) - y) ** 2).mean() for x, y in val_loader]
+    assert abs(metrics['loss'] - sum(losses).item() / 3) < 1e-5
+    assert trainer.mode == 'train'
@@ -0,0 +1,51 @@
+import json
+import sys
+
+import pytest
+import torch
+
+from benchmarks import run
+
+
+def _stats(median):
+    return dict(median=median, min=median, max=median)
+
+
+def test_compare():
+    baseline = {'a': _stats(1.), 'b': _stats(1.), 'c': _stats(1.)}
+    results = {'a': _stats(1.05), 'b': _stats(1.5), 'c': _stats(0.5),
+               'new': _stats(9.)}
+    assert run.compare(results, baseline, 0.1) == [('b', 1., 1.5, 1.5)]
+    assert run.compare(results, baseline, 0.01) == [
+        ('a', 1., 1.05, pytest.approx(1.05)), ('b', 1., 1.5, 1.5)]
+    assert run.compare(results, baseline, 1.) == []
+
+
+class _Suite(object):
+
+    def __init__(self, median):
+        self.median = median
+
+    def run(self):
+        return {'fake/op': _stats(self.median)}
+
+
+@pytest.mark.parametrize('median,tolerance,status', [
+    (1.1, '0.2', None), (1.3, '0.2', 1), (1.1, '0.05', 1)])
+def test_main_exit_status(tmp_path, monkeypatch, median, tolerance, status):
+    baseline = str(tmp_path / 'baseline.json')
+    with open(baseline, 'w') as f:
+        json.dump(dict(results={'fake/op': _stats(1.)}), f)
+    monkeypatch.setitem(run.SUITES, 'fake', _Suite(median))
+    out = str(tmp_path / 'out.json')
+    monkeypatch.setattr(sys, 'argv', [
+        'run', 'fake', '--out', out, '--compare', baseline,
+        '--tolerance', tolerance, '--threads', str(torch.get_num_threads())])
+    if status is None:
+        run.main()
+    else:
+        with pytest.raises(SystemExit) as excinfo:
+            run.main()
+        assert excinfo.value.code == status
+    with open(out) as f:
+        assert json.load(f)['results'] == {'fake/op': _stats(median)}
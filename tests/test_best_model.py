@@ -0,0 +1,90 @@
+import logging
+import os.path as osp
+from types import SimpleNamespace
+
+import torch
+
+from engine.trainer.hooks import BestModelHook
+from engine.trainer.log_buffer import LogBuffer
+
+
+def _make_trainer(model, work_dir):
+    return SimpleNamespace(model=model, log_buffer=LogBuffer([]), epoch=0,
+                           iter=0, work_dir=str(work_dir),
+                           logger=logging.getLogger(__name__))
+
+
+def _val(hook, trainer, epoch, value):
+    """Validate weights filled with ``epoch``, monitoring ``value``."""
+    for param in trainer.model.parameters():
+        param.data.fill_(epoch)
+    trainer.epoch, trainer.iter = epoch, 10 * epoch
+    trainer.log_buffer.output = {'val_loss': value}
+    hook.after_val_epoch(trainer)
+
+
+def test_best_model(tmp_path, model):
+    trainer = _make_trainer(model, tmp_path)
+    hook = BestModelHook(min_delta=0.1, save_interval=2, restore_best=True)
+    hook.before_run(trainer)
+    filename = osp.join(str(tmp_path), 'best.pth')
+
+    _val(hook, trainer, 0, 3.)
+    hook.after_train_epoch(trainer)
+    # kept in memory until the save interval
+    assert not osp.exists(filename)
+    _val(hook, trainer, 1, 1.)
+    _val(hook, trainer, 2, 0.95)  # within min_delta
+    _val(hook, trainer, 3, 2.)
+    assert (hook.best, hook.best_epoch, hook.best_iter) == (1., 1, 10)
+    for tensor in hook.buffer.values():
+        assert torch.all(tensor == 1)
+
+    trainer.epoch = 1
+    hook.after_train_epoch(trainer)
+    checkpoint = torch.load(filename)
+    assert checkpoint['meta']['epoch'] == 1
+    assert checkpoint['meta']['best'] == 1.
+    assert not hook.dirty
+
+    # a later best is written at the end of the run
+    _val(hook, trainer, 4, 0.5)
+    hook.after_run(trainer)
+    checkpoint = torch.load(filename)
+    assert checkpoint['meta']['epoch'] == 4
+    for name, tensor in model.state_dict().items():
+        assert torch.equal(tensor, checkpoint['state_dict'][name])
+        assert torch.all(tensor == 4)
+
+
+def test_restore_best(tmp_path, model):
+    trainer = _make_trainer(model, tmp_path)
+    hook = BestModelHook(monitor='acc', restore_best=True)
+    hook.before_run(trainer)
+    for epoch, acc in enumerate([0.5, 0.9, 0.7]):
+        trainer.log_buffer.output = {'acc': acc}
+        for param in model.parameters():
+            param.data.fill_(epoch)
+        trainer.epoch = epoch
+        hook.after_val_epoch(trainer)
+    best = {name: tensor.clone() for name, tensor in hook.buffer.items()}
+    hook.after_run(trainer)
+
+    # the weights of the best epoch are back in the model and on disk
+    saved = torch.load(osp.join(str(tmp_path), 'best.pth'))['state_dict']
+    for name, tensor in model.state_dict().items():
+        assert torch.all(tensor == 1)
+        assert torch.equal(tensor, best[name])
+        assert torch.equal(tensor, saved[name])
+
+
+def test_missing_monitor(tmp_path, model, caplog):
+    trainer = _make_trainer(model, tmp_path)
+    hook = BestModelHook(monitor='val_acc')
+    hook.before_run(trainer)
+    trainer.log_buffer.output = {'val_loss': 1.}
+    hook.after_val_epoch(trainer)
+    assert hook.best_epoch is None
+    assert 'val_acc' in caplog.text
+    hook.after_run(trainer)
+    assert not osp.exists(osp.join(str(tmp_path), 'best.pth'))
@@ -0,0 +1,231 @@
+import copy
+import os
+import os.path as osp
+from types import SimpleNamespace
+
+import pytest
+import torch
+from torch import nn
+
+from engine.trainer import checkpoint as checkpoint_module
+from engine.trainer import serialization
+from engine.trainer.checkpoint import (load_checkpoint, load_state_dict,
+                                       materialize_module, save_checkpoint)
+from engine.trainer.integrity import MANIFEST_SUFFIX, verify_checkpoint
+from engine.trainer.trainer import Trainer
+from engine.utils.storage import DirectoryBackend, register_backend
+
+
+def test_manifest_written_before_checkpoint(tmp_path, model, monkeypatch):
+    filename = str(tmp_path / 'ckpt.pth')
+    save_checkpoint(model, filename)
+    replace = os.replace
+
+    def crash(src, dst):
+        if dst == filename:
+            raise KeyboardInterrupt
+        replace(src, dst)
+
+    # interrupted right before the new checkpoint is published
+    monkeypatch.setattr(checkpoint_module.os, 'replace', crash)
+    for param in model.parameters():
+        param.data.add_(1)
+    with pytest.raises(KeyboardInterrupt):
+        save_checkpoint(model, filename)
+    monkeypatch.undo()
+    assert osp.isfile(filename + MANIFEST_SUFFIX)
+    # the old file no longer matches, it is never taken for the new one
+    assert verify_checkpoint(filename)
+
+
+def test_file_uri(tmp_path, model):
+    filename = str(tmp_path / 'sub' / 'ckpt.pth')
+    save_checkpoint(model, 'file://' + filename,
+                    link_name='file://' + str(tmp_path / 'sub' / 'latest.pth'))
+    assert osp.isfile(filename)
+    assert osp.islink(str(tmp_path / 'sub' / 'latest.pth'))
+    assert not osp.exists('file:')
+    checkpoint = load_checkpoint(model, 'file://' + filename)
+    assert set(checkpoint['state_dict']) == set(model.state_dict())
+
+
+def test_load_from_torch_hub_cache(tmp_path, model, monkeypatch):
+    monkeypatch.setenv('TORCH_HOME', str(tmp_path))
+    os.makedirs(str(tmp_path / 'hub' / 'checkpoints'))
+    torch.save(model.state_dict(),
+               str(tmp_path / 'hub' / 'checkpoints' / 'toy-0123abcd.pth'))
+
+    def pin(url):
+        raise IOError('downloads are disabled')
+
+    monkeypatch.setattr(checkpoint_module, 'get_weights_cache',
+                        lambda: SimpleNamespace(pin=pin))
+    for param in model.parameters():
+        param.data.zero_()
+    load_checkpoint(model, 'https://example.com/weights/toy-0123abcd.pth')
+    assert all(param.abs().sum() > 0 for param in model.parameters())
+    with pytest.raises(IOError):
+        load_checkpoint(model, 'https://example.com/weights/other.pth')
+
+
+def _assert_same_weights(a, b):
+    a, b = a.state_dict(), b.state_dict()
+    assert list(a) == list(b)
+    for name in a:
+        assert torch.equal(a[name], b[name]), name
+
+
+def test_save_load_round_trip(tmp_path, model):
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+    model(torch.randn(2, 4)).sum().backward()
+    optimizer.step()
+    filename = str(tmp_path / 'ckpt.pth')
+    save_checkpoint(model, filename, optimizer, meta=dict(epoch=1),
+                    link_name=str(tmp_path / 'latest.pth'))
+
+    loaded = copy.deepcopy(model)
+    for param in loaded.parameters():
+        param.data.zero_()
+    checkpoint = load_checkpoint(loaded, str(tmp_path / 'latest.pth'))
+    _assert_same_weights(loaded, model)
+    assert checkpoint['meta']['epoch'] == 1
+    state = checkpoint['optimizer']['state'][0]['momentum_buffer']
+    assert torch.equal(state, optimizer.state_dict()['state'][0]['momentum_buffer'])
+
+
+def test_resume_round_trip(tmp_path, make_trainer):
+    trainer, loader = make_trainer(checkpoint_config=dict(interval=1))
+    trainer.fit([loader], [('train', 1)], 3)
+
+    resumed, loader = make_trainer(work_dir=tmp_path / 'resumed')
+    resumed.resume(str(tmp_path / 'toy_epoch_1'))
+    assert (resumed.epoch, resumed.iter) == (2, 8)
+    resumed.fit([loader], [('train', 1)], 3)
+    _assert_same_weights(resumed.model, trainer.model)
+
+
+def test_mid_epoch_resume(tmp_path, make_trainer):
+    lr_config = dict(policy='Step', step=[2], warmup='linear',
+                     warmup_iters=5)
+    trainer, loader = make_trainer(
+        checkpoint_config=dict(interval=6, by_epoch=False),
+        lr_config=lr_config, shuffle=True)
+    trainer.fit([loader], [('train', 1)], 3)
+
+    resumed, loader = make_trainer(work_dir=tmp_path / 'resumed',
+                                   lr_config=lr_config, shuffle=True)
+    resumed.resume(str(tmp_path / 'toy_iter_6'))
+    assert (resumed.epoch, resumed.iter) == (1, 6)
+    resumed.fit([loader], [('train', 1)], 3)
+    assert resumed.iter == trainer.iter == 12
+    _assert_same_weights(resumed.model, trainer.model)
+    assert resumed.current_lr() == trainer.current_lr()
+
+
+@pytest.mark.parametrize('compress', ['fast', 'strong'])
+def test_compressed_round_trip(tmp_path, make_trainer, compress):
+    trainer, loader = make_trainer(
+        checkpoint_config=dict(interval=1, compress=compress))
+    trainer.fit([loader], [('train', 1)], 3)
+    filename = str(tmp_path / 'toy_epoch_1')
+    assert serialization.is_chunked(filename)
+    assert verify_checkpoint(filename, deep=True) == []
+
+    resumed, loader = make_trainer(work_dir=tmp_path / 'resumed')
+    resumed.resume(filename)
+    resumed.fit([loader], [('train', 1)], 3)
+    _assert_same_weights(resumed.model, trainer.model)
+
+
+@pytest.fixture
+def store(tmp_path):
+    root = str(tmp_path / 'store')
+    # small parts, so uploads and downloads are split
+    register_backend('teststore', DirectoryBackend(root, part_size=1000))
+    return root
+
+
+@pytest.mark.parametrize('compress', [None, 'fast'])
+def test_remote_round_trip(store, model, compress):
+    uri = 'teststore://run/ckpt.pth'
+    save_checkpoint(model, uri, meta=dict(epoch=1), compress=compress,
+                    link_name='teststore://run/latest.pth')
+    assert sorted(os.listdir(osp.join(store, 'run'))) == [
+        'ckpt.pth', 'ckpt.pth' + MANIFEST_SUFFIX, 'latest.pth']
+    assert verify_checkpoint(osp.join(store, 'run', 'ckpt.pth')) == []
+
+    loaded = copy.deepcopy(model)
+    for param in loaded.parameters():
+        param.data.zero_()
+    checkpoint = load_checkpoint(loaded, 'teststore://run/latest.pth')
+    assert checkpoint['meta']['epoch'] == 1
+    _assert_same_weights(loaded, model)
+
+
+def test_remote_resume(store, make_trainer):
+    trainer, loader = make_trainer(
+        checkpoint_config=dict(interval=1, out_dir='teststore://run',
+                               async_save=True))
+    trainer.fit([loader], [('train', 1)], 3)
+    assert osp.isfile(osp.join(store, 'run', 'toy_epoch_1'))
+
+    resumed, loader = make_trainer()
+    resumed.resume('teststore://run/toy_epoch_1')
+    resumed.fit([loader], [('train', 1)], 3)
+    _assert_same_weights(resumed.model, trainer.model)
+
+
+def _batch_processor(model, data, train_mode, **kwargs):
+    raise NotImplementedError
+
+
+def _model_fn(num_outputs=1):
+    return nn.Sequential(nn.Linear(4, 8), nn.BatchNorm1d(8), nn.ReLU(),
+                         nn.Linear(8, num_outputs))
+
+
+@pytest.mark.parametrize('compress', [None, 'fast'])
+def test_meta_device_round_trip(tmp_path, compress):
+    torch.manual_seed(0)
+    model = _model_fn()
+    filename = str(tmp_path / 'ckpt.pth')
+    save_checkpoint(model, filename, compress=compress)
+    config = SimpleNamespace(log_average_filter=[], name='toy',
+                             model=SimpleNamespace(name='toy'))
+    trainer = Trainer.from_checkpoint(
+        config, _model_fn, _batch_processor, filename,
+        optimizer=dict(name='SGD', lr=0.01))
+    assert not any(t.is_meta for t in trainer.model.state_dict().values())
+    _assert_same_weights(trainer.model, model)
+    # the optimizer holds the materialized parameters
+    assert trainer.optimizer.param_groups[0]['params'][0] is \
+        trainer.model[0].weight
+
+    # a new head is initialized if mismatched tensors are skipped
+    trainer = Trainer.from_checkpoint(
+        config, lambda: _model_fn(3), _batch_processor, filename,
+        strict=False, skip_mismatched=True)
+    assert not trainer.model[3].weight.is_meta
+    assert torch.equal(trainer.model[0].weight, model[0].weight)
+    with pytest.raises(RuntimeError, match='size mismatch'):
+        Trainer.from_checkpoint(
+            config, lambda: _model_fn(3), _batch_processor, filename,
+            strict=False)
+
+
+def test_materialize_partially_loaded():
+    weight = torch.randn(2, 4)
+    with torch.device('meta'):
+        model = nn.Sequential(nn.Linear(4, 2), nn.BatchNorm1d(2))
+    load_state_dict(model, {'0.weight': weight, '1.running_mean': torch.ones(2)},
+                    assign=True)
+    assert model[0].bias.is_meta
+    assert materialize_module(model) == ['0', '1']
+    assert not any(t.is_meta for t in model.state_dict().values())
+    # the loaded tensors keep their values, only the rest is initialized
+    assert torch.equal(model[0].weight, weight)
+    assert model[0].weight.requires_grad
+    assert torch.all(model[0].bias.abs() <= 0.5)
+    assert torch.equal(model[1].running_mean, torch.ones(2))
+    assert torch.equal(model[1].running_var, torch.ones(2))
+    assert torch.equal(model[1].weight, torch.ones(2))
@@ -0,0 +1,61 @@
+import os
+import os.path as osp
+import signal
+
+import pytest
+
+from engine.trainer.hooks import Hook
+
+
+class _Kill(Hook):
+    """Send a signal to the process at a given iteration of a stage."""
+
+    def __init__(self, stage, inner_iter, signum=signal.SIGUSR1):
+        self.inner_iter = inner_iter
+        self.signum = signum
+        self.sent = False
+        setattr(self, stage, self._kill)
+
+    def _kill(self, trainer):
+        if not self.sent and trainer.inner_iter == self.inner_iter:
+            self.sent = True
+            os.kill(os.getpid(), self.signum)
+
+
+def test_signal_stops_training(tmp_path, make_trainer):
+    trainer, loader = make_trainer(num_samples=64)
+    trainer.register_hook(_Kill('after_train_iter', 2), priority='HIGHEST')
+    trainer.fit([loader], [('train', 1)], 2)
+
+    assert trainer.stop_training
+    assert trainer.iter == 3
+    assert osp.isfile(osp.join(str(tmp_path), 'toy_iter_3'))
+    # the default handler is back
+    assert signal.getsignal(signal.SIGUSR1) == signal.SIG_DFL
+
+
+def test_signal_during_val(tmp_path, make_trainer):
+    received = []
+    prev = signal.signal(signal.SIGUSR1,
+                         lambda signum, frame: received.append(signum))
+    try:
+        trainer, loader = make_trainer()
+        trainer.register_hook(_Kill('after_val_iter', 1), priority='HIGHEST')
+        trainer.fit([loader, loader], [('train', 1), ('val', 1)], 3)
+    finally:
+        signal.signal(signal.SIGUSR1, prev)
+
+    # saved after the first epoch, then handed to the previous handler
+    assert received == [signal.SIGUSR1]
+    assert trainer.stop_training
+    assert trainer.epoch == 1
+    assert osp.isfile(osp.join(str(tmp_path), 'toy_iter_4'))
+    assert not osp.exists(osp.join(str(tmp_path), 'toy_iter_8'))
+
+
+@pytest.mark.parametrize('signals', [(), ('SIGUSR1', )])
+def test_handlers_restored(make_trainer, signals):
+    trainer, loader = make_trainer(checkpoint_config=dict(signals=signals))
+    trainer.fit([loader], [('train', 1)], 1)
+    assert signal.getsignal(signal.SIGUSR1) == signal.SIG_DFL
+    assert not trainer.stop_training
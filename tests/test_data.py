@@ -0,0 +1,78 @@
+import os
+
+import pytest
+import torch
+from torch.utils.data import (BatchSampler, DataLoader, SequentialSampler,
+                              TensorDataset)
+
+from engine.trainer.data import SharedMemoryCacheDataset, rebatch_loader
+from engine.trainer.hooks import Hook
+
+
+class _Samples(object):
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        return self.samples[index]
+
+
+def test_shared_memory_cache(tmp_path):
+    samples = [dict(x=torch.arange(4.) + i, y=i) for i in range(3)]
+    dataset = SharedMemoryCacheDataset(_Samples(samples), str(tmp_path))
+    for _ in range(2):
+        for i, sample in enumerate(dataset):
+            assert torch.equal(sample['x'], samples[i]['x'])
+            assert sample['y'] == i
+    assert (dataset.hits, dataset.misses) == (3, 3)
+
+
+def test_shared_memory_cache_unpicklable(tmp_path):
+    # served uncached instead of failing on the missing temporary file
+    samples = [lambda: 0, dict(x=1)]
+    dataset = SharedMemoryCacheDataset(_Samples(samples), str(tmp_path))
+    assert dataset[0] is samples[0]
+    assert dataset[0] is samples[0]
+    assert dataset[1] == dict(x=1)
+    assert sorted(name for name in os.listdir(str(tmp_path))
+                  if not name.startswith('.')) == ['1']
+
+
+def test_rebatch_loader():
+    dataset = TensorDataset(torch.arange(10.))
+    loader = DataLoader(dataset, batch_size=2)
+    assert rebatch_loader(loader, 2) is loader
+    rebatched = rebatch_loader(loader, 4)
+    assert [len(x) for x, in rebatched] == [4, 4, 2]
+    # the order of the sampler is kept
+    assert torch.equal(torch.cat([x for x, in rebatched]), torch.arange(10.))
+    dropped = rebatch_loader(DataLoader(dataset, batch_size=2, drop_last=True), 4)
+    assert [len(x) for x, in dropped] == [4, 4]
+
+    batch_sampler = BatchSampler(SequentialSampler(dataset), 2, False)
+    with pytest.raises(ValueError):
+        rebatch_loader(DataLoader(dataset, batch_sampler=batch_sampler), 4)
+
+
+class _BatchSizes(Hook):
+
+    def __init__(self):
+        self.sizes = {'train': [], 'val': []}
+
+    def after_iter(self, trainer):
+        self.sizes[trainer.mode].append(trainer.outputs['num_samples'])
+
+
+def test_eval_batch_size(make_trainer):
+    trainer, loader = make_trainer(num_samples=40, eval_batch_size=16)
+    sizes = _BatchSizes()
+    trainer.register_hook(sizes)
+    trainer.fit([loader, loader], [('train', 1), ('val', 1)], 2)
+    assert sizes.sizes['train'] == [8] * 10
+    assert sizes.sizes['val'] == [16, 16, 8] * 2
+    # the rebatched loader is built once
+    assert len(trainer._eval_loaders) == 1
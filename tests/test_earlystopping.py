@@ -0,0 +1,52 @@
+import math
+
+import torch
+
+from engine.trainer.hooks import EarlyStoppingHook
+
+
+def _nan_after(num_iters):
+    calls = []
+
+    def batch_processor(model, data, train_mode, **kwargs):
+        x, y = data
+        loss = ((model(x) - y) ** 2).mean()
+        calls.append(None)
+        if len(calls) > num_iters:
+            loss = loss * math.nan
+        return dict(loss=loss, num_samples=x.size(0))
+
+    return batch_processor
+
+
+def test_divergence_stops_training(make_trainer):
+    trainer, loader = make_trainer(num_samples=256)
+    trainer.batch_processor = _nan_after(3)
+    hook = EarlyStoppingHook(monitor='loss', divergence_interval=4)
+    trainer.register_hook(hook, priority='VERY_LOW')
+    trainer.fit([loader], [('train', 1)], 3)
+    assert trainer.stop_training
+    # noticed at the next check, not at the end of the run
+    assert trainer.iter == 4
+
+
+def test_divergence_checked_at_epoch_end(make_trainer):
+    trainer, loader = make_trainer(num_samples=32)
+    trainer.batch_processor = _nan_after(3)
+    hook = EarlyStoppingHook(monitor='loss', divergence_interval=100)
+    trainer.register_hook(hook, priority='VERY_LOW')
+    trainer.fit([loader], [('train', 1)], 3)
+    assert trainer.stop_training and trainer.epoch == 1
+
+
+def test_divergence_threshold(make_trainer):
+    trainer, _ = make_trainer()
+    hook = EarlyStoppingHook(monitor='loss', divergence_threshold=2,
+                             divergence_patience=2, divergence_interval=3)
+    hook.before_run(trainer)
+    for loss in [1., 3., 1., 3., 3.]:
+        trainer.outputs = dict(loss=torch.tensor(loss))
+        hook.after_train_iter(trainer)
+    assert not trainer.stop_training
+    hook.after_train_epoch(trainer)
+    assert trainer.stop_training
@@ -0,0 +1,60 @@
+import os.path as osp
+
+import torch
+
+from engine.trainer.hooks import EMAHook, Hook
+
+
+def test_best_model_gets_ema_weights(tmp_path, make_trainer):
+    trainer, loader = make_trainer(
+        best_model_config=dict(monitor='loss', save_interval=1))
+    ema = EMAHook(decay=0.5)
+    trainer.register_hook(ema)
+    trainer.fit([loader, loader], [('train', 1), ('val', 1)], 1)
+
+    best = torch.load(osp.join(str(tmp_path), 'best.pth'))['state_dict']
+    model = trainer.model.state_dict()
+    assert any(not torch.equal(ema.ema_state_dict[k], model[k])
+               for k in model)
+    # the weights of best.pth are the ones its metric was computed with
+    for name, tensor in best.items():
+        assert torch.equal(tensor, ema.ema_state_dict[name])
+
+
+class _Record(Hook):
+    """Record the first weight of the model at the epoch boundaries."""
+
+    def __init__(self):
+        self.seen = []
+
+    def _record(self, trainer, stage):
+        self.seen.append((stage, trainer.model[0].weight.detach().clone()))
+
+    def after_train_epoch(self, trainer):
+        self._record(trainer, 'after_train_epoch')
+
+    def after_val_epoch(self, trainer):
+        self._record(trainer, 'after_val_epoch')
+
+    def before_train_epoch(self, trainer):
+        self._record(trainer, 'before_train_epoch')
+
+
+def test_training_weights_restored(make_trainer):
+    trainer, loader = make_trainer()
+    ema = EMAHook(decay=0.5)
+    trainer.register_hook(ema)
+    record = _Record()
+    trainer.register_hook(record, priority='LOWEST')
+    trainer.fit([loader, loader], [('train', 1), ('val', 1)], 2)
+
+    stages = [stage for stage, _ in record.seen]
+    assert stages == ['before_train_epoch', 'after_train_epoch',
+                      'after_val_epoch'] * 2
+    _, trained, evaluated, resumed = [w for _, w in record.seen[:4]]
+    # val ran with the EMA weights, the next epoch trains the weights the
+    # previous one left off with
+    assert not torch.equal(trained, evaluated)
+    assert torch.equal(trained, resumed)
+    assert not torch.equal(trainer.model[0].weight,
+                           ema.ema_state_dict['0.weight'])
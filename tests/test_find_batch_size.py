@@ -0,0 +1,87 @@
+import pytest
+import torch
+
+from engine.trainer.utils import get_rss_bytes, reset_peak_rss
+
+
+def _factory(max_batch_size, message):
+
+    def factory(batch_size):
+        if batch_size > max_batch_size:
+            raise RuntimeError(message)
+        return torch.randn(batch_size, 4), torch.randn(batch_size, 1)
+
+    return factory
+
+
+@pytest.mark.parametrize('message', [
+    'CUDA out of memory. Tried to allocate 2.00 GiB',
+    "[enforce fail at alloc_cpu.cpp:114] data. DefaultCPUAllocator: can't "
+    'allocate memory: you tried to allocate 17179869184 bytes.'])
+def test_out_of_memory(make_trainer, message):
+    trainer, _ = make_trainer()
+    weights = [param.clone() for param in trainer.model.parameters()]
+    batch_size = trainer.find_batch_size(
+        _factory(20, message), start=4, max_batch_size=64, tolerance=1)
+    assert batch_size == 4
+    assert all(torch.equal(a, b)
+               for a, b in zip(weights, trainer.model.parameters()))
+
+
+def test_other_errors_are_raised(make_trainer):
+    trainer, _ = make_trainer()
+    with pytest.raises(RuntimeError, match='shape mismatch'):
+        trainer.find_batch_size(_factory(0, 'shape mismatch'))
+
+
+@pytest.mark.skipif(not reset_peak_rss(), reason='needs a resettable peak')
+def test_memory_budget_uses_peak_rss(make_trainer):
+    trainer, _ = make_trainer()
+    batch_processor = trainer.batch_processor
+
+    def allocate(model, data, train_mode, **kwargs):
+        # a temporary freed before the step ends
+        if data[0].size(0) > 4:
+            torch.ones(64 << 20, dtype=torch.uint8)
+        return batch_processor(model, data, train_mode, **kwargs)
+
+    trainer.batch_processor = allocate
+    budget = get_rss_bytes() + (32 << 20)
+    assert trainer.find_batch_size(
+        _factory(64, ''), start=4, max_batch_size=64,
+        memory_budget=budget) == 4
+
+
+def test_reset_peak_rss_fallback(monkeypatch):
+    from engine.trainer import utils
+
+    def read_only(*args, **kwargs):
+        raise PermissionError(30, 'Read-only file system')
+
+    monkeypatch.setattr(utils, 'open', read_only, raising=False)
+    assert not reset_peak_rss()
+    monkeypatch.undo()
+    monkeypatch.setattr(utils.sys, 'platform', 'darwin')
+    assert not reset_peak_rss()
+
+
+def test_memory_budget_without_peak(make_trainer, monkeypatch):
+    from engine.trainer import trainer as trainer_module
+
+    def no_peak():
+        raise AssertionError('the peak was not reset')
+
+    # the RSS after each probe is compared to the budget instead
+    trainer, _ = make_trainer()
+    monkeypatch.setattr(trainer_module, 'reset_peak_rss', lambda: False)
+    monkeypatch.setattr(trainer_module, 'get_peak_rss_bytes', no_peak)
+    monkeypatch.setattr(trainer_module, 'get_rss_bytes',
+                        lambda: 20 * trainer.outputs['num_samples'])
+    assert trainer.find_batch_size(
+        _factory(64, ''), start=8, max_batch_size=8, memory_budget=200) == 8
+    # 16 and 12 are over the budget, bisection settles at 10
+    assert trainer.find_batch_size(
+        _factory(64, ''), start=16, memory_budget=200, tolerance=0.) <= 10
+    with pytest.raises(RuntimeError, match='does not fit'):
+        trainer.find_batch_size(
+            _factory(64, ''), start=16, memory_budget=10)
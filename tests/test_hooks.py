@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from engine.trainer.hooks import Hook
+
+
+class _Step(Hook):
+    """Append its name to a shared list after every train iteration."""
+
+    def __init__(self, name, calls, concurrent=False, reads=(), writes=(),
+                 delay=0):
+        self.name = name
+        self.calls = calls
+        self.concurrent = concurrent
+        self.reads = reads
+        self.writes = writes
+        self.delay = delay
+
+    def after_train_iter(self, trainer):
+        time.sleep(self.delay)
+        self.calls.append(self.name)
+
+
+class _Generic(Hook):
+
+    def after_iter(self, trainer):
+        pass
+
+
+def test_is_noop():
+    assert Hook().is_noop('after_train_iter')
+    step = _Step('a', [])
+    assert not step.is_noop('after_train_iter')
+    assert step.is_noop('after_val_iter')
+    # the train and val stages forward to the generic methods
+    generic = _Generic()
+    assert not generic.is_noop('after_train_iter')
+    assert not generic.is_noop('after_val_iter')
+    assert generic.is_noop('before_train_iter')
+    # hooks assigned on the instance count as well
+    hook = Hook()
+    hook.before_run = lambda trainer: None
+    assert not hook.is_noop('before_run')
+
+
+def test_conflicts():
+    a = _Step('a', [], reads=('log_buffer.output', ), writes=())
+    b = _Step('b', [], reads=('log_buffer', ), writes=())
+    c = _Step('c', [], reads=(), writes=('log_buffer', ))
+    assert not a.conflicts(b, 'after_train_iter')
+    # a write to the parent key covers the dotted child key
+    assert a.conflicts(c, 'after_train_iter')
+    assert c.conflicts(a, 'after_train_iter')
+    assert c.conflicts(c, 'after_train_iter')
+    # undeclared access conflicts with everything
+    assert Hook().conflicts(a, 'after_train_iter')
+    per_stage = _Step('d', [], reads=(), writes={'after_val_iter': ('lr', ),
+                                                 '*': ()})
+    lr = _Step('e', [], reads=('lr', ))
+    assert not per_stage.conflicts(lr, 'after_train_iter')
+    assert per_stage.conflicts(lr, 'after_val_iter')
+
+
+def test_compile_hooks(make_trainer):
+    trainer, _ = make_trainer()
+    trainer._hooks = []
+    calls = []
+    a = _Step('a', calls, concurrent=True, reads=('log_buffer', ))
+    b = _Step('b', calls, concurrent=True, reads=('log_buffer', ))
+    c = _Step('c', calls, concurrent=True, writes=('log_buffer', ))
+    d = _Step('d', calls)
+    for hook in (a, b, c, d, Hook()):
+        trainer.register_hook(hook)
+    plan = trainer.compile_hooks()
+    assert plan['after_train_iter'] == [(a, b), (c, ), (d, )]
+    # the plain hook is left out of every stage
+    assert plan['after_val_iter'] == []
+    assert plan['before_run'] == []
+
+
+def test_concurrent_call_order(make_trainer):
+    trainer, _ = make_trainer()
+    trainer._hooks = []
+    calls = []
+    # the first hook finishes last, the group still runs before 'c'
+    trainer.register_hook(_Step('a', calls, True, delay=0.05))
+    trainer.register_hook(_Step('b', calls, True))
+    trainer.register_hook(_Step('c', calls))
+    assert [len(g) for g in trainer.compile_hooks()['after_train_iter']] == [
+        2, 1]
+    trainer.call_hook('after_train_iter')
+    assert calls == ['b', 'a', 'c']
+
+
+class _Fail(Hook):
+    reads = ()
+    writes = ()
+    concurrent = True
+
+    def __init__(self, error, done):
+        self.error = error
+        self.done = done
+
+    def after_train_iter(self, trainer):
+        time.sleep(0.01)
+        self.done.append(threading.current_thread().name)
+        if self.error is not None:
+            raise self.error
+
+
+def test_concurrent_errors(make_trainer):
+    trainer, _ = make_trainer()
+    trainer._hooks = []
+    done = []
+    trainer.register_hook(_Fail(None, done))
+    trainer.register_hook(_Fail(KeyError('first'), done))
+    trainer.register_hook(_Fail(ValueError('second'), done))
+    with pytest.raises(KeyError, match='first'):
+        trainer.call_hook('after_train_iter')
+    # every hook of the group ran before the error was raised
+    assert len(done) == 3
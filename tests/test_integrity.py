@@ -0,0 +1,65 @@
+import os
+import os.path as osp
+import time
+
+import torch
+
+from engine.trainer.checkpoint import save_checkpoint
+from engine.trainer.integrity import (MANIFEST_SUFFIX, find_valid_checkpoint,
+                                      verify_checkpoint)
+
+
+def _corrupt(filename, offset=100):
+    data = bytearray(open(filename, 'rb').read())
+    data[offset] ^= 0xff
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+
+def test_verify_checkpoint(tmp_path, model):
+    filename = str(tmp_path / 'ckpt.pth')
+    save_checkpoint(model, filename)
+    assert osp.isfile(filename + MANIFEST_SUFFIX)
+    assert verify_checkpoint(filename, deep=True) == []
+    _corrupt(filename)
+    assert verify_checkpoint(filename)
+
+
+def test_find_valid_checkpoint_skips_corrupted(tmp_path, make_trainer):
+    trainer, loader = make_trainer(checkpoint_config=dict(interval=1))
+    trainer.fit([loader], [('train', 1)], 2)
+    newest = osp.join(str(tmp_path), 'toy_epoch_1')
+    assert find_valid_checkpoint(str(tmp_path)) == newest
+    _corrupt(newest)
+    assert find_valid_checkpoint(str(tmp_path)) == osp.join(
+        str(tmp_path), 'toy_epoch_0')
+
+
+def test_find_valid_checkpoint_candidates(tmp_path, model):
+    save_checkpoint(model, str(tmp_path / 'toy_epoch_1'), manifest=False)
+    time.sleep(0.01)
+    save_checkpoint(model, str(tmp_path / 'custom.pth'))
+    time.sleep(0.01)
+    # newer files without a manifest that CheckpointHook did not write
+    torch.save(model.state_dict(), str(tmp_path / 'other.pth'))
+    torch.save(dict(state_dict=model.state_dict()), str(tmp_path / 'best.pth'))
+    os.symlink('custom.pth', str(tmp_path / 'latest.pth'))
+    assert find_valid_checkpoint(str(tmp_path)) == str(tmp_path / 'custom.pth')
+    os.remove(str(tmp_path / 'custom.pth'))
+    assert find_valid_checkpoint(str(tmp_path)) == str(
+        tmp_path / 'toy_epoch_1')
+
+
+def test_resume_ignores_best_model(tmp_path, make_trainer):
+    best_model_config = dict(monitor='loss', filename='top.pth')
+    trainer, loader = make_trainer(checkpoint_config=dict(interval=1),
+                                   best_model_config=best_model_config)
+    trainer.fit([loader, loader], [('train', 1), ('val', 1)], 2)
+    assert osp.isfile(str(tmp_path / 'top.pth'))
+    # the best weights are the newest file and carry a manifest of their own
+    save_checkpoint(trainer.model, str(tmp_path / 'top.pth'))
+
+    resumed, _ = make_trainer(best_model_config=best_model_config)
+    resumed.resume(str(tmp_path))
+    assert resumed.epoch == 2
+    assert resumed.optimizer.state_dict()['state']
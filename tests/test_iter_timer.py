@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from engine.trainer.hooks import IterTimerHook
+from engine.trainer.log_buffer import LogBuffer
+
+
+class _Clock(object):
+    """Return the given times, in seconds, as nanoseconds."""
+
+    def __init__(self, times):
+        self.times = iter(times)
+
+    def __call__(self):
+        return int(next(self.times) * 1e9)
+
+
+def _run(hook, times, outputs, max_iters):
+    trainer = SimpleNamespace(log_buffer=LogBuffer([]), throughput={},
+                              max_iters=max_iters, iter=0, outputs=None)
+    hook._now = _Clock(times)
+    hook.before_run(trainer)
+    hook.before_train_epoch(trainer)
+    for i, output in enumerate(outputs):
+        trainer.iter = i
+        hook.before_train_iter(trainer)
+        trainer.outputs = output
+        hook.after_train_iter(trainer)
+    return trainer
+
+
+def test_not_synchronized_by_default():
+    assert not IterTimerHook().sync_device
+
+
+def test_percentiles():
+    hook = IterTimerHook(percentiles=(50, 95))
+    # data times 1, 1, 2 and iteration times 2, 4, 4
+    trainer = _run(hook, [0, 1, 2, 3, 6, 8, 10], [{}] * 3, 3)
+    buffer = trainer.log_buffer
+    buffer.average()
+    assert buffer.output['time'] == pytest.approx(10 / 3)
+    assert buffer.output['time_p50'] == pytest.approx(4)
+    assert buffer.output['data_time_p95'] == pytest.approx(
+        np.percentile([1, 1, 2], 95))
+    assert 'time_p99' not in buffer.output
+
+
+def test_throughput():
+    hook = IterTimerHook(percentiles=())
+    outputs = [dict(num_samples=8, num_tokens=80),
+               dict(num_samples=8, num_tokens=80),
+               dict(num_samples=4, num_tokens=20)]
+    trainer = _run(hook, [0, 1, 2, 3, 6, 8, 10], outputs, 5)
+    buffer = trainer.log_buffer
+    buffer.average()
+    # the work of the window divided by the time it took
+    assert buffer.output['iters_per_sec'] == pytest.approx(3 / 10)
+    assert buffer.output['samples_per_sec'] == pytest.approx(20 / 10)
+    assert buffer.output['tokens_per_sec'] == pytest.approx(180 / 10)
+    assert 'time_p50' not in buffer.output
+
+    throughput = trainer.throughput
+    assert throughput['iters_per_sec'] == pytest.approx(3 / 10)
+    assert throughput['samples_per_sec'] == pytest.approx(20 / 10)
+    assert throughput['tokens_per_sec'] == pytest.approx(180 / 10)
+    # two iterations left at 10 / 3 seconds each
+    assert throughput['eta'] == pytest.approx(2 * 10 / 3)
+
+
+def test_throughput_window_weighting():
+    hook = IterTimerHook(percentiles=())
+    # one slow and one fast iteration of 8 samples each
+    outputs = [dict(num_samples=8)] * 3
+    trainer = _run(hook, [0, 0, 1, 1, 5, 5, 6], outputs, 3)
+    buffer = trainer.log_buffer
+    rates = buffer.val_history['samples_per_sec']
+    assert rates == pytest.approx([8, 2, 8])
+    buffer.average(2)
+    # 16 samples in 5 seconds, not the mean of the rates
+    assert buffer.output['samples_per_sec'] == pytest.approx(16 / 5)
+    assert buffer.output['samples_per_sec'] != pytest.approx(sum(rates[1:]) / 2)
+    assert buffer.output['iters_per_sec'] == pytest.approx(2 / 5)
+    # the eta of the last iteration is zero
+    assert trainer.throughput['eta'] == 0
+    assert trainer.throughput['samples_per_sec'] == pytest.approx(24 / 6)
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+import pytest
+import torch
+from torch import nn
+
+from engine.trainer.checkpoint import load_state_dict
+
+
+class _WithExtraState(nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(2, 2)
+        self.extra = dict(step=0)
+
+    def get_extra_state(self):
+        return self.extra
+
+    def set_extra_state(self, state):
+        self.extra = state
+
+
+@pytest.mark.parametrize('assign', [False, True])
+def test_extra_state(assign):
+    src = _WithExtraState()
+    src.extra = dict(step=7)
+    dst = _WithExtraState()
+    load_state_dict(dst, src.state_dict(), strict=True, assign=assign)
+    assert dst.extra == dict(step=7)
+    assert torch.equal(dst.linear.weight, src.linear.weight)
+
+
+def test_mismatches(capsys):
+    model = nn.Sequential(nn.Linear(2, 3), nn.Linear(3, 1))
+    state_dict = OrderedDict(model.state_dict())
+    weight = model[0].weight.detach().clone()
+    state_dict['0.weight'] = torch.zeros(4, 2)
+    state_dict['0.bias'] = torch.ones(3)
+    state_dict['2.weight'] = torch.zeros(1)
+    del state_dict['1.bias']
+    with pytest.raises(RuntimeError, match='size mismatch'):
+        load_state_dict(model, state_dict, strict=True)
+    with pytest.raises(RuntimeError, match='size mismatch'):
+        load_state_dict(model, state_dict, skip_mismatched=True, strict=True)
+    # nothing is copied before a shape mismatch is raised
+    with pytest.raises(RuntimeError, match=r'0\.weight: model \(3, 2\)'):
+        load_state_dict(model, state_dict)
+    assert not torch.equal(model[0].bias, torch.ones(3))
+    load_state_dict(model, state_dict, skip_mismatched=True)
+    message = capsys.readouterr().out
+    assert 'unexpected keys in source state_dict: 2.weight' in message
+    assert 'missing keys in source state_dict: 1.bias' in message
+    assert '0.weight: model (3, 2), checkpoint (4, 2)' in message
+    # the matching tensors are still loaded
+    assert torch.equal(model[0].weight, weight)
+    assert torch.equal(model[0].bias, torch.ones(3))
@@ -0,0 +1,32 @@
+import pytest
+
+from engine.trainer.log_buffer import LogBuffer
+
+
+def test_average_memo():
+    buffer = LogBuffer([])
+    buffer.update({'loss': 1.0})
+    buffer.update({'loss': 3.0})
+    buffer.average()
+    assert buffer.output['loss'] == pytest.approx(2.0)
+    # the output of a repeated call is kept
+    buffer.output['loss'] = -1
+    buffer.average()
+    assert buffer.output['loss'] == -1
+    buffer.average(1)
+    assert buffer.output['loss'] == pytest.approx(3.0)
+
+    buffer.update({'loss': 5.0})
+    buffer.average(1)
+    assert buffer.output['loss'] == pytest.approx(5.0)
+
+    buffer.clear_output()
+    assert not buffer.ready and 'loss' not in buffer.output
+    buffer.average(1)
+    assert buffer.ready
+    assert buffer.output['loss'] == pytest.approx(5.0)
+
+    buffer.clear()
+    buffer.update({'loss': 7.0})
+    buffer.average(1)
+    assert buffer.output['loss'] == pytest.approx(7.0)
@@ -0,0 +1,98 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from engine.trainer.hooks import LoggerHook
+from engine.trainer.hooks.logger import base
+from engine.trainer.log_buffer import LogBuffer
+
+
+class _Clock(object):
+
+    def __init__(self):
+        self.now = 0.
+
+    def perf_counter(self):
+        return self.now
+
+
+class _Recorder(LoggerHook):
+    """Record the logged iterations, each log takes ``cost`` seconds."""
+    concurrent = True
+
+    def __init__(self, clock=None, cost=0., **kwargs):
+        super(_Recorder, self).__init__(**kwargs)
+        self.clock = clock
+        self.cost = cost
+        self.logged = []
+
+    def log(self, trainer):
+        self.logged.append(
+            (trainer.inner_iter, trainer.log_buffer.output['loss']))
+        self.clock.now += self.cost
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(base, 'time', clock)
+    return clock
+
+
+def _train_epoch(hook, clock, num_iters, step_time=1., costs=None):
+    trainer = SimpleNamespace(
+        log_buffer=LogBuffer([]), hooks=[hook], inner_iter=0,
+        data_loader=range(num_iters), logger=logging.getLogger(__name__))
+    hook.before_run(trainer)
+    hook.before_train_epoch(trainer)
+    for i in range(num_iters):
+        if costs is not None:
+            hook.cost = costs(i)
+        clock.now += step_time
+        trainer.inner_iter = i
+        trainer.log_buffer.update({'loss': float(i)})
+        hook.after_train_iter(trainer)
+    return [i for i, _ in hook.logged]
+
+
+def test_interval_seconds(clock):
+    hook = _Recorder(clock, interval_seconds=2.5)
+    assert _train_epoch(hook, clock, 10) == [2, 5, 8]
+    # averaged over the iterations since the last log
+    assert [loss for _, loss in hook.logged] == [1., 4., 7.]
+
+    hook = _Recorder(clock, interval_seconds=2.5, ignore_last=False)
+    assert _train_epoch(hook, clock, 10) == [2, 5, 8, 9]
+    assert hook.logged[-1][1] == 9.
+
+
+def test_overhead_budget(clock):
+    # a log takes half a step: every fifth iteration fits 10% overhead
+    hook = _Recorder(clock, cost=0.5, interval=1, overhead_budget=0.1)
+    assert _train_epoch(hook, clock, 16) == [0, 5, 10, 15]
+    assert hook.interval == 5
+
+    # once logging is cheap the interval halves back to ``interval``
+    hook = _Recorder(clock, interval=1, overhead_budget=0.1)
+    costs = lambda i: 0.5 if i < 10 else 0.
+    assert _train_epoch(hook, clock, 16, costs=costs) == [
+        0, 5, 10, 12, 13, 14, 15]
+    assert hook.interval == 1
+
+
+def test_concurrent_only_with_same_window():
+    trainer = SimpleNamespace(hooks=[_Recorder(interval=5),
+                                     _Recorder(interval=5)])
+    for hook in trainer.hooks:
+        hook.before_run(trainer)
+    assert all(hook.concurrent for hook in trainer.hooks)
+    # only the last logger clears the output
+    assert [hook.reset_flag for hook in trainer.hooks] == [False, True]
+
+    for other in (_Recorder(interval=10), _Recorder(interval_seconds=5),
+                  _Recorder(interval=5, overhead_budget=0.1)):
+        trainer = SimpleNamespace(hooks=[_Recorder(interval=5), other])
+        for hook in trainer.hooks:
+            hook.before_run(trainer)
+        assert not any(hook.concurrent for hook in trainer.hooks)
@@ -0,0 +1,62 @@
+import logging
+import tracemalloc
+from types import SimpleNamespace
+
+from engine.trainer.hooks import MemoryMonitorHook
+from engine.trainer.hooks import memory
+from engine.trainer.log_buffer import LogBuffer
+
+_MB = 1024 * 1024
+
+
+def _make_trainer():
+    return SimpleNamespace(log_buffer=LogBuffer([]), inner_iter=0,
+                           logger=logging.getLogger(__name__))
+
+
+def test_growth_warning(monkeypatch, caplog):
+    rss = iter([100 * _MB, 110 * _MB, 125 * _MB])
+    monkeypatch.setattr(memory, 'get_rss_bytes', lambda: next(rss))
+    trainer = _make_trainer()
+    hook = MemoryMonitorHook(growth_threshold=0.2)
+    hook.before_run(trainer)
+    # compared to the end of the first epoch, not to the previous one
+    with caplog.at_level(logging.WARNING):
+        hook.after_train_epoch(trainer)
+        hook.after_train_epoch(trainer)
+        assert not caplog.records
+        hook.after_train_epoch(trainer)
+    assert len(caplog.records) == 1
+    assert '25.0%' in caplog.text
+    assert '100.0 MB -> 125.0 MB' in caplog.text
+    assert hook.epoch_rss == [100 * _MB, 110 * _MB, 125 * _MB]
+
+
+def test_samples_and_peak_reset():
+    assert not tracemalloc.is_tracing()
+    trainer = _make_trainer()
+    hook = MemoryMonitorHook(interval=2, trace_python=True)
+    hook.before_run(trainer)
+    try:
+        samples = []
+        for i in range(4):
+            trainer.inner_iter = i
+            if i == 1:
+                # a temporary in the window of the first sample
+                block = bytearray(16 * _MB)
+                del block
+            hook.after_train_iter(trainer)
+            samples.append(hook.last_sample)
+    finally:
+        hook.after_run(trainer)
+    assert not tracemalloc.is_tracing()
+
+    # sampled at the end of every window of two iterations
+    assert samples[0] == {} and samples[2] is samples[1]
+    first, second = samples[1], samples[3]
+    assert first['rss_mb'] > 0
+    assert first['py_heap_peak_mb'] >= 16
+    # the peak of the second window does not include the first one's
+    assert second['py_heap_peak_mb'] < 16
+    assert trainer.log_buffer.val_history['py_heap_peak_mb'] == [
+        first['py_heap_peak_mb'], second['py_heap_peak_mb']]
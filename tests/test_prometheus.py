@@ -0,0 +1,38 @@
+import socket
+import urllib.request
+
+from engine.trainer.hooks import PrometheusExporterHook
+
+
+def _scrape(hook):
+    url = 'http://127.0.0.1:{}/metrics'.format(hook.server.server_address[1])
+    with urllib.request.urlopen(url) as response:
+        return response.read().decode()
+
+
+def test_taken_port_falls_back(make_trainer):
+    trainer, _ = make_trainer()
+    taken = socket.socket()
+    taken.bind(('', 0))
+    taken.listen(1)
+    hook = PrometheusExporterHook(port=taken.getsockname()[1])
+    try:
+        hook.before_run(trainer)
+        assert hook.server is not None
+        assert hook.server.server_address[1] != taken.getsockname()[1]
+        assert 'engine_epoch 0' in _scrape(hook)
+    finally:
+        hook.after_run(trainer)
+        taken.close()
+
+
+def test_log_buffer_names(make_trainer):
+    trainer, _ = make_trainer()
+    hook = PrometheusExporterHook()
+    hook._outputs['train'] = dict(loss=0.5, lr=0.01)
+    lines = hook.render(trainer).decode().splitlines()
+    assert 'engine_log_loss{mode="train"} 0.5' in lines
+    assert 'engine_log_lr{mode="train"} 0.01' in lines
+    # log buffer keys never share a name with the built-in gauges
+    assert [line for line in lines if line.startswith('engine_lr')] == [
+        'engine_lr{group="0"} 0.01']
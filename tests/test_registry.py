@@ -0,0 +1,83 @@
+import os.path as osp
+import subprocess
+import sys
+
+import pytest
+
+from engine.utils import registry as registry_module
+from engine.utils.registry import Registry, build_from_cfg
+
+
+class _Plain(object):
+
+    def __init__(self, value=0):
+        self.value = value
+
+
+def test_build_from_cfg():
+    models = Registry('model', entry_point_group='')
+    models.register_module(_Plain)
+    obj = build_from_cfg(dict(name='_Plain'), models, dict(value=3))
+    assert isinstance(obj, _Plain) and obj.value == 3
+    assert build_from_cfg(dict(name='_Plain'), models) is not obj
+    with pytest.raises(KeyError):
+        build_from_cfg(dict(name='Missing'), models)
+
+
+def test_memoize_is_bounded(monkeypatch):
+    models = Registry('model', entry_point_group='')
+    models.register_module(_Plain)
+    monkeypatch.setattr(registry_module, 'MAX_MEMOIZED', 2)
+    monkeypatch.setattr(registry_module, '_built_objects',
+                        registry_module.OrderedDict())
+    first = build_from_cfg(dict(name='_Plain', value=1), models, memoize=True)
+    assert build_from_cfg(dict(name='_Plain', value=1), models,
+                          memoize=True) is first
+    build_from_cfg(dict(name='_Plain', value=2), models, memoize=True)
+    # the least recently used object is dropped
+    build_from_cfg(dict(name='_Plain', value=3), models, memoize=True)
+    assert len(registry_module._built_objects) == 2
+    assert build_from_cfg(dict(name='_Plain', value=1), models,
+                          memoize=True) is not first
+    # unhashable configs are always built
+    assert build_from_cfg(dict(name='_Plain', value=[]), models,
+                          memoize=True).value == []
+
+
+def test_register_lazy():
+    models = Registry('model', entry_point_group='')
+    models.register_lazy('Ordered', 'collections:OrderedDict')
+    assert 'Ordered' in models
+    assert models.get('Ordered') is registry_module.OrderedDict
+
+
+def test_star_import_skips_lazy_hooks():
+    code = ('import sys\n'
+            'from engine.trainer.hooks import *\n'
+            'from engine.trainer.hooks.logger import *\n'
+            'assert "engine.trainer.hooks.logger.wandb" not in sys.modules\n'
+            'assert "engine.trainer.hooks.logger.prometheus" not in sys.modules\n'
+            'assert TextLoggerHook and EMAHook\n')
+    root = osp.dirname(osp.dirname(osp.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
+
+
+def test_lazy_hook_attribute():
+    code = ('import sys\n'
+            'import engine.trainer.hooks as hooks\n'
+            'name = "engine.trainer.hooks.logger.wandb"\n'
+            'assert name not in sys.modules\n'
+            'from engine.trainer.hooks import WandBLoggerHook\n'
+            'assert name in sys.modules\n'
+            # wandb itself is only imported by a hook that logs
+            'assert "wandb" not in sys.modules\n'
+            'assert hooks.HOOKS.get("WandBLoggerHook") is WandBLoggerHook\n'
+            'assert issubclass(WandBLoggerHook, hooks.LoggerHook)\n'
+            'try:\n'
+            '    hooks.MissingHook\n'
+            'except AttributeError:\n'
+            '    pass\n'
+            'else:\n'
+            '    raise AssertionError\n')
+    root = osp.dirname(osp.dirname(osp.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
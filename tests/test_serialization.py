@@ -0,0 +1,92 @@
+import io
+import pickle
+from collections import OrderedDict
+
+import pytest
+import torch
+from torch import nn
+
+from engine.trainer import serialization
+
+
+def _checkpoint():
+    torch.manual_seed(0)
+    return dict(
+        meta=dict(epoch=3, time='now'),
+        state_dict=OrderedDict(
+            weight=torch.randn(64, 33), half=torch.randn(5).half(),
+            bf16=torch.randn(7).bfloat16(), count=torch.tensor(4),
+            empty=torch.empty(0, 3)),
+        shape=torch.Size([2, 3]))
+
+
+def _assert_equal(a, b):
+    assert type(a) is type(b)
+    if isinstance(a, dict):
+        assert list(a) == list(b)
+        for key in a:
+            _assert_equal(a[key], b[key])
+    elif torch.is_tensor(a):
+        assert a.dtype == b.dtype and torch.equal(a, b)
+    else:
+        assert a == b
+
+
+@pytest.mark.parametrize('compress', serialization.available_codecs() +
+                         ['fast', 'strong'])
+def test_round_trip(tmp_path, compress):
+    filename = str(tmp_path / 'ckpt')
+    checkpoint = _checkpoint()
+    # small chunks, so tensors share and span chunks
+    serialization.save(checkpoint, filename, compress, chunk_size=1000,
+                       num_workers=2)
+    assert serialization.is_chunked(filename)
+    _assert_equal(serialization.load(filename, num_workers=2), checkpoint)
+
+
+def test_tied_tensors(tmp_path):
+    weight = torch.randn(3)
+    serialization.save(dict(a=weight, b=weight), str(tmp_path / 'ckpt'))
+    loaded = serialization.load(str(tmp_path / 'ckpt'))
+    assert loaded['a'] is loaded['b']
+
+    # state_dict detaches every name into a tensor of its own
+    model = nn.Sequential(nn.Embedding(10, 4), nn.Linear(4, 10, bias=False))
+    model[1].weight = model[0].weight
+    state_dict = model.state_dict()
+    assert state_dict['0.weight'] is not state_dict['1.weight']
+    # a view of the same memory with another shape is stored separately
+    state_dict['flat'] = state_dict['0.weight'].view(-1)
+    serialization.save(state_dict, str(tmp_path / 'tied'))
+    loaded = serialization.load(str(tmp_path / 'tied'))
+    assert loaded['0.weight'] is loaded['1.weight']
+    assert torch.equal(loaded['0.weight'], model[0].weight)
+    assert torch.equal(loaded['flat'], state_dict['flat'])
+    assert loaded['flat'] is not loaded['0.weight']
+
+
+def test_restricted_unpickler(tmp_path):
+    # only the globals of plain checkpoints can be loaded
+    serialization.save(dict(cls=io.BytesIO), str(tmp_path / 'ckpt'))
+    with pytest.raises(pickle.UnpicklingError, match='not allowed'):
+        serialization.load(str(tmp_path / 'ckpt'))
+
+
+@pytest.mark.parametrize('map_location', [
+    'cpu', torch.device('cpu'), dict(cuda='cpu'),
+    lambda storage, location: storage, lambda storage, location: None])
+def test_map_location(tmp_path, map_location):
+    filename = str(tmp_path / 'ckpt')
+    checkpoint = _checkpoint()
+    serialization.save(checkpoint, filename)
+    _assert_equal(serialization.load(filename, map_location), checkpoint)
+
+
+def test_map_location_remaps_saved_location(tmp_path):
+    filename = str(tmp_path / 'ckpt')
+    serialization.save(dict(weight=torch.randn(3)), filename)
+    assert serialization.load(filename, dict(cpu='meta'))['weight'].is_meta
+    locations = []
+    serialization.load(
+        filename, lambda storage, location: locations.append(location))
+    assert locations == ['cpu']
@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pytest
+
+from engine.trainer.log_buffer import LogBuffer
+from engine.trainer.stats import DDSketch, RunningStats, StreamingStats
+
+
+@pytest.fixture
+def values():
+    rng = np.random.RandomState(0)
+    return np.concatenate([rng.lognormal(0, 2, 500), -rng.lognormal(0, 1, 100),
+                           np.zeros(10)])
+
+
+def _exact_quantile(values, q):
+    # the sketch ranks like numpy's 'lower' interpolation
+    return np.sort(values)[int(math.floor(q * (len(values) - 1)))]
+
+
+def test_running_stats(values):
+    weights = np.random.RandomState(1).randint(1, 5, len(values))
+    stats = RunningStats()
+    for value, weight in zip(values, weights):
+        stats.update(value, weight)
+    mean = np.average(values, weights=weights)
+    assert stats.count == weights.sum()
+    assert stats.mean == pytest.approx(mean)
+    assert stats.variance == pytest.approx(
+        np.average((values - mean) ** 2, weights=weights))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_running_stats_merge(values):
+    parts = []
+    for chunk in np.array_split(values, 3):
+        stats = RunningStats()
+        for value in chunk:
+            stats.update(value)
+        parts.append(stats)
+    merged = parts[0].merge(parts[1]).merge(parts[2]).merge(RunningStats())
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(values.mean())
+    assert merged.std == pytest.approx(values.std())
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    assert math.isnan(RunningStats().variance)
+
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.05])
+def test_ddsketch_accuracy(values, relative_accuracy):
+    sketch = DDSketch(relative_accuracy)
+    parts = [DDSketch(relative_accuracy) for _ in range(3)]
+    for i, value in enumerate(values):
+        sketch.add(value)
+        parts[i % 3].add(value)
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+    for q in np.linspace(0, 1, 41):
+        exact = _exact_quantile(values, q)
+        for estimate in (sketch.quantile(q), merged.quantile(q)):
+            assert abs(estimate - exact) <= relative_accuracy * abs(exact) + 1e-12
+    assert math.isnan(DDSketch().quantile(0.5))
+    with pytest.raises(ValueError):
+        parts[0].merge(DDSketch(relative_accuracy / 2))
+
+
+def test_ddsketch_collapse(values):
+    sketch = DDSketch(0.01, max_bins=64)
+    positive = values[values > 0]
+    for value in positive:
+        sketch.add(value)
+    assert len(sketch.positive) <= 64
+    # the bins closest to zero are collapsed, the upper quantiles are kept
+    for q in (0.9, 0.99, 1):
+        exact = _exact_quantile(positive, q)
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+
+
+def test_log_buffer_stats(values):
+    buffer = LogBuffer([])
+    buffer.track_stats('time', quantiles=(50, 99))
+    for value in values:
+        buffer.update({'time': value, 'loss': 1.})
+    buffer.average(10)
+    output = buffer.output
+    assert output['time'] == pytest.approx(values[-10:].mean())
+    assert output['time_std'] == pytest.approx(values.std())
+    assert (output['time_min'], output['time_max']) == (
+        values.min(), values.max())
+    assert output['time_q99'] == pytest.approx(
+        _exact_quantile(values, 0.99), rel=0.01)
+    assert 'loss_std' not in output
+
+    # without a process group the own statistics are returned
+    gathered = buffer.gather_stats()
+    assert list(gathered) == ['time']
+    assert gathered['time'].summary() == buffer.stats['time'].summary()
+
+    restored = LogBuffer([])
+    restored.load_state_dict(buffer.state_dict())
+    assert restored.stats['time'].summary() == buffer.stats['time'].summary()
+
+    buffer.clear()
+    assert buffer.stats['time'].moments.count == 0
+    assert buffer.stats['time'].quantiles == (50, 99)
+    buffer.update({'time': 2.})
+    buffer.average()
+    assert buffer.output['time_max'] == 2.
+
+
+def test_streaming_stats_merge(values):
+    a, b = StreamingStats(), StreamingStats()
+    for i, value in enumerate(values):
+        (a if i % 2 else b).update(value)
+    summary = a.merge(b).summary()
+    assert summary['mean'] == pytest.approx(values.mean())
+    assert summary['q50'] == pytest.approx(_exact_quantile(values, 0.5),
+                                           rel=0.01)
@@ -0,0 +1,40 @@
+import io
+import os
+
+import pytest
+
+from engine.utils import storage
+from engine.utils.storage import HTTPBackend
+
+
+class _Response(io.BytesIO):
+    """A body that breaks off after ``size`` bytes."""
+
+    def __init__(self, data, size):
+        super().__init__(data)
+        self.size = size
+
+    def read(self, n=-1):
+        if self.tell() >= self.size:
+            raise ConnectionResetError('connection reset by peer')
+        return super().read(min(n, self.size - self.tell()))
+
+
+def test_http_without_ranges(tmp_path, monkeypatch):
+    backend = HTTPBackend(part_size=4)
+    monkeypatch.setattr(backend, '_head', lambda uri: {})
+    data = b'0123456789'
+    monkeypatch.setattr(storage, 'urlopen',
+                        lambda uri, timeout: _Response(data, len(data) + 1))
+    filename = str(tmp_path / 'sub' / 'weights.pth')
+    backend.get_file('https://example.com/weights.pth', filename)
+    with open(filename, 'rb') as f:
+        assert f.read() == data
+
+    # a broken download leaves neither the file nor its temporary file
+    monkeypatch.setattr(storage, 'urlopen',
+                        lambda uri, timeout: _Response(data, 6))
+    filename = str(tmp_path / 'other.pth')
+    with pytest.raises(ConnectionResetError):
+        backend.get_file('https://example.com/other.pth', filename)
+    assert os.listdir(str(tmp_path)) == ['sub']
@@ -0,0 +1,114 @@
+import csv
+import logging
+from types import SimpleNamespace
+
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from engine.trainer.log_buffer import LogBuffer
+from engine.trainer.sweep import (MedianStoppingHook, SweepRunner,
+                                  _share_memory, set_by_path)
+from engine.trainer.trainer import Trainer
+
+
+class _Node(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.parent = None
+        self.children = []
+
+
+def test_share_memory_with_cycles():
+    root = _Node(torch.zeros(3))
+    child = _Node(dict(x=torch.ones(2), items=[torch.ones(1)]))
+    child.parent = root
+    root.children.append(child)
+    assert _share_memory(root) is root
+    assert root.data.is_shared()
+    assert child.data['x'].is_shared()
+    assert child.data['items'][0].is_shared()
+
+
+def test_set_by_path():
+    config = dict(optimizer=dict(lr=0.1))
+    set_by_path(config, 'optimizer.lr', 0.01)
+    assert config == dict(optimizer=dict(lr=0.01))
+
+
+def _trainer(epoch, loss):
+    log_buffer = LogBuffer([])
+    log_buffer.output['loss'] = loss
+    return SimpleNamespace(log_buffer=log_buffer, epoch=epoch,
+                           stop_training=False,
+                           logger=logging.getLogger(__name__))
+
+
+def test_median_stopping():
+    reports = {(0, 1): 1., (1, 1): 2., (2, 1): 3.}
+    hook = MedianStoppingHook('loss', 3, reports, grace_epochs=1,
+                              min_trials=3)
+    # within the grace epochs
+    trainer = _trainer(0, 10.)
+    hook.after_val_epoch(trainer)
+    assert not trainer.stop_training and reports[(3, 0)] == 10.
+    # better than the median of the others
+    trainer = _trainer(1, 1.5)
+    hook.after_val_epoch(trainer)
+    assert not trainer.stop_training and not hook.pruned
+    # worse than the median
+    trainer = _trainer(1, 2.5)
+    hook.after_val_epoch(trainer)
+    assert trainer.stop_training and hook.pruned
+    assert (hook.last, hook.best) == (2.5, 1.5)
+
+    # too few other trials at this epoch
+    hook = MedianStoppingHook('loss', 4, reports, min_trials=5)
+    trainer = _trainer(1, 100.)
+    hook.after_val_epoch(trainer)
+    assert not trainer.stop_training
+
+    hook = MedianStoppingHook('acc', 5, reports, mode='max', min_trials=1)
+    trainer = _trainer(1, 1.)
+    hook.after_val_epoch(trainer)
+    assert hook.last is None and not trainer.stop_training
+
+
+def _batch_processor(model, data, train_mode, **kwargs):
+    x, y = data
+    loss = ((model(x) - y) ** 2).mean()
+    return dict(loss=loss, log_vars={'loss': loss.item()},
+                num_samples=x.size(0))
+
+
+def _build(config, dataset, work_dir):
+    trainer_config = SimpleNamespace(log_average_filter=[], name='toy',
+                                     model=SimpleNamespace(name='toy'))
+    trainer = Trainer(trainer_config, nn.Linear(4, 1), _batch_processor,
+                      optimizer=dict(name='SGD', lr=config['lr']),
+                      work_dir=work_dir)
+    trainer.register_training_hooks(
+        dict(policy='Fixed'), dict(grad_clip=None),
+        log_config=dict(interval=1, hooks=[dict(name='TextLoggerHook')]))
+    loader = DataLoader(dataset, batch_size=8)
+    return dict(trainer=trainer, data_loaders=[loader, loader],
+                workflow=[('train', 1), ('val', 1)], max_epochs=2)
+
+
+def test_sweep_runner(tmp_path):
+    dataset = TensorDataset(torch.randn(16, 4), torch.randn(16, 1))
+    runner = SweepRunner(_build, dict(lr=0.1), {'lr': [0.01, 0.1, -1.]},
+                         monitor='loss', out_dir=str(tmp_path),
+                         num_workers=2, min_trials=5)
+    rows = runner.run(dataset)
+    assert dataset.tensors[0].is_shared()
+    assert sorted(row['trial'] for row in rows) == [0, 1, 2]
+    assert {row['worker'] for row in rows} <= {0, 1}
+    # a negative lr fails, the others finish and are sorted best first
+    assert rows[-1]['status'] == 'failed' and rows[-1]['lr'] == -1.
+    assert [row['status'] for row in rows[:2]] == ['done', 'done']
+    assert rows[0]['best_loss'] <= rows[1]['best_loss']
+    assert all(row['epochs'] == 2 for row in rows[:2])
+    with open(str(tmp_path / 'sweep_results.csv')) as f:
+        assert len(list(csv.DictReader(f))) == 3
@@ -0,0 +1,94 @@
+import os
+import os.path as osp
+import threading
+
+import pytest
+
+from engine.utils.storage import DirectoryBackend, register_backend
+from engine.utils.weights_cache import WeightsCache, fcntl
+
+
+@pytest.fixture
+def store(tmp_path):
+    backend = DirectoryBackend(str(tmp_path / 'store'))
+    register_backend('cachetest', backend)
+    os.makedirs(str(tmp_path / 'store'))
+    for name in ('a.bin', 'b.bin'):
+        with open(str(tmp_path / 'store' / name), 'wb') as f:
+            f.write(name.encode() * 100)
+    return backend
+
+
+def test_fetch_downloads_once(tmp_path, store, monkeypatch):
+    cache = WeightsCache(str(tmp_path / 'cache'))
+    calls = []
+    get_file = store.get_file
+    monkeypatch.setattr(store, 'get_file',
+                        lambda *args: calls.append(args) or get_file(*args))
+    first = cache.fetch('cachetest://a.bin')
+    assert cache.fetch('cachetest://a.bin') == first
+    assert len(calls) == 1
+    with open(first, 'rb') as f:
+        assert f.read() == b'a.bin' * 100
+
+    offline = WeightsCache(str(tmp_path / 'cache'), offline=True)
+    assert offline.fetch('cachetest://a.bin') == first
+    with pytest.raises(IOError):
+        offline.fetch('cachetest://b.bin')
+
+
+def test_evict_least_recently_used(tmp_path, store):
+    cache = WeightsCache(str(tmp_path / 'cache'), max_bytes=600)
+    a = cache.fetch('cachetest://a.bin')
+    b = cache.fetch('cachetest://b.bin')
+    assert not osp.exists(a) and osp.exists(b)
+
+
+def test_pin_fetches_evicted_blob_again(tmp_path, store, monkeypatch):
+    cache = WeightsCache(str(tmp_path / 'cache'))
+    fetch = cache.fetch
+    fetched = []
+
+    def evicted_once(*args):
+        blob = fetch(*args)
+        if not fetched:
+            # evicted by another process before the lock is taken
+            os.remove(blob)
+        fetched.append(blob)
+        return blob
+
+    monkeypatch.setattr(cache, 'fetch', evicted_once)
+    with cache.pin('cachetest://a.bin') as blob:
+        assert osp.isfile(blob)
+    assert len(fetched) == 2
+
+
+@pytest.mark.skipif(fcntl is None, reason='needs fcntl locks')
+def test_pin_blocks_eviction(tmp_path, store):
+    cache = WeightsCache(str(tmp_path / 'cache'))
+    b = cache.fetch('cachetest://b.bin')
+    with cache.pin('cachetest://a.bin') as a:
+        # flock conflicts between open files, as between processes
+        other = WeightsCache(str(tmp_path / 'cache'))
+        other._evict(0)
+        assert osp.isfile(a) and not osp.exists(b)
+    other._evict(0)
+    assert not osp.exists(a)
+
+
+@pytest.mark.skipif(fcntl is None, reason='needs fcntl locks')
+def test_fetch_inside_pin(tmp_path, store):
+    cache = WeightsCache(str(tmp_path / 'cache'), max_bytes=600)
+    result = {}
+
+    def nested():
+        with cache.pin('cachetest://a.bin') as a:
+            # the download evicts, but must not wait for the pin
+            result['b'] = cache.fetch('cachetest://b.bin')
+            result['a'] = osp.isfile(a)
+
+    thread = threading.Thread(target=nested, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), 'fetch inside pin() deadlocked'
+    assert result['a'] and osp.isfile(result['b'])